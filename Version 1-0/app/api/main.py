@@ -1,14 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routes_memory import router as memory_router
+from fastapi.responses import PlainTextResponse
+from app.maintenance import PruneScheduler
+from .routes_memory import router as memory_router, memory_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Poda incremental de EUs expirados em background.
+    scheduler = PruneScheduler(memory_service)
+    app.state.prune_scheduler = scheduler
+    scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title="DREAM Memory Service",
         description="Serviço de memória episódica baseado no padrão DREAM.",
         version="0.1.0",
+        lifespan=lifespan,
     )
 
     app.include_router(memory_router, prefix="/memory", tags=["memory"])
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def metrics() -> PlainTextResponse:
+        # Formato de exposição texto do Prometheus.
+        return PlainTextResponse(
+            memory_service.metrics_text(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     return app
 
 
@@ -2,14 +2,17 @@ from __future__ import annotations
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from app.memory_service import MemoryService
+from app.memory_service import AsyncMemoryService
 from dream.models import EpisodeProposal
+from dream.metrics import Metrics
 
 router = APIRouter()
 
 # Instância única pro exemplo.
 # Em produção, poderia ser injetado via Depends e ciclo de vida.
-memory_service = MemoryService()
+# Versão async: nenhuma thread fica presa esperando LLM ou busca vetorial.
+# Com métricas ligadas: expostas em /metrics (formato Prometheus).
+memory_service = AsyncMemoryService(metrics=Metrics())
 
 
 # --------- SCHEMAS Pydantic (DTOs) ---------
@@ -21,17 +24,16 @@ class InteractionIn(BaseModel):
 
 
 class EpisodeProposalOut(BaseModel):
+    proposal_id: str
     user_id: str
     summary: str
     topic: Optional[str] = None
 
 
 class EpisodeConfirmIn(BaseModel):
-    user_id: str
-    summary: str
-    topic: Optional[str] = None
-    importance_score: Optional[float] = None
+    proposal_id: str
     confirmed: bool
+    importance_score: Optional[float] = None
 
 
 class EpisodicUnitOut(BaseModel):
@@ -50,12 +52,12 @@ class ContextResponse(BaseModel):
 # --------- ROTAS ---------
 
 @router.post("/users/{user_id}/interactions")
-def record_interaction(user_id: str, body: InteractionIn):
+async def record_interaction(user_id: str, body: InteractionIn):
     """
     Registra uma interação user <-> IA no buffer episódico DREAM.
     """
-    memory_service.configure_user(user_id, opted_in=True)  # default, idempotente
-    memory_service.record_interaction(
+    await memory_service.configure_user(user_id, opted_in=True)  # default, idempotente
+    await memory_service.record_interaction(
         user_id=user_id,
         input_text=body.input_text,
         output_text=body.output_text,
@@ -65,16 +67,16 @@ def record_interaction(user_id: str, body: InteractionIn):
 
 
 @router.post("/users/{user_id}/episodes/propose", response_model=EpisodeProposalOut)
-def propose_episode(user_id: str, topic: Optional[str] = None):
+async def propose_episode(user_id: str, topic: Optional[str] = None):
     """
     Constrói uma proposta de Episodic Unit (EU) com base no buffer atual.
     Esse é o momento em que a UI poderia perguntar ao usuário:
     'Quer salvar essa memória?'
     """
-    if not memory_service.should_propose_episode(user_id):
+    if not await memory_service.should_propose_episode(user_id):
         raise HTTPException(status_code=400, detail="No episode to propose yet.")
 
-    proposal: Optional[EpisodeProposal] = memory_service.build_episode_proposal(
+    proposal: Optional[EpisodeProposal] = await memory_service.build_episode_proposal(
         user_id=user_id,
         topic=topic,
     )
@@ -82,7 +84,9 @@ def propose_episode(user_id: str, topic: Optional[str] = None):
         raise HTTPException(status_code=400, detail="No proposal built.")
 
     # Aqui estou devolvendo só resumo básico; na prática você poderia devolver mais.
+    # A proposta completa (eventos + embedding) fica no servidor sob proposal_id.
     return EpisodeProposalOut(
+        proposal_id=proposal.proposal_id,
         user_id=proposal.user_id,
         summary=proposal.summary,
         topic=proposal.topic,
@@ -90,23 +94,17 @@ def propose_episode(user_id: str, topic: Optional[str] = None):
 
 
 @router.post("/users/{user_id}/episodes/confirm", response_model=Optional[EpisodicUnitOut])
-def confirm_episode(user_id: str, body: EpisodeConfirmIn):
+async def confirm_episode(user_id: str, body: EpisodeConfirmIn):
     """
     Recebe a decisão do usuário sobre salvar ou não a memória.
-    Obs: aqui simplifiquei: na prática, você atrelaria isso a um ID da proposta.
+    A proposta é recuperada pelo proposal_id, reaproveitando eventos e
+    embedding já calculados em /episodes/propose (sem re-embed).
     """
-    # Como exemplo, reconstruímos uma nova proposta só usando summary.
-    # Em um sistema real, você manteria a proposta em cache ou storage.
-    # Aqui, vamos assumir que acabou de ser proposta e estamos confirmando.
-    proposal = EpisodeProposal(
-        user_id=user_id,
-        events=[],
-        summary=body.summary,
-        embedding=memory_service._orchestrator.embedder.embed(body.summary),
-        topic=body.topic,
-    )
+    proposal = await memory_service.pop_proposal(body.proposal_id, user_id=user_id)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found or expired.")
 
-    eu = memory_service.confirm_episode(
+    eu = await memory_service.confirm_episode(
         proposal=proposal,
         user_confirmed=body.confirmed,
         importance_score=body.importance_score,
@@ -127,7 +125,7 @@ def confirm_episode(user_id: str, body: EpisodeConfirmIn):
 
 
 @router.get("/users/{user_id}/context", response_model=ContextResponse)
-def retrieve_context(user_id: str, query: str, top_k: int = 5):
+async def retrieve_context(user_id: str, query: str, top_k: int = 5):
     """
     Recupera episódios relevantes para a query.
     Implementa o fluxo:
@@ -135,7 +133,7 @@ def retrieve_context(user_id: str, query: str, top_k: int = 5):
       - busca vetorial por user_id
       - ARM.on_reuse em cada EU usado
     """
-    eus = memory_service.retrieve_context(
+    eus = await memory_service.retrieve_context(
         user_id=user_id,
         query_text=query,
         top_k=top_k,
@@ -1,8 +1,8 @@
 from __future__ import annotations
 from typing import List
 from dream.interfaces import Summarizer, Embedder
-from dream.models import MemoryEvent
-from dream.embedding import BagOfWordsEmbedder
+from dream.models import MemoryEvent, Embedding
+from dream.embedding import HashingEmbedder
 
 class StubSummarizerLLM(Summarizer):
     """
@@ -28,14 +28,23 @@ class StubSummarizerLLM(Summarizer):
 class StubEmbedderLLM(Embedder):
     """
     Embedding Adapter.
-    It could call a real embeddings model, but here we'll use the core's BagOfWordsEmbedder as a fallback.
+    It could call a real embeddings model, but here we'll use the core's HashingEmbedder as a fallback.
+    Lexical vectors are almost all zeros, so they are kept sparse by default.
     """
 
-    def __init__(self):
-        self._inner = BagOfWordsEmbedder()
+    def __init__(self, dim: int = 1024, sparse: bool = True):
+        self._inner = HashingEmbedder(dim=dim, sparse=sparse)
 
-    def embed(self, text: str) -> List[float]:
+    @property
+    def version(self) -> str:
+        return f"stub/{self._inner.version}"
+
+    def embed(self, text: str) -> Embedding:
         # Here it could include:
         #   - HTTP call to an embeddings service
         #   - or a call to a local model
         return self._inner.embed(text)
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        # One request / forward pass for the whole batch.
+        return self._inner.embed_batch(texts)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+import asyncio
+import logging
+import random
+import time
+from .memory_service import AsyncMemoryService
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PruneStats:
+    reclaimed: int = 0
+    slice_ms: float = 0.0
+    backlog: bool = False  # budget ran out before the due EUs were drained
+
+
+class PruneScheduler:
+    """
+    Background maintenance task that prunes expired EUs.
+    Each tick is a time-boxed slice: EUs are removed (on the service's
+    scoring executor) in batches of `batch_size` until nothing is due or
+    `slice_budget_ms` is spent, so a burst of expirations never turns into
+    one long pause.
+    The interval adapts: it halves while a backlog remains, doubles while
+    ticks reclaim nothing, and is jittered so workers don't line up.
+    """
+    def __init__(
+        self,
+        memory_service: AsyncMemoryService,
+        interval_sec: float = 30.0,
+        min_interval_sec: float = 1.0,
+        max_interval_sec: float = 600.0,
+        jitter: float = 0.2,
+        slice_budget_ms: float = 5.0,
+        batch_size: int = 128,
+    ):
+        self.memory_service = memory_service
+        self.interval_sec = interval_sec
+        self.min_interval_sec = min_interval_sec
+        self.max_interval_sec = max_interval_sec
+        self.jitter = jitter
+        self.slice_budget_ms = slice_budget_ms
+        self.batch_size = batch_size
+
+        self.ticks = 0
+        self.total_reclaimed = 0
+        self.last: PruneStats = PruneStats()
+        self._task: Optional[asyncio.Task] = None
+        self._rng = random.Random()
+
+    # ---------------- SLICE ----------------
+
+    async def tick(self) -> PruneStats:
+        start = time.perf_counter()
+        deadline = start + self.slice_budget_ms / 1000.0
+        reclaimed = 0
+        backlog = False
+        while True:
+            removed = await self.memory_service.prune_expired(limit=self.batch_size)
+            reclaimed += removed
+            if removed < self.batch_size:
+                break
+            if time.perf_counter() >= deadline:
+                backlog = True
+                break
+
+        stats = PruneStats(
+            reclaimed=reclaimed,
+            slice_ms=(time.perf_counter() - start) * 1000.0,
+            backlog=backlog,
+        )
+        self.ticks += 1
+        self.total_reclaimed += reclaimed
+        self.last = stats
+        if reclaimed:
+            logger.info(
+                "pruned %d expired EUs in %.2f ms%s",
+                reclaimed,
+                stats.slice_ms,
+                " (backlog remains)" if backlog else "",
+            )
+        self._adapt(stats)
+        return stats
+
+    def _adapt(self, stats: PruneStats) -> None:
+        if stats.backlog:
+            self.interval_sec = max(self.min_interval_sec, self.interval_sec / 2)
+        elif stats.reclaimed == 0:
+            self.interval_sec = min(self.max_interval_sec, self.interval_sec * 2)
+
+    def next_delay(self) -> float:
+        spread = self.interval_sec * self.jitter
+        return max(0.0, self.interval_sec + self._rng.uniform(-spread, spread))
+
+    # ---------------- LIFECYCLE ----------------
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.next_delay())
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("prune tick failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,9 +1,17 @@
 from __future__ import annotations
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
+import asyncio
 from datetime import datetime
 from dream.orchestrator import DreamOrchestrator
+from dream.async_orchestrator import AsyncDreamOrchestrator
+from dream.async_adapters import ThreadedSummarizer, ThreadedEmbedder, ThreadedVectorStore
 from dream.models import EpisodicUnit, EpisodeProposal
 from dream.arm import AdaptiveRetentionMechanism
+from dream.cache import CachedEmbedder
+from dream.arm_journal import ARMJournal
+from dream.quantization import memory_report, recall_delta
+from dream.metrics import Metrics
 from .llm_clients import StubSummarizerLLM, StubEmbedderLLM
 from .vector_clients import get_default_vector_store
 
@@ -15,19 +23,85 @@ class MemoryService:
     - build episode proposal
     - confirm/discard episode
     - retrieve context
+
+    With `arm_flush_interval_sec` set, ARM revisits are journaled and
+    written back in batches (see dream.arm_journal); `arm_wal_path` makes
+    the journal durable.
+
+    `vector_backend` / `vector_path` pick the store (see
+    get_default_vector_store). `quantization` ("int8" / "float16") needs
+    the "mmap" backend: it keeps reduced-precision rows resident and
+    rescores exactly from the segments; quantization_report() measures the
+    recall it costs on sample queries and the bytes resident per EU.
+
+    `query_cache_entries` caches that many query() results per user, so a
+    query repeated within a session skips the scan; ARM still applies to
+    every hit (see dream.query_cache).
+
+    Pass a dream.metrics.Metrics as `metrics` to time every stage
+    (metrics_text() renders it for Prometheus); without it the hooks are
+    no-ops.
+
+    `hybrid_retrieval` keeps a BM25 index of the EU summaries in step with
+    the store (confirmations, ARM updates, expiry) and retrieves with
+    dream_extensions' HybridRetrieval, fused by `fusion` ("rrf" or
+    "weighted").
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        embedding_cache_size: int = 10_000,
+        arm_flush_interval_sec: Optional[float] = None,
+        arm_wal_path: Optional[str] = None,
+        quantization: Optional[str] = None,
+        metrics: Optional[Metrics] = None,
+        query_cache_entries: Optional[int] = None,
+        vector_backend: str = "numpy",
+        vector_path: str = "dream_segments",
+        hybrid_retrieval: bool = False,
+        fusion: str = "rrf",
+    ):
         summarizer = StubSummarizerLLM()
-        embedder = StubEmbedderLLM()
-        vector_store = get_default_vector_store()
+        # chat sessions repeat the same queries, so identical texts are
+        # served from the cache.
+        embedder = CachedEmbedder(StubEmbedderLLM(), max_entries=embedding_cache_size)
+        self.bm25 = None
+        if hybrid_retrieval:
+            from dream_extensions.bm25 import BM25Index
+
+            self.bm25 = BM25Index()
+        vector_store = get_default_vector_store(
+            vector_backend,
+            path=vector_path,
+            quantization=quantization,
+            query_cache_entries=query_cache_entries,
+            lexical_index=self.bm25,
+        )
+        retrieval = None
+        if hybrid_retrieval:
+            from dream_extensions.retrieval_strategies import HybridRetrieval
+
+            retrieval = HybridRetrieval(vector_store, self.bm25, embedder=embedder, fusion=fusion)
         arm = AdaptiveRetentionMechanism()
 
+        arm_journal = None
+        if arm_flush_interval_sec is not None:
+            arm_journal = ARMJournal(
+                arm,
+                vector_store.update_ttl,
+                flush_interval_sec=arm_flush_interval_sec,
+                wal_path=arm_wal_path,
+            )
+            arm_journal.start()
+
         self._orchestrator = DreamOrchestrator(
             summarizer=summarizer,
             embedder=embedder,
             vector_store=vector_store,
             arm=arm,
+            arm_journal=arm_journal,
+            metrics=metrics,
+            retrieval=retrieval,
         )
 
     # Use case: set up user
@@ -77,6 +151,28 @@ class MemoryService:
             topic=topic,
         )
 
+    # Use case: build proposals for several users at once (one embedding batch)
+    def build_episode_proposals(
+        self,
+        user_ids: List[str],
+        topic: Optional[str] = None,
+    ) -> List[EpisodeProposal]:
+        return self._orchestrator.build_episode_proposals(
+            user_ids=user_ids,
+            topic=topic,
+        )
+
+    # Use case: take a pending proposal by ID (None if unknown, expired or not the user's)
+    def pop_proposal(
+        self,
+        proposal_id: str,
+        user_id: Optional[str] = None,
+    ) -> Optional[EpisodeProposal]:
+        return self._orchestrator.pop_proposal(
+            proposal_id=proposal_id,
+            user_id=user_id,
+        )
+
     # Use case: confirm/discard episode (user opt-in)
     def confirm_episode(
         self,
@@ -103,6 +199,247 @@ class MemoryService:
             top_k=top_k,
         )
 
+    # Use case: visits of a retrieved EU, including revisits not yet flushed
+    def visit_count(self, eu: EpisodicUnit) -> int:
+        return self._orchestrator.visit_count(eu)
+
+    # Use case: maintenance
+    def prune_expired(self, limit: Optional[int] = None) -> int:
+        return self._orchestrator.prune_expired(limit=limit)
+
+    def flush_arm(self) -> int:
+        return self._orchestrator.flush_arm()
+
+    # Use case: observability
+    def embedding_cache_stats(self) -> dict:
+        return self._orchestrator.embedder.stats()
+
+    def query_cache_stats(self) -> dict:
+        stats = getattr(self._orchestrator.vector_store, "stats", None)
+        return stats() if stats is not None else {}
+
+    def metrics_text(self) -> str:
+        return self._orchestrator.metrics.render()
+
+    def quantization_report(self, samples: List[Tuple[str, str]], top_k: int = 5) -> dict:
+        """
+        Recall@top_k of the configured store against an exact scan, over
+        (user_id, query_text) samples, and the bytes it holds per EU; see
+        dream.quantization.recall_delta and memory_report.
+        """
+        store = self._orchestrator.vector_store
+        embeddings = self._orchestrator.embedder.embed_batch([text for _, text in samples])
+        report = recall_delta(store, zip((u for u, _ in samples), embeddings), top_k=top_k)
+        report.update(memory_report(store))
+        report["quantization"] = getattr(store, "quantization", None)
+        return report
+
+    def close(self) -> None:
+        if self._orchestrator.arm_journal is not None:
+            self._orchestrator.arm_journal.close()
+
+
+class AsyncMemoryService:
+    """
+    Async twin of MemoryService for the API process.
+    Requests await the summarizer/embedder and the vector store instead of
+    holding a worker thread: similarity scoring runs on a dedicated,
+    bounded executor (`scoring_workers`), and the sync stub LLM clients on
+    a second one (`llm_workers`). Real async LLM clients can be passed in
+    place of the threaded adapters.
+
+    `arm_flush_interval_sec` / `arm_wal_path` journal ARM revisits as in
+    MemoryService; the journal writes back to the store behind the
+    scoring executor.
+    """
+
+    def __init__(
+        self,
+        embedding_cache_size: int = 10_000,
+        scoring_workers: int = 4,
+        llm_workers: int = 8,
+        arm_flush_interval_sec: Optional[float] = None,
+        arm_wal_path: Optional[str] = None,
+        quantization: Optional[str] = None,
+        metrics: Optional[Metrics] = None,
+        query_cache_entries: Optional[int] = None,
+        vector_backend: str = "numpy",
+        vector_path: str = "dream_segments",
+    ):
+        self._scoring_executor = ThreadPoolExecutor(
+            max_workers=scoring_workers, thread_name_prefix="dream-scoring"
+        )
+        self._llm_executor = ThreadPoolExecutor(
+            max_workers=llm_workers, thread_name_prefix="dream-llm"
+        )
+        summarizer = ThreadedSummarizer(StubSummarizerLLM(), self._llm_executor)
+        embedder = ThreadedEmbedder(
+            CachedEmbedder(StubEmbedderLLM(), max_entries=embedding_cache_size),
+            self._llm_executor,
+        )
+        vector_store = ThreadedVectorStore(
+            get_default_vector_store(
+                vector_backend,
+                path=vector_path,
+                quantization=quantization,
+                query_cache_entries=query_cache_entries,
+            ),
+            self._scoring_executor,
+        )
+        arm = AdaptiveRetentionMechanism()
+
+        arm_journal = None
+        if arm_flush_interval_sec is not None:
+            arm_journal = ARMJournal(
+                arm,
+                vector_store.inner.update_ttl,
+                flush_interval_sec=arm_flush_interval_sec,
+                wal_path=arm_wal_path,
+            )
+            arm_journal.start()
+
+        self._orchestrator = AsyncDreamOrchestrator(
+            summarizer=summarizer,
+            embedder=embedder,
+            vector_store=vector_store,
+            arm=arm,
+            metrics=metrics,
+            arm_journal=arm_journal,
+            arm_executor=self._scoring_executor,
+        )
+
+    # Use case: set up user
+    async def configure_user(
+        self,
+        user_id: str,
+        opted_in: bool = True,
+        max_buffer_events: int = 8,
+        max_buffer_age_sec: int = 600,
+    ) -> None:
+        self._orchestrator.configure_user(
+            user_id=user_id,
+            opted_in=opted_in,
+            max_buffer_events=max_buffer_events,
+            max_buffer_age_sec=max_buffer_age_sec,
+        )
+
+    # Use case: register interaction
+    async def record_interaction(
+        self,
+        user_id: str,
+        input_text: str,
+        output_text: str,
+        metadata: Optional[dict] = None,
+        now: Optional[datetime] = None,
+    ) -> None:
+        self._orchestrator.record_interaction(
+            user_id=user_id,
+            input_text=input_text,
+            output_text=output_text,
+            metadata=metadata,
+            now=now,
+        )
+
+    # Use case: check if it's time to propose an episode
+    async def should_propose_episode(self, user_id: str) -> bool:
+        return self._orchestrator.should_propose_episode(user_id)
+
+    # Use case: build proposal (summary + embedding)
+    async def build_episode_proposal(
+        self,
+        user_id: str,
+        topic: Optional[str] = None,
+    ) -> Optional[EpisodeProposal]:
+        return await self._orchestrator.build_episode_proposal(
+            user_id=user_id,
+            topic=topic,
+        )
+
+    # Use case: build proposals for several users at once (one embedding batch)
+    async def build_episode_proposals(
+        self,
+        user_ids: List[str],
+        topic: Optional[str] = None,
+    ) -> List[EpisodeProposal]:
+        return await self._orchestrator.build_episode_proposals(
+            user_ids=user_ids,
+            topic=topic,
+        )
+
+    # Use case: take a pending proposal by ID (None if unknown, expired or not the user's)
+    async def pop_proposal(
+        self,
+        proposal_id: str,
+        user_id: Optional[str] = None,
+    ) -> Optional[EpisodeProposal]:
+        return self._orchestrator.pop_proposal(
+            proposal_id=proposal_id,
+            user_id=user_id,
+        )
+
+    # Use case: confirm/discard episode (user opt-in)
+    async def confirm_episode(
+        self,
+        proposal: EpisodeProposal,
+        user_confirmed: bool,
+        importance_score: Optional[float] = None,
+    ) -> Optional[EpisodicUnit]:
+        return await self._orchestrator.confirm_episode(
+            proposal=proposal,
+            user_confirmed=user_confirmed,
+            importance_score=importance_score,
+        )
+
+    # Use case: retrieve relevant context
+    async def retrieve_context(
+        self,
+        user_id: str,
+        query_text: str,
+        top_k: int = 5,
+    ) -> List[EpisodicUnit]:
+        return await self._orchestrator.retrieve_context(
+            user_id=user_id,
+            query_text=query_text,
+            top_k=top_k,
+        )
+
+    # Use case: visits of a retrieved EU, including revisits not yet flushed
+    def visit_count(self, eu: EpisodicUnit) -> int:
+        return self._orchestrator.visit_count(eu)
+
     # Use case: maintenance
-    def prune_expired(self) -> None:
-        self._orchestrator.prune_expired()
+    async def prune_expired(self, limit: Optional[int] = None) -> int:
+        return await self._orchestrator.prune_expired(limit=limit)
+
+    async def flush_arm(self) -> int:
+        return await self._orchestrator.flush_arm()
+
+    # Use case: observability
+    def embedding_cache_stats(self) -> dict:
+        return self._orchestrator.embedder.inner.stats()
+
+    def query_cache_stats(self) -> dict:
+        stats = getattr(self._orchestrator.vector_store.inner, "stats", None)
+        return stats() if stats is not None else {}
+
+    def metrics_text(self) -> str:
+        return self._orchestrator.metrics.render()
+
+    async def quantization_report(self, samples: List[Tuple[str, str]], top_k: int = 5) -> dict:
+        store = self._orchestrator.vector_store.inner
+        embeddings = await self._orchestrator.embedder.embed_batch([text for _, text in samples])
+        report = await asyncio.get_running_loop().run_in_executor(
+            self._scoring_executor,
+            lambda: dict(
+                recall_delta(store, zip((u for u, _ in samples), embeddings), top_k=top_k),
+                **memory_report(store),
+            ),
+        )
+        report["quantization"] = getattr(store, "quantization", None)
+        return report
+
+    def close(self) -> None:
+        if self._orchestrator.arm_journal is not None:
+            self._orchestrator.arm_journal.close()
+        self._scoring_executor.shutdown(wait=True)
+        self._llm_executor.shutdown(wait=True)
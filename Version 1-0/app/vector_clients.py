@@ -1,10 +1,49 @@
 from __future__ import annotations
-from dream.store import InMemoryVectorStore
+from typing import Optional
+from dream.store import InMemoryVectorStore, NumpyVectorStore
+from dream.hnsw import HNSWVectorStore
+from dream.segments import MmapVectorStore
+from dream.query_cache import QueryCachedStore
 from dream.interfaces import VectorStore
 
-def get_default_vector_store() -> VectorStore:
+def get_default_vector_store(
+    backend: str = "numpy",
+    path: str = "dream_segments",
+    quantization: Optional[str] = None,
+    query_cache_entries: Optional[int] = None,
+    lexical_index=None,
+) -> VectorStore:
     """
     Factory for the default VectorStore.
+    - "numpy": matrix-backed store with vectorized top-k (default)
+    - "hnsw": approximate nearest-neighbour graph per user (sub-linear)
+    - "memory": plain Python store, one cosine call per EU
+    - "mmap": memory-mapped segment files under `path`, survives restarts
+    `quantization` ("int8" / "float16") applies to "mmap": the first pass
+    scores compact rows and the shortlist is rescored exactly from the
+    segments.
+    `query_cache_entries` puts a per-user query() result cache of that many
+    entries in front of the store (see dream.query_cache).
+    `lexical_index` (a dream_extensions.bm25.BM25Index) is fed every
+    write of the store, under the query cache, through LexicalIndexedStore.
     In production, you could swap it for an adapter for pgvector, Pinecone, Qdrant, etc.
     """
-    return InMemoryVectorStore()
+    if quantization is not None and backend != "mmap":
+        raise ValueError(f"Backend {backend!r} does not support quantization, use 'mmap'")
+    if backend == "numpy":
+        store = NumpyVectorStore()
+    elif backend == "hnsw":
+        store = HNSWVectorStore()
+    elif backend == "memory":
+        store = InMemoryVectorStore()
+    elif backend == "mmap":
+        store = MmapVectorStore(path, quantization=quantization)
+    else:
+        raise ValueError(f"Unknown vector store backend: {backend!r}")
+    if lexical_index is not None:
+        from dream_extensions.bm25 import LexicalIndexedStore
+
+        store = LexicalIndexedStore(store, lexical_index)
+    if query_cache_entries:
+        store = QueryCachedStore(store, max_entries_per_user=query_cache_entries)
+    return store
@@ -1,24 +1,85 @@
-from .models import MemoryEvent, EpisodicUnit, UserMemoryConfig, EpisodeProposal
-from .interfaces import Summarizer, Embedder, VectorStore
+from .models import (
+    MemoryEvent,
+    EpisodicUnit,
+    UserMemoryConfig,
+    EpisodeProposal,
+    UserState,
+    SparseVector,
+    Embedding,
+    compact_embedding,
+    embedding_nbytes,
+    memory_usage,
+)
+from .interfaces import (
+    Summarizer,
+    Embedder,
+    VectorStore,
+    AsyncSummarizer,
+    AsyncEmbedder,
+    AsyncVectorStore,
+)
 from .summarization import SimpleSummarizer
-from .embedding import BagOfWordsEmbedder, cosine_similarity
-from .store import InMemoryVectorStore
+from .embedding import BagOfWordsEmbedder, HashingEmbedder, cosine_similarity, sparse_dot
+from .store import InMemoryVectorStore, NumpyVectorStore
+from .hnsw import HNSWIndex, HNSWVectorStore
+from .segments import MmapVectorStore
+from .quantization import QuantizedRows, memory_report, recall_delta
+from .query_cache import QueryCachedStore
+from .cache import CachedEmbedder
+from .proposals import ProposalStore
+from .locking import StripedLock
+from .metrics import Metrics, NullMetrics
 from .arm import AdaptiveRetentionMechanism
-from .orchestrator import DreamOrchestrator, shard_for_user
+from .arm_journal import ARMJournal
+from .snapshot import SnapshotInfo
+from .orchestrator import DreamOrchestrator, shard_for_user, stable_hash
+from .async_orchestrator import AsyncDreamOrchestrator
+from .sharding import HashRing, ShardedOrchestrator, UserMovedError
 
 __all__ = [
     "MemoryEvent",
     "EpisodicUnit",
     "UserMemoryConfig",
     "EpisodeProposal",
+    "UserState",
+    "SparseVector",
+    "Embedding",
+    "compact_embedding",
+    "embedding_nbytes",
+    "memory_usage",
     "Summarizer",
     "Embedder",
     "VectorStore",
+    "AsyncSummarizer",
+    "AsyncEmbedder",
+    "AsyncVectorStore",
     "SimpleSummarizer",
     "BagOfWordsEmbedder",
+    "HashingEmbedder",
     "cosine_similarity",
+    "sparse_dot",
     "InMemoryVectorStore",
+    "NumpyVectorStore",
+    "HNSWIndex",
+    "HNSWVectorStore",
+    "MmapVectorStore",
+    "QuantizedRows",
+    "recall_delta",
+    "memory_report",
+    "QueryCachedStore",
+    "CachedEmbedder",
+    "ProposalStore",
+    "StripedLock",
+    "Metrics",
+    "NullMetrics",
     "AdaptiveRetentionMechanism",
+    "ARMJournal",
+    "SnapshotInfo",
     "DreamOrchestrator",
+    "AsyncDreamOrchestrator",
+    "ShardedOrchestrator",
+    "HashRing",
+    "UserMovedError",
     "shard_for_user",
+    "stable_hash",
 ]
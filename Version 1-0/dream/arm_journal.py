@@ -0,0 +1,203 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import json
+import os
+import threading
+import time
+from .models import EpisodicUnit
+from .arm import AdaptiveRetentionMechanism
+
+class _Pending:
+    __slots__ = ("eu", "visits", "last_seen")
+
+    def __init__(self, eu: EpisodicUnit, last_seen: datetime):
+        self.eu = eu
+        self.visits = 0
+        self.last_seen = last_seen
+
+
+class ARMJournal:
+    """
+    Write-behind buffer for ARM revisits on the retrieval hot path.
+    record() only counts a visit; repeated hits on the same EU are merged
+    and applied once per flush: visits += n and one TTL computed from the
+    latest hit, which is exactly what n on_reuse() calls would leave.
+    The batch is then handed to `sink` (the store's update_ttl) one
+    write per EU instead of one per hit.
+
+    A flush runs when `max_pending` EUs are waiting, when `record()`
+    notices `flush_interval_sec` has passed, or from the background
+    thread started by start(). `record(..., flush=False)` leaves a due
+    flush to the caller (check due()), e.g. to run it off an event loop.
+
+    Durability: with `wal_path` every visit is appended to a JSON-lines
+    log (os.fsync'ed when `fsync` is set) before record() returns, and
+    the log is truncated after each flush. replay() re-queues what a
+    crash left behind; a batch flushed right before the crash may be
+    applied twice. Without `wal_path`, a crash loses the visits of at
+    most one interval.
+
+    visits()/ttl() give a read-your-writes view that includes the visits
+    still waiting in the journal.
+
+    core/arm_journal.py at the repository root is the same algorithm over
+    the legacy EpisodicDB; the trees share no imports, so keep them in step.
+    """
+    def __init__(
+        self,
+        arm: AdaptiveRetentionMechanism,
+        sink: Callable[[EpisodicUnit], None],
+        max_pending: int = 1024,
+        flush_interval_sec: float = 1.0,
+        wal_path: Optional[str] = None,
+        fsync: bool = False,
+    ):
+        self.arm = arm
+        self.sink = sink
+        self.max_pending = max_pending
+        self.flush_interval_sec = flush_interval_sec
+        self.wal_path = wal_path
+        self.fsync = fsync
+
+        self._pending: Dict[int, _Pending] = {}  # id(eu) -> pending visits
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wal = open(wal_path, "a", encoding="utf-8") if wal_path else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.applied_visits = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # ---------------- WRITE PATH ----------------
+
+    def _queue(self, eu: EpisodicUnit, now: datetime) -> None:
+        entry = self._pending.get(id(eu))
+        if entry is None:
+            entry = _Pending(eu, now)
+            self._pending[id(eu)] = entry
+        entry.visits += 1
+        if now > entry.last_seen:
+            entry.last_seen = now
+
+    def due(self) -> bool:
+        return (
+            len(self._pending) >= self.max_pending
+            or time.monotonic() - self._last_flush >= self.flush_interval_sec
+        )
+
+    def record(self, eu: EpisodicUnit, now: Optional[datetime] = None, flush: bool = True) -> None:
+        now = now or datetime.utcnow()
+        with self._lock:
+            if self._wal is not None:
+                self._wal.write(
+                    json.dumps({"user_id": eu.user_id, "episode_id": eu.episode_id, "ts": now.timestamp()})
+                    + "\n"
+                )
+                self._wal.flush()
+                if self.fsync:
+                    os.fsync(self._wal.fileno())
+            self._queue(eu, now)
+            due = flush and self.due()
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Applies every pending revisit; returns how many EUs were written.
+        Runs under the journal lock so readers never see a visit twice or
+        not at all.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return 0
+            batch = list(self._pending.values())
+            for entry in batch:
+                eu = entry.eu
+                eu.visits += entry.visits
+                eu.ttl = self.arm.next_expiration(entry.last_seen, eu.visits)
+                self.sink(eu)
+                self.applied_visits += entry.visits
+            self._pending.clear()
+            self.flushes += 1
+            if self._wal is not None:
+                self._wal.truncate(0)
+                self._wal.flush()
+                if self.fsync:
+                    os.fsync(self._wal.fileno())
+            return len(batch)
+
+    # ---------------- READ-YOUR-WRITES ----------------
+
+    def pending_visits(self, eu: EpisodicUnit) -> int:
+        entry = self._pending.get(id(eu))
+        return entry.visits if entry is not None else 0
+
+    def visits(self, eu: EpisodicUnit) -> int:
+        with self._lock:
+            return eu.visits + self.pending_visits(eu)
+
+    def ttl(self, eu: EpisodicUnit) -> datetime:
+        with self._lock:
+            entry = self._pending.get(id(eu))
+            if entry is None:
+                return eu.ttl
+            return self.arm.next_expiration(entry.last_seen, eu.visits + entry.visits)
+
+    # ---------------- RECOVERY ----------------
+
+    def replay(self, resolve: Callable[[str, str], Optional[EpisodicUnit]]) -> int:
+        """
+        Re-queues the visits left in the log by a crash. `resolve` maps
+        (user_id, episode_id) back to a live EU; unknown EUs are skipped.
+        Returns the number of visits re-queued; call flush() to apply them.
+        """
+        if not self.wal_path or not os.path.exists(self.wal_path):
+            return 0
+        replayed = 0
+        with self._lock, open(self.wal_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                eu = resolve(rec["user_id"], rec["episode_id"])
+                if eu is None:
+                    continue
+                self._queue(eu, datetime.fromtimestamp(rec["ts"]))
+                replayed += 1
+        return replayed
+
+    # ---------------- LIFECYCLE ----------------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_sec):
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="arm-journal", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "applied_visits": self.applied_visits,
+        }
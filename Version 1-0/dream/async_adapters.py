@@ -0,0 +1,91 @@
+from __future__ import annotations
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import partial
+from typing import List, Optional, Tuple
+import asyncio
+from .models import EpisodicUnit, Embedding
+from .interfaces import (
+    Summarizer,
+    Embedder,
+    VectorStore,
+    AsyncSummarizer,
+    AsyncEmbedder,
+    AsyncVectorStore,
+)
+
+async def _run(executor: Optional[Executor], fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+
+class ThreadedSummarizer(AsyncSummarizer):
+    """
+    Runs a sync Summarizer on an executor (the loop default when None).
+    """
+    def __init__(self, inner: Summarizer, executor: Optional[Executor] = None):
+        self.inner = inner
+        self.executor = executor
+
+    async def summarize(self, events) -> str:
+        return await _run(self.executor, self.inner.summarize, events)
+
+
+class ThreadedEmbedder(AsyncEmbedder):
+    """
+    Runs a sync Embedder on an executor (the loop default when None).
+    A batch is a single executor hop.
+    """
+    def __init__(self, inner: Embedder, executor: Optional[Executor] = None):
+        self.inner = inner
+        self.executor = executor
+
+    async def embed(self, text: str) -> Embedding:
+        return await _run(self.executor, self.inner.embed, text)
+
+    async def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        embed_batch = getattr(self.inner, "embed_batch", None)
+        if embed_batch is None:
+            return await _run(self.executor, lambda: [self.inner.embed(t) for t in texts])
+        return await _run(self.executor, embed_batch, texts)
+
+
+class ThreadedVectorStore(AsyncVectorStore):
+    """
+    Runs a sync VectorStore's scoring and pruning on a dedicated, bounded
+    executor so similarity work never blocks the event loop and never
+    grows past `max_workers` threads. update_ttl is a heap push and stays
+    on the calling thread.
+    """
+    def __init__(self, inner: VectorStore, executor: Executor):
+        self.inner = inner
+        self.executor = executor
+
+    async def add_eu(self, eu: EpisodicUnit) -> None:
+        await _run(self.executor, self.inner.add_eu, eu)
+
+    async def query(
+        self,
+        user_id: str,
+        query_embedding: Embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        return await _run(
+            self.executor,
+            self.inner.query,
+            user_id=user_id,
+            query_embedding=query_embedding,
+            top_k=top_k,
+            now=now,
+        )
+
+    async def update_ttl(self, eu: EpisodicUnit) -> None:
+        self.inner.update_ttl(eu)
+
+    async def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        return await _run(self.executor, self.inner.delete_expired, now=now, limit=limit)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+import asyncio
+from .models import EpisodicUnit, EpisodeProposal
+from .interfaces import AsyncSummarizer, AsyncEmbedder, AsyncVectorStore
+from .arm import AdaptiveRetentionMechanism
+from .arm_journal import ARMJournal
+from .proposals import ProposalStore
+from .orchestrator import BaseOrchestrator
+from .metrics import Metrics
+
+class AsyncDreamOrchestrator(BaseOrchestrator):
+    """
+    Async flavour of DreamOrchestrator: summarizer, embedder and vector
+    store are awaited, so a request waiting on an LLM or on scoring holds
+    no thread. Buffers, configs, proposals and ARM are the same in-process
+    state as the sync orchestrator.
+    `arm_journal` must write to a sync sink (e.g. the update_ttl of the
+    store behind a ThreadedVectorStore); record() stays on the loop, as
+    update_ttl does without a journal, while flushes run on
+    `arm_executor` (the loop default when None).
+    """
+
+    def __init__(
+        self,
+        summarizer: AsyncSummarizer,
+        embedder: AsyncEmbedder,
+        vector_store: AsyncVectorStore,
+        arm: Optional[AdaptiveRetentionMechanism] = None,
+        proposal_store: Optional[ProposalStore] = None,
+        metrics: Optional[Metrics] = None,
+        arm_journal: Optional[ARMJournal] = None,
+        arm_executor: Optional[Executor] = None,
+    ):
+        super().__init__(arm=arm, proposal_store=proposal_store, metrics=metrics)
+        self.summarizer = summarizer
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.arm_journal = arm_journal
+        self.arm_executor = arm_executor
+
+    # ---------------- EPISODE (PROPOSAL + CONFIRMATION) ----------------
+
+    async def build_episode_proposal(
+        self,
+        user_id: str,
+        topic: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        proposals = await self.build_episode_proposals([user_id], topic=topic, now=now)
+        return proposals[0] if proposals else None
+
+    async def build_episode_proposals(
+        self,
+        user_ids: Iterable[str],
+        topic: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[EpisodeProposal]:
+        now = now or datetime.utcnow()
+        ready = self._take_buffers(user_ids)
+        if not ready:
+            return []
+        try:
+            with self.metrics.timer("summarize"):
+                summaries = list(
+                    await asyncio.gather(*(self.summarizer.summarize(buf) for _, buf in ready))
+                )
+            with self.metrics.timer("embed"):
+                if len(summaries) == 1:
+                    embeddings = [await self.embedder.embed(summaries[0])]
+                else:
+                    embeddings = await self.embedder.embed_batch(summaries)
+        except BaseException:
+            self._restore_buffers(ready)
+            raise
+        return self._register_proposals(ready, summaries, embeddings, topic, now)
+
+    async def confirm_episode(
+        self,
+        proposal: EpisodeProposal,
+        user_confirmed: bool,
+        importance_score: Optional[float] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodicUnit]:
+        if not user_confirmed:
+            return None
+
+        now = now or datetime.utcnow()
+        eu = self._new_eu(proposal, importance_score, now)
+        with self.metrics.timer("store_add"):
+            await self.vector_store.add_eu(eu)
+        self.metrics.inc("eus_confirmed")
+        return eu
+
+    # ---------------- RETRIEVAL ----------------
+
+    async def retrieve_context(
+        self,
+        user_id: str,
+        query_text: str,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[EpisodicUnit]:
+        now = now or datetime.utcnow()
+        cfg = self._get_config(user_id)
+        if not cfg.opted_in:
+            return []
+
+        with self.metrics.timer("retrieve"):
+            with self.metrics.timer("embed"):
+                query_emb = await self.embedder.embed(query_text)
+            with self.metrics.timer("store_query"):
+                results = await self.vector_store.query(
+                    user_id=user_id,
+                    query_embedding=query_emb,
+                    top_k=top_k,
+                    now=now,
+                )
+
+            with self.metrics.timer("arm_update"):
+                if self.arm_journal is not None:
+                    eus = self._journal_visits(user_id, results, now, flush=False)
+                    if self.arm_journal.due():
+                        await self.flush_arm()
+                    return eus
+
+                eus = self._on_reuse(user_id, results, now)
+                for eu in eus:
+                    await self.vector_store.update_ttl(eu)
+        return eus
+
+    # ---------------- MAINTENANCE ----------------
+
+    async def flush_arm(self) -> int:
+        if self.arm_journal is None:
+            return 0
+        return await asyncio.get_running_loop().run_in_executor(
+            self.arm_executor, self.arm_journal.flush
+        )
+
+    def replay_arm_journal(self, user_eus: Callable[[str], List[EpisodicUnit]]) -> int:
+        """
+        Re-queues revisits logged before a crash and applies them.
+        AsyncVectorStore has no user_eus, so pass the sync store's.
+        """
+        return self._replay_arm_journal(user_eus)
+
+    async def prune_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        with self.metrics.timer("prune"):
+            # pending revisits extend TTLs; apply them before anything is dropped
+            await self.flush_arm()
+            removed = await self.vector_store.delete_expired(now=now, limit=limit)
+        self.metrics.inc("pruned", removed)
+        return removed
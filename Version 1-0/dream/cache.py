@@ -0,0 +1,189 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import os
+import struct
+import threading
+import unicodedata
+from .models import Embedding, compact_embedding, embedding_nbytes
+from .interfaces import Embedder
+from .snapshot import decode_embeddings, encode_embeddings
+
+# File layout: MAGIC, format u16, embedder version (u32 length + utf-8),
+# then the entries (snapshot.encode_embeddings), oldest first.
+_MAGIC = b"DREAMEMB"
+_FORMAT = 1
+_HEADER = struct.Struct("<8sHI")
+
+class CachedEmbedder(Embedder):
+    """
+    Content-addressed LRU cache in front of any Embedder.
+    Keys are a blake2b hash of the embedder version plus the normalized text
+    (NFC, surrounding/repeated whitespace collapsed), so a version bump never
+    serves stale vectors. Bounded by entry count and, optionally, bytes.
+    Vectors are cached in compact form (dense lists become array('f')) and
+    are shared objects: callers must not mutate them.
+    Persisting only makes sense for embedders whose output is stable across
+    processes (HashingEmbedder, remote models), not BagOfWordsEmbedder.
+    The file holds keys and vectors only, never pickled objects.
+    """
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_entries: int = 10_000,
+        max_bytes: Optional[int] = None,
+        persist_path: Optional[str] = None,
+        version: Optional[str] = None,
+    ):
+        self.embedder = embedder
+        self.version = version or getattr(embedder, "version", type(embedder).__qualname__)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[bytes, Embedding]" = OrderedDict()
+        self._sizes: Dict[bytes, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if persist_path and os.path.exists(persist_path):
+            self.load(persist_path)
+
+    # ---------------- KEYS ----------------
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def _key(self, text: str) -> bytes:
+        payload = f"{self.version}\x00{self.normalize(text)}".encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    # ---------------- LRU ----------------
+
+    def _get(self, key: bytes) -> Optional[Embedding]:
+        emb = self._entries.get(key)
+        if emb is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return emb
+
+    def _put(self, key: bytes, emb: Embedding) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        size = embedding_nbytes(emb)
+        self._entries[key] = emb
+        self._sizes[key] = size
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    # ---------------- EMBEDDER ----------------
+
+    def embed(self, text: str) -> Embedding:
+        key = self._key(text)
+        with self._lock:
+            emb = self._get(key)
+        if emb is not None:
+            return emb
+        emb = compact_embedding(self.embedder.embed(text))
+        with self._lock:
+            self._put(key, emb)
+        return emb
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        keys = [self._key(text) for text in texts]
+        found: Dict[bytes, Embedding] = {}
+        missing: Dict[bytes, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                emb = self._get(key)
+                if emb is None:
+                    missing[key] = text
+                else:
+                    found[key] = emb
+
+        if missing:
+            miss_texts = list(missing.values())
+            embed_batch = getattr(self.embedder, "embed_batch", None)
+            if embed_batch is None:
+                fresh = [self.embedder.embed(text) for text in miss_texts]
+            else:
+                fresh = embed_batch(miss_texts)
+            fresh = [compact_embedding(emb) for emb in fresh]
+            with self._lock:
+                for key, emb in zip(missing, fresh):
+                    self._put(key, emb)
+                    found[key] = emb
+
+        return [found[key] for key in keys]
+
+    # ---------------- STATS / PERSISTENCE ----------------
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the cache (LRU order, oldest first) atomically to disk.
+        """
+        path = path or self.persist_path
+        if not path:
+            raise ValueError("No persist_path configured for CachedEmbedder")
+        with self._lock:
+            entries = list(self._entries.items())
+        version = self.version.encode("utf-8")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, _FORMAT, len(version)))
+            fh.write(version)
+            fh.write(encode_embeddings(entries))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        """
+        Loads a cache written by save(). A file from another embedder
+        version is ignored before its entries are decoded; any other file
+        raises ValueError.
+        """
+        with open(path, "rb") as fh:
+            raw = fh.read(_HEADER.size)
+            if len(raw) != _HEADER.size or raw[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"{path} is not a DREAM embedding cache")
+            _magic, fmt, version_len = _HEADER.unpack(raw)
+            if fmt > _FORMAT:
+                raise ValueError(f"embedding cache format {fmt} is newer than supported ({_FORMAT})")
+            if fh.read(version_len).decode("utf-8") != self.version:
+                return
+            entries = decode_embeddings(fh.read())
+        with self._lock:
+            for key, emb in entries:
+                self._put(key, emb)
@@ -1,10 +1,49 @@
 from __future__ import annotations
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import hashlib
 import math
+from .models import Embedding, SparseVector
 
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    if not a or not b:
+def sparse_dot(a: SparseVector, b: Embedding) -> float:
+    """
+    Dot product of a sparse vector with a sparse or dense one.
+    Sparse x sparse is a merge-join over the sorted indices;
+    sparse x dense only touches the non-zero entries of `a`.
+    """
+    ai, av = a.indices, a.values
+    if isinstance(b, SparseVector):
+        bi, bv = b.indices, b.values
+        i = j = 0
+        na, nb = len(ai), len(bi)
+        total = 0.0
+        while i < na and j < nb:
+            x, y = ai[i], bi[j]
+            if x == y:
+                total += av[i] * bv[j]
+                i += 1
+                j += 1
+            elif x < y:
+                i += 1
+            else:
+                j += 1
+        return total
+
+    size = len(b)
+    return sum(v * b[i] for i, v in zip(ai, av) if i < size)
+
+
+def vector_norm(v: Embedding) -> float:
+    values = v.values if isinstance(v, SparseVector) else v
+    return math.sqrt(sum(x * x for x in values))
+
+
+def cosine_similarity(a: Embedding, b: Embedding) -> float:
+    # len(), not truthiness: ndarray / memmap embeddings have no truth value
+    if a is None or b is None or len(a) == 0 or len(b) == 0:
         return 0.0
+    if isinstance(a, SparseVector) or isinstance(b, SparseVector):
+        num = sparse_dot(a, b) if isinstance(a, SparseVector) else sparse_dot(b, a)
+        return num / ((vector_norm(a) or 1.0) * (vector_norm(b) or 1.0))
     size = min(len(a), len(b))
     num = sum(a[i] * b[i] for i in range(size))
     den_a = math.sqrt(sum(a[i] * a[i] for i in range(size))) or 1.0
@@ -16,8 +55,10 @@ class BagOfWordsEmbedder:
     """
     Demo embedding to test the DREAM pattern.
     In production: replace with OpenAI, HF, etc.
+    With sparse=True, embed() returns a SparseVector.
     """
-    def __init__(self):
+    def __init__(self, sparse: bool = False):
+        self.sparse = sparse
         self._vocab: Dict[str, int] = {}
 
     def _tokenize(self, text: str) -> List[str]:
@@ -28,12 +69,100 @@ class BagOfWordsEmbedder:
             if tok not in self._vocab:
                 self._vocab[tok] = len(self._vocab)
 
-    def embed(self, text: str) -> List[float]:
+    def embed(self, text: str) -> Embedding:
         tokens = self._tokenize(text)
         self._ensure_vocab(tokens)
+        return self._vectorize(tokens)
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        # Vocabulary is extended once, so every vector in the batch has the same length.
+        token_lists = [self._tokenize(text) for text in texts]
+        for tokens in token_lists:
+            self._ensure_vocab(tokens)
+        return [self._vectorize(tokens) for tokens in token_lists]
+
+    def _vectorize(self, tokens: List[str]) -> Embedding:
+        if self.sparse:
+            counts: Dict[int, float] = {}
+            for tok in tokens:
+                idx = self._vocab[tok]
+                counts[idx] = counts.get(idx, 0.0) + 1.0
+            norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+            return SparseVector.from_dict(
+                {idx: v / norm for idx, v in counts.items()}, len(self._vocab)
+            )
         vec = [0.0] * len(self._vocab)
         for tok in tokens:
             idx = self._vocab[tok]
             vec[idx] += 1.0
         norm = math.sqrt(sum(v * v for v in vec)) or 1.0
         return [v / norm for v in vec]
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing embedding with a fixed dimension.
+    Tokens are mapped to buckets with a stable hash (blake2b), so vectors
+    never grow, are identical across processes and restarts, and every
+    stored vector is comparable with every other.
+    A second hash bit picks the sign, which keeps collisions unbiased.
+    With sparse=True, embed() returns a SparseVector.
+    """
+    def __init__(self, dim: int = 1024, signed: bool = True, sparse: bool = False):
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+        self.signed = signed
+        self.sparse = sparse
+
+    @property
+    def version(self) -> str:
+        # Identifies the vector space; caches keyed on it stay valid across restarts.
+        kind = "sparse" if self.sparse else "dense"
+        return f"hashing-blake2b-{self.dim}-{'signed' if self.signed else 'unsigned'}-{kind}"
+
+    def _tokenize(self, text: str) -> List[str]:
+        return [t.lower() for t in text.split() if t.strip()]
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        sign = -1.0 if self.signed and (h >> 63) & 1 else 1.0
+        return h % self.dim, sign
+
+    def embed_sparse(self, text: str) -> SparseVector:
+        """
+        Normalized vector with only the non-zero buckets.
+        """
+        return self._vectorize(self._tokenize(text), {})
+
+    def _vectorize(
+        self,
+        tokens: List[str],
+        buckets: Dict[str, Tuple[int, float]],
+    ) -> SparseVector:
+        counts: Dict[int, float] = {}
+        for tok in tokens:
+            bucket = buckets.get(tok)
+            if bucket is None:
+                bucket = buckets[tok] = self._bucket(tok)
+            idx, sign = bucket
+            counts[idx] = counts.get(idx, 0.0) + sign
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return SparseVector.from_dict(
+            {idx: v / norm for idx, v in counts.items()}, self.dim
+        )
+
+    def embed(self, text: str) -> Embedding:
+        sv = self.embed_sparse(text)
+        if self.sparse:
+            return sv
+        return sv.to_dense()
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        # Tokens repeated across the batch are hashed only once.
+        buckets: Dict[str, Tuple[int, float]] = {}
+        vectors = [self._vectorize(self._tokenize(text), buckets) for text in texts]
+        if self.sparse:
+            return vectors
+        return [sv.to_dense() for sv in vectors]
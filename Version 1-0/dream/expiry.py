@@ -0,0 +1,108 @@
+from __future__ import annotations
+from contextlib import nullcontext
+from heapq import heapify, heappop, heappush
+from typing import Callable, ContextManager, Dict, Hashable, List, Optional, Tuple
+import itertools
+import threading
+
+class ExpiryIndex:
+    """
+    Min-heap of TTL deadlines (POSIX seconds) with lazy invalidation.
+    Rescheduling a key (ARM extended its TTL) pushes a new entry and leaves
+    the old one behind as stale; stale entries are skipped when popped and
+    the heap is rebuilt once they outnumber live ones.
+    Pruning therefore only touches keys that are actually due.
+    Shared by every user of a store, so each operation holds a short lock.
+    Deadlines are the ones the owner last scheduled (add_eu / update_ttl):
+    a store masks queries and prunes on those, never on eu.ttl directly.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        with self._lock:
+            if self._deadlines.get(key) == deadline:
+                return
+            self._deadlines[key] = deadline
+            heappush(self._heap, (deadline, next(self._seq), key))
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._rebuild()
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            return self._deadlines.get(key)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def _rebuild(self) -> None:
+        self._heap = [
+            (deadline, next(self._seq), key)
+            for key, deadline in self._deadlines.items()
+        ]
+        heapify(self._heap)
+
+    def _drop_stale_head(self) -> None:
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+            heappop(heap)
+
+    def next_deadline(self) -> Optional[float]:
+        with self._lock:
+            self._drop_stale_head()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_ts: float, limit: Optional[int] = None) -> List[Hashable]:
+        """
+        Removes and returns keys whose deadline is <= now_ts, earliest first.
+        """
+        due: List[Hashable] = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now_ts:
+                if limit is not None and len(due) >= limit:
+                    break
+                deadline, _, key = heappop(heap)
+                if self._deadlines.get(key) != deadline:
+                    continue
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def drain(
+        self,
+        now_ts: float,
+        ttl_of: Callable[[Hashable], Optional[float]],
+        remove: Callable[[Hashable], None],
+        limit: Optional[int] = None,
+        lock_of: Optional[Callable[[Hashable], ContextManager]] = None,
+    ) -> int:
+        """
+        The prune loop of every store: pops up to `limit` keys due at now_ts
+        and calls remove(key) for each. ttl_of(key) is the owner's current
+        deadline for the key, None once it is gone; it is read again under
+        lock_of(key), so an update_ttl() that raced with the pop keeps the
+        key at its later deadline. Returns how many keys were removed.
+        """
+        removed = 0
+        for key in self.pop_due(now_ts, limit=limit):
+            with lock_of(key) if lock_of is not None else nullcontext():
+                ttl_ts = ttl_of(key)
+                if ttl_ts is None:
+                    continue
+                if ttl_ts > now_ts:
+                    self.schedule(key, ttl_ts)
+                    continue
+                remove(key)
+                removed += 1
+        return removed
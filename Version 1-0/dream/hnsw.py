@@ -0,0 +1,502 @@
+from __future__ import annotations
+from datetime import datetime
+from heapq import heapify, heappop, heappush
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import random
+import numpy as np
+from .models import EpisodicUnit
+from .interfaces import VectorStore
+from .store import as_float32
+from .expiry import ExpiryIndex
+from .locking import StripedLock
+from .snapshot import decode_eus, encode_eus
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph over cosine similarity.
+    Vectors are stored pre-normalized, so similarity is a dot product.
+    Nodes are dense integer ids in insertion order; deletes are tombstones
+    (the node keeps routing traffic but never shows up in results).
+    Not tied to users: a shared, cross-user index can pass an `accept`
+    filter to search().
+    """
+    def __init__(
+        self,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 50,
+        exact_threshold: int = 64,
+        seed: Optional[int] = None,
+    ):
+        if M < 2:
+            raise ValueError("M must be at least 2")
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        # Below this many nodes a linear scan is both exact and faster.
+        self.exact_threshold = exact_threshold
+        self._level_mult = 1.0 / math.log(M)
+        self._rng = random.Random(seed)
+
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._count = 0
+        self._levels: List[int] = []
+        self._links: List[List[List[int]]] = []
+        self._deleted = np.zeros(0, dtype=bool)
+        self._deleted_count = 0
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def live_count(self) -> int:
+        return self._count - self._deleted_count
+
+    @property
+    def deleted_count(self) -> int:
+        return self._deleted_count
+
+    # ---------------- STORAGE ----------------
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        capacity, cur_dim = self.vectors.shape
+        if rows <= capacity and dim <= cur_dim:
+            return
+        new_capacity = max(rows, capacity * 2, 16) if rows > capacity else capacity
+        new_dim = max(dim, cur_dim)
+        vectors = np.zeros((new_capacity, new_dim), dtype=np.float32)
+        vectors[: self._count, :cur_dim] = self.vectors[: self._count]
+        deleted = np.zeros(new_capacity, dtype=bool)
+        deleted[: self._count] = self._deleted[: self._count]
+        self.vectors = vectors
+        self._deleted = deleted
+
+    def _prepare(self, vector) -> np.ndarray:
+        q = as_float32(vector)
+        dim = self.vectors.shape[1]
+        if q.shape[0] < dim:
+            q = np.pad(q, (0, dim - q.shape[0]))
+        elif q.shape[0] > dim:
+            # zero-padded stored vectors contribute nothing past `dim`
+            norm = float(np.linalg.norm(q)) or 1.0
+            return q[:dim] / norm
+        norm = float(np.linalg.norm(q)) or 1.0
+        return q / norm
+
+    def _random_level(self) -> int:
+        return int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+
+    # ---------------- GRAPH ----------------
+
+    def _search_layer(
+        self,
+        q: np.ndarray,
+        entry_points: List[int],
+        ef: int,
+        level: int,
+        accept: Optional[Callable[[int], bool]] = None,
+    ) -> List[Tuple[float, int]]:
+        """
+        Best-first search on one layer. Returns up to `ef` (score, node)
+        pairs that pass `accept`, as a min-heap on score.
+        """
+        visited = set(entry_points)
+        scores = (self.vectors[entry_points] @ q).tolist()
+        candidates = [(-s, n) for s, n in zip(scores, entry_points)]
+        heapify(candidates)
+        results = [(s, n) for s, n in zip(scores, entry_points) if accept is None or accept(n)]
+        heapify(results)
+        while len(results) > ef:
+            heappop(results)
+
+        while candidates:
+            neg_score, node = heappop(candidates)
+            if len(results) >= ef and -neg_score < results[0][0]:
+                break
+            links = self._links[node]
+            if level >= len(links):
+                continue
+            fresh = [n for n in links[level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for n, s in zip(fresh, (self.vectors[fresh] @ q).tolist()):
+                if len(results) < ef or s > results[0][0]:
+                    heappush(candidates, (-s, n))
+                    if accept is None or accept(n):
+                        heappush(results, (s, n))
+                        if len(results) > ef:
+                            heappop(results)
+        return results
+
+    def _select_neighbors(self, found: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        HNSW neighbour heuristic: keep a candidate only if it is closer to
+        the base node than to every neighbour already kept. Produces sparse,
+        diverse links that keep the graph navigable.
+        """
+        selected: List[int] = []
+        for score, node in sorted(found, reverse=True):
+            if len(selected) >= m:
+                break
+            if selected:
+                closest = float(np.max(self.vectors[selected] @ self.vectors[node]))
+                if closest >= score:
+                    continue
+            selected.append(node)
+        return selected
+
+    def add(self, vector) -> int:
+        """
+        Inserts a vector and returns its node id.
+        """
+        raw = as_float32(vector)
+        node = self._count
+        self._reserve(node + 1, raw.shape[0])
+        q = self._prepare(raw)
+        self.vectors[node] = q
+        self._count += 1
+
+        level = self._random_level()
+        self._levels.append(level)
+        self._links.append([[] for _ in range(level + 1)])
+
+        if self.entry_point is None:
+            self.entry_point = node
+            self.max_level = level
+            return node
+
+        ep = [self.entry_point]
+        for lc in range(self.max_level, level, -1):
+            found = self._search_layer(q, ep, 1, lc)
+            ep = [max(found)[1]]
+
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(q, ep, self.ef_construction, lc)
+            neighbors = self._select_neighbors(found, self.M)
+            self._links[node][lc] = neighbors
+            m_max = self.M0 if lc == 0 else self.M
+            for n in neighbors:
+                links = self._links[n][lc]
+                links.append(node)
+                if len(links) > m_max:
+                    scores = (self.vectors[links] @ self.vectors[n]).tolist()
+                    self._links[n][lc] = self._select_neighbors(list(zip(scores, links)), m_max)
+            ep = [n for _, n in found]
+
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+        return node
+
+    def mark_deleted(self, node: int) -> None:
+        if not self._deleted[node]:
+            self._deleted[node] = True
+            self._deleted_count += 1
+
+    def is_deleted(self, node: int) -> bool:
+        return bool(self._deleted[node])
+
+    def search(
+        self,
+        query,
+        k: int,
+        ef: Optional[int] = None,
+        accept: Optional[Callable[[int], bool]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (node, score) pairs, best first. Tombstoned nodes and nodes
+        rejected by `accept` are skipped.
+        """
+        if self.entry_point is None or k <= 0:
+            return []
+        q = self._prepare(query)
+        deleted = self._deleted
+
+        def ok(n: int) -> bool:
+            return not deleted[n] and (accept is None or accept(n))
+
+        if self.live_count <= self.exact_threshold:
+            scores = (self.vectors[: self._count] @ q).tolist()
+            hits = [(s, n) for n, s in enumerate(scores) if ok(n)]
+        else:
+            ep = [self.entry_point]
+            for lc in range(self.max_level, 0, -1):
+                found = self._search_layer(q, ep, 1, lc)
+                ep = [max(found)[1]]
+            hits = self._search_layer(q, ep, max(ef or self.ef_search, k), 0, accept=ok)
+
+        hits.sort(key=lambda x: (-x[0], x[1]))
+        return [(n, s) for s, n in hits[:k]]
+
+    # ---------------- SERIALIZATION ----------------
+
+    def save(self, path: str) -> None:
+        """
+        Writes vectors, tombstones, levels and adjacency lists to one .npz
+        file. Adjacency is flattened into (counts, links) int32 arrays.
+        """
+        counts: List[int] = []
+        flat: List[int] = []
+        for node_links in self._links:
+            for level_links in node_links:
+                counts.append(len(level_links))
+                flat.extend(level_links)
+        params = np.array(
+            [
+                self.M,
+                self.ef_construction,
+                self.ef_search,
+                self.exact_threshold,
+                -1 if self.entry_point is None else self.entry_point,
+                self.max_level,
+            ],
+            dtype=np.int64,
+        )
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                params=params,
+                vectors=self.vectors[: self._count],
+                deleted=self._deleted[: self._count],
+                levels=np.asarray(self._levels, dtype=np.int32),
+                counts=np.asarray(counts, dtype=np.int32),
+                links=np.asarray(flat, dtype=np.int32),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWIndex":
+        with np.load(path) as data:
+            M, ef_c, ef_s, exact, entry, max_level = data["params"].tolist()
+            index = cls(M=M, ef_construction=ef_c, ef_search=ef_s, exact_threshold=exact)
+            vectors = data["vectors"]
+            index._count = vectors.shape[0]
+            index.vectors = np.array(vectors, dtype=np.float32)
+            index._deleted = np.array(data["deleted"], dtype=bool)
+            index._deleted_count = int(index._deleted.sum())
+            index._levels = data["levels"].tolist()
+            counts = data["counts"].tolist()
+            links = data["links"].tolist()
+        pos = 0
+        cursor = 0
+        for level in index._levels:
+            node_links = []
+            for _ in range(level + 1):
+                c = counts[cursor]
+                node_links.append(links[pos : pos + c])
+                pos += c
+                cursor += 1
+            index._links.append(node_links)
+        index.entry_point = None if entry < 0 else entry
+        index.max_level = max_level
+        return index
+
+
+class _UserGraph:
+    __slots__ = ("index", "eus", "ttls", "nodes")
+
+    def __init__(self, index: HNSWIndex):
+        self.index = index
+        # eus[node] is None once the node has been tombstoned
+        self.eus: List[Optional[EpisodicUnit]] = []
+        self.ttls: List[float] = []  # POSIX seconds, -inf once tombstoned
+        self.nodes: Dict[int, int] = {}  # id(eu) -> node
+
+    def append(self, eu: EpisodicUnit, vector, ttl_ts: float) -> None:
+        node = self.index.add(vector)
+        self.eus.append(eu)
+        self.ttls.append(ttl_ts)
+        self.nodes[id(eu)] = node
+
+
+class HNSWVectorStore(VectorStore):
+    """
+    Approximate nearest-neighbour store: one HNSW graph per user_id.
+    Retrieval cost grows roughly logarithmically with the user's EUs.
+    Expired EUs are tombstoned by delete_expired(), which pops due TTL
+    deadlines from an ExpiryIndex; a user's graph is rebuilt from live
+    nodes once tombstones exceed `compact_ratio`.
+    Each user's graph is read and written under that user's striped lock.
+    """
+    def __init__(
+        self,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 50,
+        exact_threshold: int = 64,
+        compact_ratio: float = 0.5,
+        lock_stripes: int = 64,
+    ):
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.exact_threshold = exact_threshold
+        self.compact_ratio = compact_ratio
+        self._by_user: Dict[str, _UserGraph] = {}
+        self._expiry = ExpiryIndex()
+        self._locks = StripedLock(lock_stripes)
+
+    def _new_index(self) -> HNSWIndex:
+        return HNSWIndex(
+            M=self.M,
+            ef_construction=self.ef_construction,
+            ef_search=self.ef_search,
+            exact_threshold=self.exact_threshold,
+        )
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        with self._locks.for_key(eu.user_id):
+            graph = self._by_user.get(eu.user_id)
+            if graph is None:
+                graph = _UserGraph(self._new_index())
+                self._by_user[eu.user_id] = graph
+            ttl_ts = eu.ttl.timestamp()
+            graph.append(eu, eu.embedding, ttl_ts)
+            self._expiry.schedule((eu.user_id, id(eu)), ttl_ts)
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        with self._locks.for_key(eu.user_id):
+            graph = self._by_user.get(eu.user_id)
+            node = graph.nodes.get(id(eu)) if graph else None
+            if node is not None:
+                graph.ttls[node] = eu.ttl.timestamp()
+                self._expiry.schedule((eu.user_id, id(eu)), graph.ttls[node])
+
+    def query(
+        self,
+        user_id: str,
+        query_embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+        ef: Optional[int] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        now_ts = (now or datetime.utcnow()).timestamp()
+        with self._locks.for_key(user_id):
+            graph = self._by_user.get(user_id)
+            if graph is None:
+                return []
+            eus, ttls = graph.eus, graph.ttls
+
+            def alive(n: int) -> bool:
+                return ttls[n] > now_ts
+
+            hits = graph.index.search(query_embedding, top_k, ef=ef, accept=alive)
+            return [(eus[n], score) for n, score in hits]
+
+    def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        now = now or datetime.utcnow()
+        touched = set()
+
+        def ttl_of(key) -> Optional[float]:
+            user_id, eu_key = key
+            graph = self._by_user.get(user_id)
+            node = graph.nodes.get(eu_key) if graph else None
+            return graph.ttls[node] if node is not None else None
+
+        def remove(key) -> None:
+            user_id, eu_key = key
+            graph = self._by_user[user_id]
+            node = graph.nodes.pop(eu_key)
+            graph.index.mark_deleted(node)
+            graph.eus[node] = None
+            graph.ttls[node] = float("-inf")
+            touched.add(user_id)
+
+        removed = self._expiry.drain(
+            now.timestamp(), ttl_of, remove, limit=limit,
+            lock_of=lambda key: self._locks.for_key(key[0]),
+        )
+
+        for user_id in touched:
+            with self._locks.for_key(user_id):
+                graph = self._by_user.get(user_id)
+                if graph is None:
+                    continue
+                index = graph.index
+                if index.live_count == 0:
+                    del self._by_user[user_id]
+                elif index.deleted_count > self.compact_ratio * len(index):
+                    self._compact(user_id, graph)
+        return removed
+
+    def user_ids(self) -> List[str]:
+        return list(self._by_user)
+
+    def user_eus(self, user_id: str) -> List[EpisodicUnit]:
+        with self._locks.for_key(user_id):
+            graph = self._by_user.get(user_id)
+            return [eu for eu in graph.eus if eu is not None] if graph else []
+
+    def drop_user(self, user_id: str) -> int:
+        with self._locks.for_key(user_id):
+            graph = self._by_user.pop(user_id, None)
+            if graph is None:
+                return 0
+            for eu_key in graph.nodes:
+                self._expiry.discard((user_id, eu_key))
+            return len(graph.nodes)
+
+    def _compact(self, user_id: str, graph: _UserGraph) -> None:
+        fresh = _UserGraph(self._new_index())
+        for node, eu in enumerate(graph.eus):
+            if eu is not None:
+                fresh.append(eu, graph.index.vectors[node], graph.ttls[node])
+        self._by_user[user_id] = fresh
+
+    # ---------------- PERSISTENCE ----------------
+
+    @staticmethod
+    def _file_key(user_id: str) -> str:
+        return hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+
+    def save(self, directory: str) -> None:
+        """
+        One <key>.npz graph plus <key>.eus.bin (snapshot EU layout) per
+        user and a manifest.json mapping file keys back to user ids.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest: Dict[str, str] = {}
+        for user_id in list(self._by_user):
+            with self._locks.for_key(user_id):
+                graph = self._by_user.get(user_id)
+                if graph is None:
+                    continue
+                key = self._file_key(user_id)
+                manifest[key] = user_id
+                graph.index.save(os.path.join(directory, f"{key}.npz"))
+                with open(os.path.join(directory, f"{key}.eus.bin"), "wb") as fh:
+                    fh.write(encode_eus(graph.eus))
+        with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh)
+
+    @classmethod
+    def load(cls, directory: str, **kwargs) -> "HNSWVectorStore":
+        """
+        Reads a directory written by save().
+        """
+        store = cls(**kwargs)
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        for key, user_id in manifest.items():
+            graph = _UserGraph(HNSWIndex.load(os.path.join(directory, f"{key}.npz")))
+            with open(os.path.join(directory, f"{key}.eus.bin"), "rb") as fh:
+                graph.eus = decode_eus(fh.read(), user_id)
+            graph.ttls = [float("-inf")] * len(graph.eus)
+            for node, eu in enumerate(graph.eus):
+                if eu is not None:
+                    graph.nodes[id(eu)] = node
+                    graph.ttls[node] = eu.ttl.timestamp()
+                    store._expiry.schedule((user_id, id(eu)), graph.ttls[node])
+            store._by_user[user_id] = graph
+        return store
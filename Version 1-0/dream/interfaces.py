@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import List, Protocol, Tuple, Optional
 from datetime import datetime
-from .models import EpisodicUnit
+from .models import EpisodicUnit, Embedding
 
 class Summarizer(Protocol):
     def summarize(self, events) -> str:
@@ -9,9 +9,13 @@ class Summarizer(Protocol):
 
 
 class Embedder(Protocol):
-    def embed(self, text: str) -> List[float]:
+    def embed(self, text: str) -> Embedding:
         ...
 
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        # Fallback for embedders without a native batch path.
+        return [self.embed(text) for text in texts]
+
 
 class VectorStore(Protocol):
     def add_eu(self, eu: EpisodicUnit) -> None:
@@ -20,11 +24,73 @@ class VectorStore(Protocol):
     def query(
         self,
         user_id: str,
-        query_embedding: List[float],
+        query_embedding: Embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        ...
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        # Called after ARM changes eu.ttl. Stores mask queries and prune on the
+        # deadline they were last given (add_eu / update_ttl), never on eu.ttl.
+        ...
+
+    def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        # Removes up to `limit` expired EUs (all when None); returns how many.
+        ...
+
+    def user_ids(self) -> List[str]:
+        ...
+
+    def user_eus(self, user_id: str) -> List[EpisodicUnit]:
+        # Live EUs of one user, used to migrate the user to another shard.
+        ...
+
+    def drop_user(self, user_id: str) -> int:
+        # Removes every EU of one user; returns how many.
+        ...
+
+
+# ---------------- ASYNC VARIANTS ----------------
+# Same contracts, awaitable. Real LLM / embedding clients implement these
+# natively; sync implementations are wrapped by dream.async_adapters.
+
+class AsyncSummarizer(Protocol):
+    async def summarize(self, events) -> str:
+        ...
+
+
+class AsyncEmbedder(Protocol):
+    async def embed(self, text: str) -> Embedding:
+        ...
+
+    async def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        ...
+
+
+class AsyncVectorStore(Protocol):
+    async def add_eu(self, eu: EpisodicUnit) -> None:
+        ...
+
+    async def query(
+        self,
+        user_id: str,
+        query_embedding: Embedding,
         top_k: int = 5,
         now: Optional[datetime] = None,
     ) -> List[Tuple[EpisodicUnit, float]]:
         ...
 
-    def delete_expired(self, now: Optional[datetime] = None) -> None:
+    async def update_ttl(self, eu: EpisodicUnit) -> None:
+        ...
+
+    async def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
         ...
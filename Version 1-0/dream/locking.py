@@ -0,0 +1,18 @@
+from __future__ import annotations
+from typing import Hashable
+import threading
+
+class StripedLock:
+    """
+    Fixed pool of re-entrant locks; a key always maps to the same stripe.
+    Different users almost always land on different stripes, so per-user
+    critical sections run in parallel without keeping a lock per user.
+    """
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: Hashable) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
@@ -0,0 +1,213 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+import time
+
+# seconds: 50 us .. 5 s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observe() is a bisect plus two additions
+    under a lock, so it can sit on the hot path.
+    """
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.hist.observe(time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Per-stage latency histograms, size histograms and counters for the
+    orchestrators, rendered in the Prometheus text exposition format.
+    Stages used by DreamOrchestrator: summarize, embed, store_add,
+    store_query, arm_update, retrieve, prune. Sizes: buffer_events (a
+    user's buffer length after each interaction; a distribution rather
+    than one series per user, which would not scale with user count).
+    """
+    enabled = True
+
+    def __init__(
+        self,
+        namespace: str = "dream",
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        size_buckets: Sequence[float] = SIZE_BUCKETS,
+    ):
+        self.namespace = namespace
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._stages: Dict[str, Histogram] = {}
+        self._sizes: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _hist(self, table: Dict[str, Histogram], name: str, bounds: Tuple[float, ...]) -> Histogram:
+        hist = table.get(name)
+        if hist is None:
+            with self._lock:
+                hist = table.setdefault(name, Histogram(bounds))
+        return hist
+
+    # ---------------- RECORDING ----------------
+
+    def timer(self, stage: str) -> _Timer:
+        return _Timer(self._hist(self._stages, stage, self.latency_buckets))
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self._hist(self._stages, stage, self.latency_buckets).observe(seconds)
+
+    def observe_size(self, name: str, value: float) -> None:
+        self._hist(self._sizes, name, self.size_buckets).observe(value)
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def merge(self, snapshot: dict) -> None:
+        """
+        Adds another Metrics' snapshot() into this one, e.g. to render the
+        shards of a ShardedOrchestrator as one registry. Bucket bounds
+        must match.
+        """
+        for key, table, bounds in (
+            ("stages", self._stages, self.latency_buckets),
+            ("sizes", self._sizes, self.size_buckets),
+        ):
+            for name, data in snapshot.get(key, {}).items():
+                hist = self._hist(table, name, bounds)
+                with hist._lock:
+                    for i, n in enumerate(data["buckets"]):
+                        hist.counts[i] += n
+                    hist.sum += data["sum"]
+                    hist.count += data["count"]
+        for name, value in snapshot.get("counters", {}).items():
+            self.inc(name, value)
+
+    # ---------------- EXPORT ----------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = dict(self._stages)
+            sizes = dict(self._sizes)
+            counters = dict(self._counters)
+        out = {"stages": {}, "sizes": {}, "counters": counters}
+        for key, table in (("stages", stages), ("sizes", sizes)):
+            for name, hist in table.items():
+                counts, total, count = hist.snapshot()
+                out[key][name] = {"count": count, "sum": total, "buckets": counts}
+        return out
+
+    def render(self) -> str:
+        """
+        Prometheus text format (version 0.0.4).
+        """
+        ns = self.namespace
+        with self._lock:
+            stages = sorted(self._stages.items())
+            sizes = sorted(self._sizes.items())
+            counters = sorted(self._counters.items())
+        lines: List[str] = []
+        if stages:
+            name = f"{ns}_stage_seconds"
+            lines.append(f"# HELP {name} Time spent per orchestrator stage.")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, hist in stages:
+                _render_histogram(lines, name, f'stage="{stage}"', hist)
+        for size, hist in sizes:
+            name = f"{ns}_{size}"
+            lines.append(f"# HELP {name} Distribution of {size.replace('_', ' ')}.")
+            lines.append(f"# TYPE {name} histogram")
+            _render_histogram(lines, name, "", hist)
+        for counter, value in counters:
+            name = f"{ns}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _render_histogram(lines: List[str], name: str, labels: str, hist: Histogram) -> None:
+    counts, total, count = hist.snapshot()
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, n in zip(hist.bounds, counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {total!r}")
+    lines.append(f"{name}_count{suffix} {count}")
+
+
+class NullMetrics(Metrics):
+    """
+    Metrics turned off: every call is a no-op, timer() hands out one
+    shared do-nothing context manager.
+    """
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def timer(self, stage: str) -> _NullTimer:
+        return _NULL_TIMER
+
+    def observe(self, stage: str, seconds: float) -> None:
+        return None
+
+    def observe_size(self, name: str, value: float) -> None:
+        return None
+
+    def inc(self, name: str, n: int = 1) -> None:
+        return None
+
+
+NULL_METRICS = NullMetrics()
@@ -1,9 +1,87 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import sys
+import uuid
 
-@dataclass
+# Model objects are slotted: no per-instance __dict__, which is most of the
+# fixed cost of an EU once embeddings are compact (see EpisodicUnit.nbytes).
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
+class SparseVector:
+    """
+    Sparse embedding as parallel index/value arrays, sorted by index.
+    Only non-zero entries are kept (4 + 4 bytes each), which is what
+    lexical embedders produce almost exclusively.
+    """
+    indices: array
+    values: array
+    dim: int
+
+    @classmethod
+    def from_dict(cls, mapping: Dict[int, float], dim: int) -> "SparseVector":
+        items = sorted((i, v) for i, v in mapping.items() if v != 0.0)
+        return cls(
+            indices=array("I", [i for i, _ in items]),
+            values=array("f", [v for _, v in items]),
+            dim=dim,
+        )
+
+    @classmethod
+    def from_dense(cls, vec: Sequence[float]) -> "SparseVector":
+        return cls.from_dict({i: v for i, v in enumerate(vec) if v != 0.0}, len(vec))
+
+    def to_dense(self) -> List[float]:
+        vec = [0.0] * self.dim
+        for i, v in zip(self.indices, self.values):
+            vec[i] = v
+        return vec
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def __len__(self) -> int:
+        return self.dim
+
+
+# Dense vector (list, array('f') or float32 ndarray) or SparseVector;
+# every store and similarity kernel accepts all of them.
+Embedding = Union[List[float], array, SparseVector]
+
+
+def compact_embedding(embedding: Embedding) -> Embedding:
+    """
+    Stored form of an embedding: dense lists/tuples become array('f')
+    (4 bytes per dim instead of ~32); arrays, ndarrays and SparseVectors
+    are kept as they are.
+    """
+    if isinstance(embedding, (list, tuple)):
+        return array("f", embedding)
+    return embedding
+
+
+def embedding_nbytes(embedding: Embedding) -> int:
+    """
+    Approximate payload size of an embedding.
+    Python lists are counted at ~32 bytes per float (pointer + float object).
+    """
+    if isinstance(embedding, SparseVector):
+        return (
+            len(embedding.indices) * embedding.indices.itemsize
+            + len(embedding.values) * embedding.values.itemsize
+        )
+    itemsize = getattr(embedding, "itemsize", None)
+    if itemsize is not None:
+        return len(embedding) * itemsize
+    return len(embedding) * 32
+
+
+@dataclass(**_SLOTS)
 class MemoryEvent:
     user_id: str
     timestamp: datetime
@@ -12,25 +90,52 @@ class MemoryEvent:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class EpisodicUnit:
     user_id: str
     episode_id: str
     summary: str
-    embedding: List[float]
+    embedding: Embedding
     timestamp: datetime
     ttl: datetime
     visits: int = 0
     topic: Optional[str] = None
     importance_score: Optional[float] = None
 
+    def __post_init__(self):
+        self.embedding = compact_embedding(self.embedding)
+
     def is_expired(self, now: Optional[datetime] = None) -> bool:
         from datetime import datetime as _dt
         now = now or _dt.utcnow()
         return now >= self.ttl
 
+    def nbytes(self) -> int:
+        """
+        Approximate resident size: the object, its strings and the
+        embedding payload (datetimes and small ints are shared/fixed).
+        """
+        size = sys.getsizeof(self) + embedding_nbytes(self.embedding)
+        for text in (self.user_id, self.episode_id, self.summary, self.topic):
+            if text is not None:
+                size += sys.getsizeof(text)
+        return size
+
+
+def memory_usage(eus: Iterable[EpisodicUnit]) -> Dict[str, int]:
+    """
+    Totals of EpisodicUnit.nbytes() over `eus`, with the embedding share
+    split out.
+    """
+    count = total = embeddings = 0
+    for eu in eus:
+        count += 1
+        total += eu.nbytes()
+        embeddings += embedding_nbytes(eu.embedding)
+    return {"eus": count, "bytes": total, "embedding_bytes": embeddings}
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class UserMemoryConfig:
     user_id: str
     opted_in: bool = True
@@ -38,11 +143,31 @@ class UserMemoryConfig:
     max_buffer_age_sec: int = 600
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class EpisodeProposal:
     user_id: str
     events: List[MemoryEvent]
     summary: str
-    embedding: List[float]
+    embedding: Embedding
     topic: Optional[str] = None
     created_at: datetime = field(default_factory=datetime.utcnow)
+    proposal_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def __post_init__(self):
+        self.embedding = compact_embedding(self.embedding)
+
+
+@dataclass(**_SLOTS)
+class UserState:
+    """
+    One user's orchestrator state as it moves between shards.
+    `eu_meta` lines up with the EUs copied before the cutover and carries
+    their latest (visits, ttl), or None when the EU was pruned meanwhile;
+    `eus` holds the EUs created after the copy started.
+    """
+    user_id: str
+    config: Optional[UserMemoryConfig] = None
+    buffer: List[MemoryEvent] = field(default_factory=list)
+    proposals: List[EpisodeProposal] = field(default_factory=list)
+    eus: List[EpisodicUnit] = field(default_factory=list)
+    eu_meta: List[Optional[Tuple[int, datetime]]] = field(default_factory=list)
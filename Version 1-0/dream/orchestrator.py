@@ -1,38 +1,69 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import hashlib
+import os
+import threading
 from .models import (
     MemoryEvent,
     EpisodicUnit,
     UserMemoryConfig,
     EpisodeProposal,
+    UserState,
+    Embedding,
 )
 from .interfaces import Summarizer, Embedder, VectorStore
 from .arm import AdaptiveRetentionMechanism
+from .arm_journal import ARMJournal
+from .proposals import ProposalStore
+from .locking import StripedLock
+from .metrics import Metrics, NULL_METRICS
+from . import snapshot
 
-class DreamOrchestrator:
+class BaseOrchestrator:
     """
-    Core of the DREAM pattern:
-    - event buffer per user
-    - EpisodicUnit proposal
-    - opt-in per episode
-    - ARM (adaptive TTL) on revisits
+    Per-user state shared by the sync and async orchestrators:
+    configs, event buffers, pending proposals and ARM.
+    Everything here is in-process and cheap; summarizer, embedder and
+    vector store calls live in the subclasses.
+    A user's buffer, config and EU visits/ttl only change under that
+    user's striped lock, so each user is linearizable while different
+    users run in parallel. Locks are never held across summarizer,
+    embedder or scoring calls.
+    `metrics` (dream.metrics.Metrics) times every stage; the default
+    NULL_METRICS turns each hook into a no-op.
+    With an `arm_journal` (set by the subclasses), revisits are coalesced
+    write-behind instead of applied per hit; use visit_count() to read
+    visits including pending ones.
     """
 
     def __init__(
         self,
-        summarizer: Summarizer,
-        embedder: Embedder,
-        vector_store: VectorStore,
         arm: Optional[AdaptiveRetentionMechanism] = None,
+        proposal_store: Optional[ProposalStore] = None,
+        metrics: Optional[Metrics] = None,
     ):
-        self.summarizer = summarizer
-        self.embedder = embedder
-        self.vector_store = vector_store
         self.arm = arm or AdaptiveRetentionMechanism()
+        self.proposals = proposal_store or ProposalStore()
+        self.metrics = metrics or NULL_METRICS
+        self.arm_journal: Optional[ARMJournal] = None
 
         self._buffers: Dict[str, List[MemoryEvent]] = {}
         self._configs: Dict[str, UserMemoryConfig] = {}
+        self._locks = StripedLock()
+
+        # users changed since the last snapshot (see save_snapshot)
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+
+    def _touch(self, user_id: str) -> None:
+        with self._dirty_lock:
+            self._dirty.add(user_id)
+
+    def _take_dirty(self) -> Set[str]:
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
 
     # ---------------- CONFIG USER ----------------
 
@@ -43,25 +74,30 @@ class DreamOrchestrator:
         max_buffer_events: int = 8,
         max_buffer_age_sec: int = 600,
     ) -> None:
-        self._configs[user_id] = UserMemoryConfig(
-            user_id=user_id,
-            opted_in=opted_in,
-            max_buffer_events=max_buffer_events,
-            max_buffer_age_sec=max_buffer_age_sec,
-        )
+        with self._locks.for_key(user_id):
+            self._configs[user_id] = UserMemoryConfig(
+                user_id=user_id,
+                opted_in=opted_in,
+                max_buffer_events=max_buffer_events,
+                max_buffer_age_sec=max_buffer_age_sec,
+            )
+            self._touch(user_id)
 
     def set_opt_in(self, user_id: str, opted_in: bool) -> None:
-        cfg = self._configs.get(user_id)
-        if cfg is None:
-            cfg = UserMemoryConfig(user_id=user_id, opted_in=opted_in)
-            self._configs[user_id] = cfg
-        else:
-            cfg.opted_in = opted_in
+        with self._locks.for_key(user_id):
+            cfg = self._configs.get(user_id)
+            if cfg is None:
+                cfg = UserMemoryConfig(user_id=user_id, opted_in=opted_in)
+                self._configs[user_id] = cfg
+            else:
+                cfg.opted_in = opted_in
+            self._touch(user_id)
 
     def _get_config(self, user_id: str) -> UserMemoryConfig:
-        if user_id not in self._configs:
-            self._configs[user_id] = UserMemoryConfig(user_id=user_id)
-        return self._configs[user_id]
+        with self._locks.for_key(user_id):
+            if user_id not in self._configs:
+                self._configs[user_id] = UserMemoryConfig(user_id=user_id)
+            return self._configs[user_id]
 
     # ---------------- EVENTS ----------------
 
@@ -74,10 +110,6 @@ class DreamOrchestrator:
         now: Optional[datetime] = None,
     ) -> None:
         now = now or datetime.utcnow()
-        cfg = self._get_config(user_id)
-        if not cfg.opted_in:
-            return
-
         ev = MemoryEvent(
             user_id=user_id,
             timestamp=now,
@@ -85,8 +117,16 @@ class DreamOrchestrator:
             output_text=output_text,
             metadata=metadata or {},
         )
-        buf = self._buffers.setdefault(user_id, [])
-        buf.append(ev)
+        with self._locks.for_key(user_id):
+            cfg = self._get_config(user_id)
+            if not cfg.opted_in:
+                return
+            buf = self._buffers.setdefault(user_id, [])
+            buf.append(ev)
+            size = len(buf)
+            self._touch(user_id)
+        self.metrics.inc("interactions")
+        self.metrics.observe_size("buffer_events", size)
 
     def _get_buffer_age_sec(self, user_id: str, now: datetime) -> float:
         buf = self._buffers.get(user_id, [])
@@ -97,15 +137,206 @@ class DreamOrchestrator:
 
     def should_propose_episode(self, user_id: str, now: Optional[datetime] = None) -> bool:
         now = now or datetime.utcnow()
-        cfg = self._get_config(user_id)
-        buf = self._buffers.get(user_id, [])
-        if not buf:
+        with self._locks.for_key(user_id):
+            cfg = self._get_config(user_id)
+            buf = self._buffers.get(user_id, [])
+            if not buf:
+                return False
+            if len(buf) >= cfg.max_buffer_events:
+                return True
+            if self._get_buffer_age_sec(user_id, now) >= cfg.max_buffer_age_sec:
+                return True
             return False
-        if len(buf) >= cfg.max_buffer_events:
-            return True
-        if self._get_buffer_age_sec(user_id, now) >= cfg.max_buffer_age_sec:
-            return True
-        return False
+
+    # ---------------- EPISODE HELPERS ----------------
+
+    def _take_buffers(self, user_ids: Iterable[str]) -> List[Tuple[str, List[MemoryEvent]]]:
+        """
+        Detaches every non-empty buffer of an opted-in user. Events recorded
+        while the batch is being summarized start a fresh buffer.
+        """
+        ready: List[Tuple[str, List[MemoryEvent]]] = []
+        for user_id in dict.fromkeys(user_ids):
+            with self._locks.for_key(user_id):
+                cfg = self._get_config(user_id)
+                if not cfg.opted_in:
+                    continue
+                buf = self._buffers.get(user_id, [])
+                if buf:
+                    self._buffers[user_id] = []
+                    ready.append((user_id, buf))
+                    self._touch(user_id)
+        return ready
+
+    def _restore_buffers(self, ready: List[Tuple[str, List[MemoryEvent]]]) -> None:
+        # summarize/embed failed: put the events back in front of any newer ones
+        for user_id, buf in ready:
+            with self._locks.for_key(user_id):
+                self._buffers[user_id] = buf + self._buffers.get(user_id, [])
+                self._touch(user_id)
+
+    def _on_reuse(self, user_id: str, results, now: datetime) -> List[EpisodicUnit]:
+        """
+        Applies ARM to retrieved EUs under the user's lock, so concurrent
+        retrievals never lose a visit. Returns the EUs in result order.
+        """
+        eus: List[EpisodicUnit] = []
+        with self._locks.for_key(user_id):
+            for eu, _sim in results:
+                self.arm.on_reuse(eu, now)
+                eus.append(eu)
+            if eus:
+                self._touch(user_id)
+        self.metrics.inc("arm_revisits", len(eus))
+        return eus
+
+    def _journal_visits(
+        self, user_id: str, results, now: datetime, flush: bool = True
+    ) -> List[EpisodicUnit]:
+        """
+        Journal counterpart of _on_reuse(): records each hit for the next
+        flush. Returns the EUs in result order. With flush=False a due
+        flush is left to the caller (see ARMJournal.due()).
+        """
+        eus = [eu for eu, _sim in results]
+        for eu in eus:
+            self.arm_journal.record(eu, now, flush=flush)
+        if eus:
+            self._touch(user_id)
+        self.metrics.inc("arm_revisits", len(eus))
+        return eus
+
+    def visit_count(self, eu: EpisodicUnit) -> int:
+        if self.arm_journal is None:
+            return eu.visits
+        return self.arm_journal.visits(eu)
+
+    def flush_arm(self) -> int:
+        if self.arm_journal is None:
+            return 0
+        return self.arm_journal.flush()
+
+    def _replay_arm_journal(self, user_eus) -> int:
+        if self.arm_journal is None:
+            return 0
+        by_user: Dict[str, Dict[str, EpisodicUnit]] = {}
+
+        def resolve(user_id: str, episode_id: str) -> Optional[EpisodicUnit]:
+            if user_id not in by_user:
+                by_user[user_id] = {eu.episode_id: eu for eu in user_eus(user_id)}
+            return by_user[user_id].get(episode_id)
+
+        replayed = self.arm_journal.replay(resolve)
+        self.arm_journal.flush()
+        return replayed
+
+    def _register_proposals(
+        self,
+        ready: List[Tuple[str, List[MemoryEvent]]],
+        summaries: List[str],
+        embeddings: List[Embedding],
+        topic: Optional[str],
+        now: datetime,
+    ) -> List[EpisodeProposal]:
+        proposals: List[EpisodeProposal] = []
+        for (user_id, buf), summary, emb in zip(ready, summaries, embeddings):
+            proposal = EpisodeProposal(
+                user_id=user_id,
+                events=buf,
+                summary=summary,
+                embedding=emb,
+                topic=topic,
+                created_at=now,
+            )
+            self.proposals.put(proposal, now=now)
+            proposals.append(proposal)
+            self._touch(user_id)
+        self.metrics.inc("proposals", len(proposals))
+        return proposals
+
+    def pop_proposal(
+        self,
+        proposal_id: str,
+        user_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        proposal = self.proposals.pop(proposal_id, user_id=user_id, now=now)
+        if proposal is not None:
+            self._touch(proposal.user_id)
+        return proposal
+
+    def _new_eu(
+        self,
+        proposal: EpisodeProposal,
+        importance_score: Optional[float],
+        now: datetime,
+    ) -> EpisodicUnit:
+        eu = EpisodicUnit(
+            user_id=proposal.user_id,
+            # proposal ids are unique, timestamps are not
+            episode_id=f"eu_{now.timestamp()}_{proposal.proposal_id[:8]}",
+            summary=proposal.summary,
+            embedding=proposal.embedding,
+            timestamp=proposal.created_at,
+            ttl=now,  # ARM vai ajustar
+            visits=0,
+            topic=proposal.topic,
+            importance_score=importance_score,
+        )
+        self.arm.initialize_eu(eu, now)
+        self._touch(eu.user_id)
+        return eu
+
+
+class DreamOrchestrator(BaseOrchestrator):
+    """
+    Core of the DREAM pattern:
+    - event buffer per user
+    - EpisodicUnit proposal
+    - opt-in per episode
+    - ARM (adaptive TTL) on revisits
+
+    `arm_journal=True` builds an ARMJournal on this store's update_ttl;
+    an ARMJournal can also be passed in.
+    `retrieval` replaces the embed + query step of retrieve_context() with
+    retrieval.retrieve_scored(user_id, query_text, top_k, now), e.g. the
+    HybridRetrieval of dream_extensions; ARM applies to its results as usual.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        embedder: Embedder,
+        vector_store: VectorStore,
+        arm: Optional[AdaptiveRetentionMechanism] = None,
+        proposal_store: Optional[ProposalStore] = None,
+        arm_journal: Union[ARMJournal, bool, None] = None,
+        metrics: Optional[Metrics] = None,
+        retrieval=None,
+    ):
+        super().__init__(arm=arm, proposal_store=proposal_store, metrics=metrics)
+        self.summarizer = summarizer
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.retrieval = retrieval
+        if arm_journal is True:
+            arm_journal = ARMJournal(self.arm, vector_store.update_ttl)
+        self.arm_journal = arm_journal or None
+
+        # user_id -> EU snapshot being exported / EUs copied in, see MIGRATION
+        self._exports: Dict[str, List[EpisodicUnit]] = {}
+        self._staged: Dict[str, List[EpisodicUnit]] = {}
+        self._snapshot_seq = 0
+
+    # ---------------- EMBEDDING ----------------
+
+    def _embed_many(self, texts: List[str]) -> List[Embedding]:
+        if len(texts) == 1:
+            return [self.embedder.embed(texts[0])]
+        embed_batch = getattr(self.embedder, "embed_batch", None)
+        if embed_batch is None:
+            return [self.embedder.embed(text) for text in texts]
+        return embed_batch(texts)
 
     # ---------------- EPISODE (PROPOSAL + CONFIRMATION) ----------------
 
@@ -115,30 +346,35 @@ class DreamOrchestrator:
         topic: Optional[str] = None,
         now: Optional[datetime] = None,
     ) -> Optional[EpisodeProposal]:
-        now = now or datetime.utcnow()
-        cfg = self._get_config(user_id)
-        if not cfg.opted_in:
-            return None
+        proposals = self.build_episode_proposals([user_id], topic=topic, now=now)
+        return proposals[0] if proposals else None
 
-        buf = self._buffers.get(user_id, [])
-        if not buf:
-            return None
-
-        summary = self.summarizer.summarize(buf)
-        emb = self.embedder.embed(summary)
-
-        proposal = EpisodeProposal(
-            user_id=user_id,
-            events=list(buf),
-            summary=summary,
-            embedding=emb,
-            topic=topic,
-            created_at=now,
-        )
-
-        # this segment has been "closed"
-        self._buffers[user_id] = []
-        return proposal
+    def build_episode_proposals(
+        self,
+        user_ids: Iterable[str],
+        topic: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[EpisodeProposal]:
+        """
+        Bulk variant: summarizes every ready buffer and embeds all
+        summaries in a single embed_batch call.
+        Every proposal is registered in the proposal store under its
+        proposal_id until it is confirmed, discarded or expires.
+        """
+        now = now or datetime.utcnow()
+        # this segment is "closed" as soon as it is taken
+        ready = self._take_buffers(user_ids)
+        if not ready:
+            return []
+        try:
+            with self.metrics.timer("summarize"):
+                summaries = [self.summarizer.summarize(buf) for _, buf in ready]
+            with self.metrics.timer("embed"):
+                embeddings = self._embed_many(summaries)
+        except Exception:
+            self._restore_buffers(ready)
+            raise
+        return self._register_proposals(ready, summaries, embeddings, topic, now)
 
     def confirm_episode(
         self,
@@ -151,19 +387,10 @@ class DreamOrchestrator:
             return None
 
         now = now or datetime.utcnow()
-        eu = EpisodicUnit(
-            user_id=proposal.user_id,
-            episode_id=f"eu_{now.timestamp()}",
-            summary=proposal.summary,
-            embedding=proposal.embedding,
-            timestamp=proposal.created_at,
-            ttl=now,  # ARM vai ajustar
-            visits=0,
-            topic=proposal.topic,
-            importance_score=importance_score,
-        )
-        self.arm.initialize_eu(eu, now)
-        self.vector_store.add_eu(eu)
+        eu = self._new_eu(proposal, importance_score, now)
+        with self.metrics.timer("store_add"):
+            self.vector_store.add_eu(eu)
+        self.metrics.inc("eus_confirmed")
         return eu
 
     # ---------------- RETRIEVAL ----------------
@@ -180,25 +407,236 @@ class DreamOrchestrator:
         if not cfg.opted_in:
             return []
 
-        query_emb = self.embedder.embed(query_text)
-        results = self.vector_store.query(
-            user_id=user_id,
-            query_embedding=query_emb,
-            top_k=top_k,
-            now=now,
-        )
+        with self.metrics.timer("retrieve"):
+            if self.retrieval is not None:
+                with self.metrics.timer("store_query"):
+                    results = self.retrieval.retrieve_scored(user_id, query_text, top_k, now=now)
+            else:
+                with self.metrics.timer("embed"):
+                    query_emb = self.embedder.embed(query_text)
+                with self.metrics.timer("store_query"):
+                    results = self.vector_store.query(
+                        user_id=user_id,
+                        query_embedding=query_emb,
+                        top_k=top_k,
+                        now=now,
+                    )
 
-        eus: List[EpisodicUnit] = []
-        for eu, _sim in results:
-            self.arm.on_reuse(eu, now)
-            eus.append(eu)
+            with self.metrics.timer("arm_update"):
+                if self.arm_journal is not None:
+                    return self._journal_visits(user_id, results, now)
+
+                eus = self._on_reuse(user_id, results, now)
+                for eu in eus:
+                    self.vector_store.update_ttl(eu)
         return eus
 
     # ---------------- MAINTENANCE ----------------
 
-    def prune_expired(self, now: Optional[datetime] = None) -> None:
-        self.vector_store.delete_expired(now=now)
+    def replay_arm_journal(self) -> int:
+        """
+        Re-queues revisits logged before a crash (journal with wal_path)
+        and applies them.
+        """
+        return self._replay_arm_journal(self.vector_store.user_eus)
+
+    def prune_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        # pending revisits extend TTLs; apply them before anything is dropped
+        with self.metrics.timer("prune"):
+            self.flush_arm()
+            removed = self.vector_store.delete_expired(now=now, limit=limit)
+        self.metrics.inc("pruned", removed)
+        return removed
+
+    # ---------------- MIGRATION ----------------
+    # A user moves between shards in two phases. While the source keeps
+    # serving the user, its EUs are copied in chunks from a snapshot
+    # (begin_export / export_chunk -> stage_eus). At the cutover the source
+    # hands over everything else and forgets the user (release_user ->
+    # import_user); only the snapshot's (visits, ttl) and the EUs created
+    # meanwhile travel at that point.
+
+    def user_ids(self) -> List[str]:
+        users = dict.fromkeys(self._configs)
+        users.update(dict.fromkeys(self._buffers))
+        users.update(dict.fromkeys(self.vector_store.user_ids()))
+        return list(users)
+
+    def begin_export(self, user_id: str) -> int:
+        snapshot = self.vector_store.user_eus(user_id)
+        self._exports[user_id] = snapshot
+        return len(snapshot)
+
+    def export_chunk(self, user_id: str, start: int, stop: int) -> List[EpisodicUnit]:
+        return self._exports[user_id][start:stop]
+
+    def stage_eus(self, user_id: str, eus: List[EpisodicUnit]) -> None:
+        self._staged.setdefault(user_id, []).extend(eus)
+
+    def release_user(self, user_id: str) -> UserState:
+        """
+        Cutover on the source: returns the user's remaining state and drops
+        the user. The snapshot stays staged here, so import_user() with the
+        returned state rolls the release back.
+        """
+        self.flush_arm()
+        with self._locks.for_key(user_id):
+            snapshot = self._exports.pop(user_id, [])
+            copied = {id(eu) for eu in snapshot}
+            live = self.vector_store.user_eus(user_id)
+            live_ids = {id(eu) for eu in live}
+            state = UserState(
+                user_id=user_id,
+                config=self._configs.get(user_id),
+                buffer=self._buffers.get(user_id, []),
+                proposals=self.proposals.pop_user(user_id),
+                eus=[eu for eu in live if id(eu) not in copied],
+                eu_meta=[
+                    (eu.visits, eu.ttl) if id(eu) in live_ids else None
+                    for eu in snapshot
+                ],
+            )
+            self.drop_user(user_id)
+            self._staged[user_id] = snapshot
+            return state
+
+    def import_user(self, state: UserState) -> None:
+        """
+        Cutover on the target: applies `state` on top of the staged EUs.
+        State the target already holds for the user wins over `state.config`.
+        """
+        user_id = state.user_id
+        with self._locks.for_key(user_id):
+            staged = self._staged.pop(user_id, [])
+            for eu, meta in zip(staged, state.eu_meta):
+                if meta is None:
+                    continue
+                eu.visits, eu.ttl = meta
+                self.vector_store.add_eu(eu)
+            for eu in state.eus:
+                self.vector_store.add_eu(eu)
+            if state.config is not None:
+                self._configs.setdefault(user_id, state.config)
+            if state.buffer:
+                self._buffers[user_id] = state.buffer + self._buffers.get(user_id, [])
+            for proposal in state.proposals:
+                self.proposals.put(proposal)
+            self._touch(user_id)
+
+    def discard_staged(self, user_id: str) -> None:
+        self._exports.pop(user_id, None)
+        self._staged.pop(user_id, None)
+
+    def drop_user(self, user_id: str) -> None:
+        with self._locks.for_key(user_id):
+            self._configs.pop(user_id, None)
+            self._buffers.pop(user_id, None)
+            self.proposals.pop_user(user_id)
+            self.vector_store.drop_user(user_id)
+            self._touch(user_id)
+
+    # ---------------- SNAPSHOT ----------------
+
+    def _user_state(self, user_id: str) -> Optional[UserState]:
+        with self._locks.for_key(user_id):
+            state = UserState(
+                user_id=user_id,
+                config=self._configs.get(user_id),
+                buffer=list(self._buffers.get(user_id, [])),
+                proposals=self.proposals.for_user(user_id),
+                eus=self.vector_store.user_eus(user_id),
+            )
+        if state.config is None and not (state.buffer or state.proposals or state.eus):
+            return None
+        return state
+
+    def save_snapshot(self, path: str, incremental: bool = False) -> snapshot.SnapshotInfo:
+        """
+        Writes the orchestrator state to `path` in the binary snapshot
+        format (dream.snapshot), one user at a time. An incremental
+        snapshot only holds users changed since the previous snapshot
+        (written or restored) and must be restored on top of it.
+        EUs removed by prune_expired() alone do not mark a user changed;
+        they are past their TTL and go away on the next prune.
+        """
+        self.flush_arm()
+        if incremental and self._snapshot_seq == 0:
+            raise ValueError("incremental snapshot needs a previous snapshot")
+        dirty = self._take_dirty()
+        users = dirty if incremental else set(self.user_ids()) | dirty
+        info = snapshot.SnapshotInfo(
+            kind=snapshot.INCREMENTAL if incremental else snapshot.FULL,
+            seq=self._snapshot_seq + 1,
+            base_seq=self._snapshot_seq if incremental else 0,
+            created_at=datetime.utcnow(),
+        )
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                snapshot.write_header(fh, info.kind, info.seq, info.base_seq, info.created_at)
+                for user_id in users:
+                    state = self._user_state(user_id)
+                    if state is None:
+                        snapshot.write_drop(fh, user_id)
+                        info.dropped += 1
+                    else:
+                        snapshot.write_user(fh, state)
+                        info.users += 1
+                snapshot.write_end(fh)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            # not written: these users still have to go in the next snapshot
+            with self._dirty_lock:
+                self._dirty |= dirty
+            raise
+        self._snapshot_seq = info.seq
+        return info
+
+    def restore_snapshot(self, path: str) -> snapshot.SnapshotInfo:
+        """
+        Streams a snapshot back in, replacing the state of every user it
+        contains. Restore a full snapshot into a fresh orchestrator, then
+        its incremental snapshots in order.
+        Raises ValueError on reaching a user that is being migrated in
+        (EUs staged, cutover pending): replacing it would lose the copy.
+        """
+        with open(path, "rb") as fh:
+            info = snapshot.read_header(fh)
+            if info.kind == snapshot.INCREMENTAL and info.base_seq != self._snapshot_seq:
+                raise ValueError(
+                    f"incremental snapshot {info.seq} applies on top of {info.base_seq}, "
+                    f"current state is at {self._snapshot_seq}"
+                )
+            for tag, record in snapshot.iter_records(fh):
+                user_id = record.user_id if tag == snapshot.TAG_USER else record
+                if user_id in self._staged:
+                    raise ValueError(f"user {user_id!r} is being migrated in; finish or discard it first")
+                if tag == snapshot.TAG_USER:
+                    self.drop_user(record.user_id)
+                    self.import_user(record)
+                    info.users += 1
+                else:
+                    self.drop_user(record)
+                    info.dropped += 1
+        self._take_dirty()
+        self._snapshot_seq = info.seq
+        return info
+
+
+def stable_hash(key: str) -> int:
+    """
+    64-bit blake2b hash. Unlike hash(), it does not change with
+    PYTHONHASHSEED, so every process routes a user to the same shard.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
 
 
 def shard_for_user(user_id: str, total_shards: int) -> int:
-    return hash(user_id) % total_shards
+    return stable_hash(user_id) % total_shards
@@ -0,0 +1,107 @@
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import threading
+from .models import EpisodeProposal
+
+class ProposalStore:
+    """
+    Bounded, TTL-evicted registry of pending EpisodeProposals, keyed by
+    proposal_id. Confirming reuses the stored summary, events and embedding
+    instead of rebuilding the proposal.
+    Proposals share one TTL, so insertion order is usually expiry order and
+    eviction only ever looks at the oldest entries. Entries inserted out of
+    created_at order (import_user, restore_snapshot) can sit behind a live
+    one, so get() and pop() also check the TTL of the entry they return.
+    Proposal ids are also indexed by user, so for_user() and pop_user()
+    only touch that user's proposals.
+    """
+    def __init__(self, max_entries: int = 10_000, ttl_sec: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_sec)
+        self._items: "OrderedDict[str, EpisodeProposal]" = OrderedDict()
+        self._by_user: Dict[str, Dict[str, None]] = {}  # user_id -> proposal ids, in order
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _unindex(self, proposal: EpisodeProposal) -> None:
+        ids = self._by_user[proposal.user_id]
+        del ids[proposal.proposal_id]
+        if not ids:
+            del self._by_user[proposal.user_id]
+
+    def _remove(self, proposal: EpisodeProposal) -> None:
+        del self._items[proposal.proposal_id]
+        self._unindex(proposal)
+
+    def _evict(self, now: datetime) -> None:
+        while self._items:
+            oldest = next(iter(self._items.values()))
+            if len(self._items) <= self.max_entries and oldest.created_at + self.ttl > now:
+                break
+            self._remove(oldest)
+
+    def _live(self, proposal_id: str, now: datetime) -> Optional[EpisodeProposal]:
+        proposal = self._items.get(proposal_id)
+        if proposal is not None and proposal.created_at + self.ttl <= now:
+            self._remove(proposal)
+            return None
+        return proposal
+
+    def put(self, proposal: EpisodeProposal, now: Optional[datetime] = None) -> None:
+        now = now or datetime.utcnow()
+        with self._lock:
+            previous = self._items.get(proposal.proposal_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._items[proposal.proposal_id] = proposal
+            self._items.move_to_end(proposal.proposal_id)
+            self._by_user.setdefault(proposal.user_id, {})[proposal.proposal_id] = None
+            self._evict(now)
+
+    def get(
+        self,
+        proposal_id: str,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._evict(now)
+            return self._live(proposal_id, now)
+
+    def pop(
+        self,
+        proposal_id: str,
+        user_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        """
+        Removes and returns a live proposal. When user_id is given, a
+        proposal owned by someone else is neither returned nor removed.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._evict(now)
+            proposal = self._live(proposal_id, now)
+            if proposal is None:
+                return None
+            if user_id is not None and proposal.user_id != user_id:
+                return None
+            self._remove(proposal)
+            return proposal
+
+    def for_user(self, user_id: str) -> List[EpisodeProposal]:
+        with self._lock:
+            return [self._items[pid] for pid in self._by_user.get(user_id, ())]
+
+    def pop_user(self, user_id: str) -> List[EpisodeProposal]:
+        """
+        Removes and returns every pending proposal of one user (used when
+        the user migrates to another shard or is dropped).
+        """
+        with self._lock:
+            ids = self._by_user.pop(user_id, {})
+            return [self._items.pop(pid) for pid in ids]
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import mmap
+import numpy as np
+from .interfaces import VectorStore
+from .models import Embedding, embedding_nbytes
+
+QUANTIZATIONS = ("int8", "float16")
+
+# rows decoded to float32 per block while scoring, bounds the temporary copy
+_BLOCK_ROWS = 4096
+
+
+def check_quantization(mode: Optional[str]) -> Optional[str]:
+    if mode is not None and mode not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {mode!r}, expected one of {QUANTIZATIONS}")
+    return mode
+
+
+class QuantizedRows:
+    """
+    Growable matrix of unit-normalized rows in reduced precision.
+    - "int8": per-row symmetric scale (max |x| / 127), 1 byte per dim
+    - "float16": 2 bytes per dim, no scale
+    Scores are approximate (int8 error is about 1/254 of the row's largest
+    component per dim); stores use them for a first pass and rescore the
+    shortlist at full precision.
+    """
+    __slots__ = ("mode", "codes", "scales")
+
+    def __init__(self, mode: str, dim: int, capacity: int):
+        self.mode = check_quantization(mode)
+        dtype = np.int8 if mode == "int8" else np.float16
+        self.codes = np.zeros((capacity, dim), dtype=dtype)
+        self.scales = np.ones(capacity, dtype=np.float32)
+
+    @property
+    def dim(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.mode == "int8" else 0)
+
+    def reserve(self, rows: int, dim: int, size: int) -> None:
+        capacity, cur_dim = self.codes.shape
+        if rows <= capacity and dim <= cur_dim:
+            return
+        new_capacity = max(rows, capacity * 2) if rows > capacity else capacity
+        codes = np.zeros((new_capacity, max(dim, cur_dim)), dtype=self.codes.dtype)
+        codes[:size, :cur_dim] = self.codes[:size]
+        scales = np.ones(new_capacity, dtype=np.float32)
+        scales[:size] = self.scales[:size]
+        self.codes = codes
+        self.scales = scales
+
+    def set(self, row: int, unit: np.ndarray) -> None:
+        n = unit.shape[0]
+        self.codes[row] = 0
+        if self.mode == "float16":
+            self.codes[row, :n] = unit
+            return
+        peak = float(np.max(np.abs(unit))) if n else 0.0
+        scale = peak / 127.0 if peak > 0.0 else 1.0
+        self.codes[row, :n] = np.rint(unit / scale)
+        self.scales[row] = scale
+
+    def move(self, dst: int, src: int) -> None:
+        self.codes[dst] = self.codes[src]
+        self.scales[dst] = self.scales[src]
+
+    def clear(self, row: int) -> None:
+        self.codes[row] = 0
+        self.scales[row] = 1.0
+
+    def scores(self, q: np.ndarray, size: int) -> np.ndarray:
+        """
+        Approximate dot products of rows [0, size) with `q` (float32,
+        at most dim long), decoded block by block.
+        """
+        dim = min(q.shape[0], self.dim)
+        q = q[:dim]
+        out = np.empty(size, dtype=np.float32)
+        for start in range(0, size, _BLOCK_ROWS):
+            stop = min(size, start + _BLOCK_ROWS)
+            block = self.codes[start:stop, :dim].astype(np.float32)
+            out[start:stop] = block @ q
+        if self.mode == "int8":
+            out *= self.scales[:size]
+        return out
+
+
+def shortlist_size(top_k: int, rescore_factor: int, candidates: int) -> int:
+    return min(candidates, max(top_k, top_k * rescore_factor))
+
+
+def exact_scores(vectors: Sequence[np.ndarray], q: np.ndarray) -> np.ndarray:
+    """
+    Full-precision cosine of each vector with the unit query `q`, comparing
+    vectors of different lengths as if zero-padded.
+    """
+    out = np.empty(len(vectors), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        dim = min(vec.shape[0], q.shape[0])
+        norm = float(np.linalg.norm(vec)) or 1.0
+        out[i] = float(vec[:dim] @ q[:dim]) / norm
+    return out
+
+
+# ---------------- RECALL ----------------
+
+def recall_delta(
+    store: VectorStore,
+    samples: Iterable[Tuple[str, object]],
+    top_k: int = 5,
+    now: Optional[datetime] = None,
+) -> Dict[str, float]:
+    """
+    Recall@top_k of store.query() against an exact full-precision scan of
+    the same user's live EUs, over (user_id, query_embedding) samples.
+    recall_delta is what quantization costs (0.0 = identical results).
+    """
+    from .store import as_float32  # store.py imports this module
+
+    now = now or datetime.utcnow()
+    hits = expected = queries = 0
+    for user_id, query_embedding in samples:
+        q = as_float32(query_embedding)
+        q = q / (float(np.linalg.norm(q)) or 1.0)
+        live = [eu for eu in store.user_eus(user_id) if eu.ttl > now]
+        if not live:
+            continue
+        scores = exact_scores([as_float32(eu.embedding) for eu in live], q)
+        k = min(top_k, len(live))
+        exact = {id(live[i]) for i in np.argsort(-scores, kind="stable")[:k]}
+        got = {id(eu) for eu, _sim in store.query(user_id, query_embedding, top_k=top_k, now=now)}
+        hits += len(exact & got)
+        expected += k
+        queries += 1
+    recall = hits / expected if expected else 1.0
+    return {
+        "queries": queries,
+        "hits": hits,
+        "expected": expected,
+        "recall": recall,
+        "recall_delta": 1.0 - recall,
+    }
+
+
+# ---------------- MEMORY ----------------
+
+def _mapped(embedding: Embedding) -> bool:
+    base = embedding
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return isinstance(base, mmap.mmap)
+
+
+def memory_report(store: VectorStore) -> Dict[str, float]:
+    """
+    What a store costs per EU: its index (index_nbytes(), when it has one)
+    plus the EU objects and their embeddings. Embeddings that are views of
+    a file mapping count as mapped_bytes, not resident: the OS pages them.
+    """
+    index_fn = getattr(store, "index_nbytes", None)
+    index = index_fn() if index_fn is not None else 0
+    count = eu_bytes = mapped = 0
+    for user_id in store.user_ids():
+        for eu in store.user_eus(user_id):
+            count += 1
+            size = eu.nbytes()
+            if _mapped(eu.embedding):
+                emb = embedding_nbytes(eu.embedding)
+                size -= emb
+                mapped += emb
+            eu_bytes += size
+    resident = index + eu_bytes
+    return {
+        "eus": count,
+        "index_bytes": index,
+        "eu_bytes": eu_bytes,
+        "mapped_bytes": mapped,
+        "resident_bytes": resident,
+        "bytes_per_eu": resident / count if count else 0.0,
+    }
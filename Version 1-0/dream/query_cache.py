@@ -0,0 +1,227 @@
+from __future__ import annotations
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import threading
+import numpy as np
+from .models import EpisodicUnit, Embedding, SparseVector
+from .interfaces import VectorStore
+from .expiry import ExpiryIndex
+
+
+def embedding_key(embedding: Embedding) -> bytes:
+    """
+    Stable digest of a query embedding's float32 contents.
+    """
+    if isinstance(embedding, SparseVector):
+        payload = embedding.indices.tobytes() + embedding.values.tobytes() + str(embedding.dim).encode()
+    elif isinstance(embedding, np.ndarray):
+        payload = np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
+    elif isinstance(embedding, array) and embedding.typecode == "f":
+        payload = embedding.tobytes()
+    else:
+        payload = array("f", embedding).tobytes()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class _UserCache:
+    __slots__ = ("generation", "entries")
+
+    def __init__(self):
+        self.generation = 0
+        # (embedding key, top_k) -> (generation, computed at, results)
+        self.entries: "OrderedDict[Tuple[bytes, int], Tuple[int, datetime, List[Tuple[EpisodicUnit, float]]]]" = OrderedDict()
+
+
+class QueryCachedStore(VectorStore):
+    """
+    Per-user LRU of query() results in front of any VectorStore, keyed by
+    (query embedding digest, top_k) and tagged with the user's generation.
+    add_eu, drop_user and refresh bump the generation, and so does
+    update_ttl for an EU outside every cached result: a TTL change can
+    only change the ranking by reviving an EU. Extending a cached hit (ARM
+    on_reuse after retrieve_context) keeps the cache warm; the orchestrator
+    still runs on_reuse on every hit, so retention is unchanged.
+    Like the stores, hits are masked on the deadlines given via add_eu /
+    update_ttl, never on eu.ttl; an EU first met in a result (added before
+    the wrap, or replayed from disk) is taken at the TTL it was served at.
+    Expiry needs no bump: a hit is served only for a `now` at or after the
+    one it was computed for and while every cached EU is before its
+    deadline, and EUs expiring below the top_k cannot change it. Each entry
+    is scheduled at the earliest deadline among its EUs, so delete_expired()
+    drops the entries that reference pruned EUs instead of keeping them in
+    memory. drop_user() and a prune that empties a user's cache forget the
+    user; close() forgets everything.
+    """
+    def __init__(self, inner: VectorStore, max_entries_per_user: int = 32):
+        self.inner = inner
+        self.max_entries_per_user = max_entries_per_user
+        self.hits = 0
+        self.misses = 0
+        self._users: Dict[str, _UserCache] = {}
+        self._expiry = ExpiryIndex()  # (user_id, entry key) -> earliest EU deadline
+        self._deadlines = ExpiryIndex()  # (user_id, id(eu)) -> deadline from add_eu / update_ttl
+        self._lock = threading.Lock()
+
+    def _clear(self, user_id: str, cache: _UserCache) -> None:
+        for key in cache.entries:
+            self._expiry.discard((user_id, key))
+        cache.entries.clear()
+
+    def _alive(self, user_id: str, results, now_ts: float) -> bool:
+        for eu, _sim in results:
+            deadline = self._deadlines.deadline((user_id, id(eu)))
+            if deadline is None or now_ts >= deadline:
+                return False
+        return True
+
+    def _schedule(self, user_id: str, key, results) -> None:
+        earliest = None
+        for eu, _sim in results:
+            deadline = self._deadlines.deadline((user_id, id(eu)))
+            if deadline is None:
+                deadline = eu.ttl.timestamp()
+                self._deadlines.schedule((user_id, id(eu)), deadline)
+            earliest = deadline if earliest is None else min(earliest, deadline)
+        self._expiry.schedule((user_id, key), earliest)
+
+    def _bump(self, user_id: str) -> None:
+        # no cache means no entry and no scan in flight for this user
+        with self._lock:
+            cache = self._users.get(user_id)
+            if cache is not None:
+                cache.generation += 1
+                self._clear(user_id, cache)
+
+    # ---------------- WRITES ----------------
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        self.inner.add_eu(eu)
+        self._deadlines.schedule((eu.user_id, id(eu)), eu.ttl.timestamp())
+        self._bump(eu.user_id)
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        self.inner.update_ttl(eu)
+        self._deadlines.schedule((eu.user_id, id(eu)), eu.ttl.timestamp())
+        with self._lock:
+            cache = self._users.get(eu.user_id)
+            if cache is None or not cache.entries:
+                return
+            cached = [
+                key for key, (_gen, _at, results) in cache.entries.items()
+                if any(hit is eu for hit, _sim in results)
+            ]
+            if not cached:
+                cache.generation += 1
+                self._clear(eu.user_id, cache)
+            for key in cached:
+                self._schedule(eu.user_id, key, cache.entries[key][2])
+
+    def delete_expired(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> int:
+        now = now or datetime.utcnow()
+        removed = self.inner.delete_expired(now=now, limit=limit)
+        # a deadline forgotten early only turns a hit into a miss
+        self._deadlines.pop_due(now.timestamp())
+        with self._lock:
+            for user_id, key in self._expiry.pop_due(now.timestamp()):
+                cache = self._users.get(user_id)
+                if cache is None:
+                    continue
+                cache.entries.pop(key, None)
+                if not cache.entries:
+                    del self._users[user_id]
+        return removed
+
+    def drop_user(self, user_id: str) -> int:
+        for eu in self.inner.user_eus(user_id):
+            self._deadlines.discard((user_id, id(eu)))
+        removed = self.inner.drop_user(user_id)
+        with self._lock:
+            cache = self._users.pop(user_id, None)
+            if cache is not None:
+                self._clear(user_id, cache)
+        return removed
+
+    # ---------------- READS ----------------
+
+    def query(
+        self,
+        user_id: str,
+        query_embedding: Embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        now = now or datetime.utcnow()
+        key = (embedding_key(query_embedding), top_k)
+        with self._lock:
+            cache = self._users.get(user_id)
+            if cache is None:
+                cache = self._users[user_id] = _UserCache()
+            generation = cache.generation
+            entry = cache.entries.get(key)
+            if entry is not None and entry[0] == generation and now >= entry[1]:
+                if self._alive(user_id, entry[2], now.timestamp()):
+                    cache.entries.move_to_end(key)
+                    self.hits += 1
+                    return list(entry[2])
+                del cache.entries[key]
+                self._expiry.discard((user_id, key))
+            self.misses += 1
+
+        results = self.inner.query(user_id, query_embedding, top_k=top_k, now=now)
+
+        with self._lock:
+            # a write that raced with the scan bumped the generation, or the
+            # user was dropped / forgotten meanwhile: don't cache
+            if self._users.get(user_id) is not cache or cache.generation != generation:
+                return results
+            if not results:
+                # nothing live to rank: cheap to redo, not worth an entry
+                if not cache.entries:
+                    del self._users[user_id]
+                return results
+            cache.entries[key] = (generation, now, list(results))
+            cache.entries.move_to_end(key)
+            self._schedule(user_id, key, results)
+            while len(cache.entries) > self.max_entries_per_user:
+                old_key, _ = cache.entries.popitem(last=False)
+                self._expiry.discard((user_id, old_key))
+        return results
+
+    def refresh(self, user_id: str) -> None:
+        # the inner store re-reads the user's files, which another writer may have changed
+        self.inner.refresh(user_id)
+        self._bump(user_id)
+
+    def flush(self) -> None:
+        # durability only: what query() returns does not change
+        self.inner.flush()
+
+    def close(self) -> None:
+        self.inner.close()
+        with self._lock:
+            for user_id, cache in self._users.items():
+                self._clear(user_id, cache)
+            self._users.clear()
+            self._deadlines = ExpiryIndex()
+
+    def user_ids(self):
+        return self.inner.user_ids()
+
+    def user_eus(self, user_id):
+        return self.inner.user_eus(user_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(len(c.entries) for c in self._users.values()),
+            }
+
+    def __getattr__(self, name):
+        # read-only helpers of the wrapped store (index_nbytes(), save(), ...);
+        # everything that changes what query() returns is wrapped above
+        return getattr(self.inner, name)
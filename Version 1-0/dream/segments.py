@@ -0,0 +1,539 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from .models import EpisodicUnit
+from .interfaces import VectorStore
+from .expiry import ExpiryIndex
+from .locking import StripedLock
+from .store import as_float32
+from .quantization import QuantizedRows, check_quantization, exact_scores, shortlist_size
+
+def _user_key(user_id: str) -> str:
+    return hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _remove_stale_generations(path: str, gen: int) -> None:
+    """
+    Deletes the g<N> directories of a user other than the current `gen`.
+    On Windows a file cannot be deleted while a view of its mapping is
+    alive, so a generation that still fails is left for the next call.
+    """
+    for name in os.listdir(path):
+        if name[:1] == "g" and name[1:].isdigit() and int(name[1:]) != gen:
+            try:
+                shutil.rmtree(os.path.join(path, name))
+            except OSError:
+                pass
+
+
+def _write_json(path: str, payload: dict) -> None:
+    # write-then-rename, so readers see the old or the new file, never half
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class _UserSegments:
+    """
+    One user's on-disk state, under <root>/<key>/:
+    - user.json: user_id, dim and the current generation
+    - g<gen>/seg-NNNNN.f32: fixed-size float32 segments of unit rows,
+      created sparse and filled in place through the mapping
+    - g<gen>/meta.jsonl: append-only sidecar of add / ttl / del records
+    Rows are never moved within a generation; compaction writes the live
+    rows into generation gen+1 and flips user.json.
+    With quantization, a resident quantized copy of every row is kept for
+    the first scoring pass and the segments are only read to rescore.
+    The caller's EUs are never modified; only EUs rebuilt by replay()
+    hold views of their mapped rows.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        user_id: str,
+        dim: int,
+        gen: int,
+        segment_rows: int,
+        writable: bool,
+        quantization: Optional[str] = None,
+    ):
+        self.path = path
+        self.user_id = user_id
+        self.dim = dim
+        self.gen = gen
+        self.segment_rows = segment_rows
+        self.writable = writable
+
+        self.size = 0  # rows written in this generation
+        self.live = 0
+        self.eus: List[Optional[EpisodicUnit]] = []
+        self.ttls = np.zeros(0, dtype=np.float64)  # -inf for deleted rows
+        self.rows: Dict[int, int] = {}  # id(eu) -> row
+        self.maps: List[np.memmap] = []
+        self.quantized = QuantizedRows(quantization, dim, 0) if quantization else None
+        self._meta = None
+
+    @property
+    def gen_dir(self) -> str:
+        return os.path.join(self.path, f"g{self.gen}")
+
+    # ---------------- FILES ----------------
+
+    def _segment(self, index: int) -> np.memmap:
+        while len(self.maps) <= index:
+            seg_path = os.path.join(self.gen_dir, f"seg-{len(self.maps):05d}.f32")
+            nbytes = self.segment_rows * self.dim * 4
+            if self.writable:
+                with open(seg_path, "ab") as fh:
+                    if fh.tell() < nbytes:
+                        fh.truncate(nbytes)
+            mode = "r+" if self.writable else "r"
+            self.maps.append(np.memmap(seg_path, dtype=np.float32, mode=mode, shape=(self.segment_rows, self.dim)))
+        return self.maps[index]
+
+    def _log(self, record: dict) -> None:
+        if self._meta is None:
+            self._meta = open(os.path.join(self.gen_dir, "meta.jsonl"), "a", encoding="utf-8")
+        self._meta.write(json.dumps(record) + "\n")
+
+    def flush(self, fsync: bool = False) -> None:
+        # Rows written through the mapping are in the page cache already and
+        # survive a process crash; msync/fsync only matter for power loss.
+        if self._meta is not None:
+            self._meta.flush()
+        if fsync:
+            for m in self.maps:
+                m.flush()
+            if self._meta is not None:
+                os.fsync(self._meta.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        if self._meta is not None:
+            self._meta.close()
+            self._meta = None
+        self.maps = []
+
+    # ---------------- ROWS ----------------
+
+    def _reserve(self, rows: int) -> None:
+        if rows > self.ttls.shape[0]:
+            ttls = np.full(max(rows, 2 * self.ttls.shape[0], 64), -np.inf)
+            ttls[: self.size] = self.ttls[: self.size]
+            self.ttls = ttls
+
+    def vector(self, row: int) -> np.ndarray:
+        seg = self._segment(row // self.segment_rows)
+        return np.asarray(seg[row % self.segment_rows])
+
+    def _place(self, row: int, eu: EpisodicUnit, unit: np.ndarray) -> None:
+        self._reserve(row + 1)
+        if self.quantized is not None:
+            self.quantized.reserve(self.ttls.shape[0], self.dim, self.size)
+            self.quantized.set(row, unit)
+        while len(self.eus) <= row:
+            self.eus.append(None)
+        self.eus[row] = eu
+        self.ttls[row] = eu.ttl.timestamp()
+        self.rows[id(eu)] = row
+        self.size = max(self.size, row + 1)
+        self.live += 1
+
+    def append(self, eu: EpisodicUnit, unit: np.ndarray) -> int:
+        row = self.size
+        seg = self._segment(row // self.segment_rows)
+        seg[row % self.segment_rows, : unit.shape[0]] = unit
+        self._place(row, eu, unit)
+        self._log(
+            {
+                "op": "add",
+                "row": row,
+                "episode_id": eu.episode_id,
+                "summary": eu.summary,
+                "timestamp": eu.timestamp.timestamp(),
+                "ttl": self.ttls[row],
+                "visits": eu.visits,
+                "topic": eu.topic,
+                "importance_score": eu.importance_score,
+            }
+        )
+        return row
+
+    def set_ttl(self, row: int, eu: EpisodicUnit) -> None:
+        self.ttls[row] = eu.ttl.timestamp()
+        self._log({"op": "ttl", "row": row, "ttl": self.ttls[row], "visits": eu.visits})
+
+    def delete(self, row: int) -> EpisodicUnit:
+        eu = self.eus[row]
+        self.eus[row] = None
+        self.ttls[row] = -np.inf
+        del self.rows[id(eu)]
+        self.live -= 1
+        self._log({"op": "del", "row": row})
+        return eu
+
+    def replay(self) -> None:
+        """
+        Rebuilds EUs from the sidecar. Embeddings of replayed EUs are views
+        into the mapping (unit-normalized), not copies. A torn last line
+        (crash mid-append) is ignored.
+        """
+        meta_path = os.path.join(self.gen_dir, "meta.jsonl")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                row = rec["row"]
+                op = rec["op"]
+                if op == "add":
+                    self._place(
+                        row,
+                        EpisodicUnit(
+                            user_id=self.user_id,
+                            episode_id=rec["episode_id"],
+                            summary=rec["summary"],
+                            embedding=self.vector(row),
+                            timestamp=datetime.fromtimestamp(rec["timestamp"]),
+                            ttl=datetime.fromtimestamp(rec["ttl"]),
+                            visits=rec["visits"],
+                            topic=rec["topic"],
+                            importance_score=rec["importance_score"],
+                        ),
+                        self.vector(row),
+                    )
+                elif op == "ttl" and row < self.size and self.eus[row] is not None:
+                    eu = self.eus[row]
+                    eu.ttl = datetime.fromtimestamp(rec["ttl"])
+                    eu.visits = rec["visits"]
+                    self.ttls[row] = rec["ttl"]
+                elif op == "del" and row < self.size and self.eus[row] is not None:
+                    eu = self.eus[row]
+                    self.eus[row] = None
+                    self.ttls[row] = -np.inf
+                    del self.rows[id(eu)]
+                    self.live -= 1
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        if self.quantized is not None:
+            return self.quantized.scores(q, self.size)
+        parts = []
+        for index in range((self.size + self.segment_rows - 1) // self.segment_rows):
+            rows = min(self.segment_rows, self.size - index * self.segment_rows)
+            parts.append(self._segment(index)[:rows] @ q)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Persistent vector store for warm restarts. Each user's embeddings are
+    unit-normalized float32 rows in append-only segment files that are
+    memory-mapped and scored in place, with EU metadata in an append-only
+    JSON-lines sidecar.
+    Opening the store reads nothing: a user's sidecar is replayed on first
+    touch and segments are mapped, not loaded, so startup does not grow
+    with the corpus, and processes mapping the same files share pages
+    through the OS page cache.
+    One process writes a given user (route users by shard);
+    read_only=True maps the files for query-only workers, which call
+    refresh() to pick up what the writer appended since.
+    Deleted rows are tombstoned and a user's files are compacted into a
+    new generation once tombstones exceed `compact_ratio`.
+    quantization="int8" | "float16" keeps a compact copy of each opened
+    user's rows resident for the first pass; only the top_k *
+    `rescore_factor` shortlist is read back from the segments and
+    rescored at full precision, so returned similarities are exact.
+    dream.quantization.recall_delta() measures the recall cost against an
+    exact scan and memory_report() the bytes actually resident per EU.
+    """
+    def __init__(
+        self,
+        root: str,
+        segment_rows: int = 1024,
+        compact_ratio: float = 0.5,
+        fsync: bool = False,
+        read_only: bool = False,
+        lock_stripes: int = 64,
+        quantization: Optional[str] = None,
+        rescore_factor: int = 4,
+    ):
+        self.root = root
+        self.segment_rows = segment_rows
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self.read_only = read_only
+        self.quantization = check_quantization(quantization)
+        self.rescore_factor = rescore_factor
+        if not read_only:
+            os.makedirs(root, exist_ok=True)
+        self._by_user: Dict[str, _UserSegments] = {}
+        self._expiry = ExpiryIndex()
+        self._locks = StripedLock(lock_stripes)
+
+    # ---------------- USERS ----------------
+
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.root, _user_key(user_id))
+
+    def _open(self, user_id: str, dim: Optional[int] = None) -> Optional[_UserSegments]:
+        """
+        Returns the user's open segments, opening them on first touch.
+        With `dim`, a user without files is created. Caller holds the lock.
+        """
+        user = self._by_user.get(user_id)
+        if user is not None:
+            return user
+        path = self._user_dir(user_id)
+        manifest_path = os.path.join(path, "user.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            if not self.read_only:
+                # retries deletes a compaction could not finish
+                _remove_stale_generations(path, manifest["gen"])
+            user = _UserSegments(
+                path,
+                user_id,
+                manifest["dim"],
+                manifest["gen"],
+                manifest["segment_rows"],
+                not self.read_only,
+                self.quantization,
+            )
+            user.replay()
+        elif dim is not None and not self.read_only:
+            user = _UserSegments(path, user_id, dim, 0, self.segment_rows, True, self.quantization)
+            os.makedirs(user.gen_dir, exist_ok=True)
+            _write_json(
+                manifest_path,
+                {"user_id": user_id, "dim": dim, "gen": 0, "segment_rows": self.segment_rows},
+            )
+        else:
+            return None
+        for row, eu in enumerate(user.eus):
+            if eu is not None:
+                self._expiry.schedule((user_id, id(eu)), user.ttls[row])
+        self._by_user[user_id] = user
+        return user
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError("MmapVectorStore opened read_only")
+
+    def refresh(self, user_id: str) -> None:
+        """
+        Forgets a user's open state so the next access re-reads its files.
+        """
+        with self._locks.for_key(user_id):
+            user = self._by_user.pop(user_id, None)
+            if user is not None:
+                for eu_key in user.rows:
+                    self._expiry.discard((user_id, eu_key))
+                user.close()
+
+    # ---------------- VectorStore ----------------
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        self._check_writable()
+        vec = as_float32(eu.embedding)
+        norm = float(np.linalg.norm(vec))
+        if norm > 0.0:
+            vec = vec / norm
+        with self._locks.for_key(eu.user_id):
+            user = self._open(eu.user_id, dim=vec.shape[0])
+            if vec.shape[0] > user.dim:
+                raise ValueError(
+                    f"embedding has {vec.shape[0]} dims, segments of {eu.user_id!r} hold {user.dim}"
+                )
+            row = user.append(eu, vec)
+            user.flush(self.fsync)
+            self._expiry.schedule((eu.user_id, id(eu)), user.ttls[row])
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        if self.read_only:
+            return
+        with self._locks.for_key(eu.user_id):
+            user = self._by_user.get(eu.user_id)
+            row = user.rows.get(id(eu)) if user else None
+            if row is None:
+                return
+            user.set_ttl(row, eu)
+            user.flush(self.fsync)
+            self._expiry.schedule((eu.user_id, id(eu)), user.ttls[row])
+
+    def query(
+        self,
+        user_id: str,
+        query_embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        now = now or datetime.utcnow()
+        if top_k <= 0:
+            return []
+        q = as_float32(query_embedding)
+        q_norm = float(np.linalg.norm(q)) or 1.0
+
+        with self._locks.for_key(user_id):
+            user = self._open(user_id)
+            if user is None or user.live == 0:
+                return []
+            qd = np.zeros(user.dim, dtype=np.float32)
+            dim = min(q.shape[0], user.dim)
+            qd[:dim] = q[:dim] / q_norm
+            scores = user.scores(qd)
+
+            candidates = np.flatnonzero(user.ttls[: user.size] > now.timestamp())
+            if candidates.shape[0] == 0:
+                return []
+            cand_scores = scores[candidates]
+            if user.quantized is not None:
+                n = shortlist_size(top_k, self.rescore_factor, candidates.shape[0])
+                if n < candidates.shape[0]:
+                    part = np.argpartition(-cand_scores, n - 1)[:n]
+                    candidates = candidates[part]
+                cand_scores = exact_scores([user.vector(row) for row in candidates], qd)
+            if top_k < candidates.shape[0]:
+                part = np.argpartition(-cand_scores, top_k - 1)[:top_k]
+                candidates = candidates[part]
+                cand_scores = cand_scores[part]
+            order = np.argsort(-cand_scores, kind="stable")
+            return [(user.eus[candidates[i]], float(cand_scores[i])) for i in order]
+
+    def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        """
+        Only users opened by this process are pruned; EUs of users never
+        touched stay on disk until first access (queries mask them anyway).
+        """
+        if self.read_only:
+            return 0
+        now = now or datetime.utcnow()
+        touched = set()
+
+        def ttl_of(key) -> Optional[float]:
+            user_id, eu_key = key
+            user = self._by_user.get(user_id)
+            row = user.rows.get(eu_key) if user else None
+            return float(user.ttls[row]) if row is not None else None
+
+        def remove(key) -> None:
+            user_id, eu_key = key
+            user = self._by_user[user_id]
+            user.delete(user.rows[eu_key])
+            touched.add(user_id)
+
+        removed = self._expiry.drain(
+            now.timestamp(), ttl_of, remove, limit=limit,
+            lock_of=lambda key: self._locks.for_key(key[0]),
+        )
+
+        for user_id in touched:
+            with self._locks.for_key(user_id):
+                user = self._by_user.get(user_id)
+                if user is None:
+                    continue
+                user.flush(self.fsync)
+                if user.live == 0:
+                    self._drop(user_id)
+                elif user.size - user.live > self.compact_ratio * user.size:
+                    self._compact(user_id, user)
+        return removed
+
+    def user_ids(self) -> List[str]:
+        users = dict.fromkeys(u for u, s in self._by_user.items() if s.live)
+        if os.path.isdir(self.root):
+            for key in os.listdir(self.root):
+                manifest_path = os.path.join(self.root, key, "user.json")
+                if os.path.exists(manifest_path):
+                    with open(manifest_path, encoding="utf-8") as fh:
+                        users[json.load(fh)["user_id"]] = None
+        return list(users)
+
+    def user_eus(self, user_id: str) -> List[EpisodicUnit]:
+        with self._locks.for_key(user_id):
+            user = self._open(user_id)
+            return [eu for eu in user.eus if eu is not None] if user else []
+
+    def drop_user(self, user_id: str) -> int:
+        self._check_writable()
+        with self._locks.for_key(user_id):
+            user = self._open(user_id)
+            if user is None:
+                return 0
+            live = user.live
+            self._drop(user_id)
+            return live
+
+    # ---------------- FILES ----------------
+
+    def _drop(self, user_id: str) -> None:
+        user = self._by_user.pop(user_id)
+        for eu_key in user.rows:
+            self._expiry.discard((user_id, eu_key))
+        user.close()
+        shutil.rmtree(user.path, ignore_errors=True)
+
+    def _compact(self, user_id: str, user: _UserSegments) -> None:
+        fresh = _UserSegments(
+            user.path, user_id, user.dim, user.gen + 1, user.segment_rows, True, self.quantization
+        )
+        os.makedirs(fresh.gen_dir, exist_ok=True)
+        for row, eu in enumerate(user.eus):
+            if eu is not None:
+                fresh.append(eu, user.vector(row))
+        fresh.flush(fsync=True)
+        _write_json(
+            os.path.join(user.path, "user.json"),
+            {"user_id": user_id, "dim": user.dim, "gen": fresh.gen, "segment_rows": user.segment_rows},
+        )
+        user.close()
+        self._by_user[user_id] = fresh
+        # On POSIX, maps of the old generation that replayed EUs still view
+        # stay valid after the unlink. Where they block the delete, it is
+        # retried on the next compaction or when the user is next opened.
+        _remove_stale_generations(user.path, fresh.gen)
+
+    def index_nbytes(self) -> int:
+        """
+        Resident bytes of the opened users' quantized rows and TTLs; the
+        segments themselves are mapped, not counted.
+        """
+        total = 0
+        for user_id in list(self._by_user):
+            with self._locks.for_key(user_id):
+                user = self._by_user.get(user_id)
+                if user is not None:
+                    total += user.ttls.nbytes
+                    if user.quantized is not None:
+                        total += user.quantized.nbytes
+        return total
+
+    def flush(self) -> None:
+        for user_id in list(self._by_user):
+            with self._locks.for_key(user_id):
+                user = self._by_user.get(user_id)
+                if user is not None:
+                    user.flush(fsync=True)
+
+    def close(self) -> None:
+        for user_id in list(self._by_user):
+            with self._locks.for_key(user_id):
+                user = self._by_user.pop(user_id, None)
+                if user is not None:
+                    user.close()
@@ -0,0 +1,593 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+import multiprocessing
+import os
+import threading
+from .models import EpisodicUnit, EpisodeProposal
+from .orchestrator import DreamOrchestrator, stable_hash
+from .summarization import SimpleSummarizer
+from .embedding import HashingEmbedder
+from .cache import CachedEmbedder
+from .store import NumpyVectorStore
+from .metrics import Metrics
+from .quantization import memory_report, recall_delta
+
+def default_orchestrator_factory() -> DreamOrchestrator:
+    """
+    Builds one shard. Must be a module-level callable so it can be sent to
+    worker processes under the "spawn" start method.
+    """
+    return DreamOrchestrator(
+        summarizer=SimpleSummarizer(),
+        embedder=CachedEmbedder(HashingEmbedder(sparse=True)),
+        vector_store=NumpyVectorStore(),
+    )
+
+
+class HashRing:
+    """
+    Consistent-hash ring: every node owns `vnodes` points on the 64-bit
+    stable_hash circle and a key belongs to the first point clockwise of
+    its own hash. Adding or removing one of N nodes only moves ~1/N of
+    the keys; virtual nodes keep the shares even.
+    Rings are swapped, not mutated, while they route traffic: change a
+    copy() and assign it.
+    """
+    def __init__(self, nodes: Iterable[int] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self._nodes: Set[int] = set(nodes)
+        self._points: List[int] = []
+        self._owners: List[int] = []
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: int) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[int]:
+        return sorted(self._nodes)
+
+    def _rebuild(self) -> None:
+        points = sorted(
+            (stable_hash(f"shard-{node}#{i}"), node)
+            for node in self._nodes
+            for i in range(self.vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def add_node(self, node: int) -> None:
+        if node not in self._nodes:
+            self._nodes.add(node)
+            self._rebuild()
+
+    def remove_node(self, node: int) -> None:
+        if node in self._nodes:
+            self._nodes.discard(node)
+            self._rebuild()
+
+    def node_for(self, key: str) -> int:
+        if not self._points:
+            raise LookupError("hash ring has no nodes")
+        i = bisect.bisect_right(self._points, stable_hash(key))
+        return self._owners[i % len(self._points)]
+
+    def copy(self) -> "HashRing":
+        return HashRing(self._nodes, vnodes=self.vnodes)
+
+
+class UserMovedError(RuntimeError):
+    """
+    Raised by a shard for a user it handed over; the caller re-routes.
+    """
+
+
+def _resolve(target: Any, path: str) -> Any:
+    for name in path.split("."):
+        target = getattr(target, name)
+    return target
+
+
+# ---------------- WORKER-SIDE OPERATIONS ----------------
+# Requests that need more than one orchestrator call, or an EU looked up
+# by episode_id (EUs cross the pipe as copies, so id() means nothing).
+
+def _visit_count(orchestrator: DreamOrchestrator, user_id: str, episode_id: str) -> Optional[int]:
+    for eu in orchestrator.vector_store.user_eus(user_id):
+        if eu.episode_id == episode_id:
+            return orchestrator.visit_count(eu)
+    return None
+
+
+def _query_cache_stats(orchestrator: DreamOrchestrator) -> Dict[str, int]:
+    stats = getattr(orchestrator.vector_store, "stats", None)
+    return stats() if stats is not None else {}
+
+
+def _quantization_report(
+    orchestrator: DreamOrchestrator,
+    samples: List[Tuple[str, str]],
+    top_k: int,
+) -> Dict[str, Any]:
+    store = orchestrator.vector_store
+    embeddings = orchestrator._embed_many([text for _, text in samples]) if samples else []
+    report = recall_delta(store, zip((u for u, _ in samples), embeddings), top_k=top_k)
+    report.update(memory_report(store))
+    report["quantization"] = getattr(store, "quantization", None)
+    return report
+
+
+_WORKER_OPS: Dict[str, Callable[..., Any]] = {
+    "visit_count": _visit_count,
+    "query_cache_stats": _query_cache_stats,
+    "quantization_report": _quantization_report,
+}
+
+# quantization_report() keys added up across shards
+_SUMMED = ("queries", "hits", "expected", "eus", "index_bytes", "eu_bytes", "mapped_bytes", "resident_bytes")
+
+
+def _shard_main(conn, factory: Callable[[], DreamOrchestrator]) -> None:
+    """
+    Worker loop: owns one DreamOrchestrator and serves
+    (method, route_key, kwargs) requests until it receives None. `method`
+    names a _WORKER_OPS entry or an attribute path on the orchestrator.
+    Requests routed by a user this shard released are refused with
+    UserMovedError; the check shares the pipe's ordering with the
+    release itself, so no write can land after the hand-over.
+    """
+    orchestrator = factory()
+    moved: Set[str] = set()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, route_key, kwargs = request
+        if route_key is not None and route_key in moved:
+            conn.send((False, UserMovedError(route_key)))
+            continue
+        try:
+            op = _WORKER_OPS.get(method)
+            if op is not None:
+                result = op(orchestrator, **kwargs)
+            else:
+                result = _resolve(orchestrator, method)(**kwargs)
+        except Exception as exc:
+            conn.send((False, exc))
+            continue
+        if method == "release_user":
+            moved.add(kwargs["user_id"])
+        elif method == "import_user":
+            moved.discard(kwargs["state"].user_id)
+        conn.send((True, result))
+    conn.close()
+
+
+class _Shard:
+    __slots__ = ("process", "conn", "lock", "closed")
+
+    def __init__(self, ctx, factory: Callable[[], DreamOrchestrator]):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_shard_main, args=(child, factory), daemon=True)
+        self.process.start()
+        child.close()
+        # one request in flight per pipe
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, method: str, route_key: Optional[str], kwargs: Dict[str, Any]) -> None:
+        self.conn.send((method, route_key, kwargs))
+
+    def receive(self) -> Any:
+        ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, method: str, route_key: Optional[str] = None, /, **kwargs) -> Any:
+        with self.lock:
+            if self.closed:
+                # removed from the ring while this request was being routed
+                raise UserMovedError(route_key)
+            self.send(method, route_key, kwargs)
+            return self.receive()
+
+    def stop(self) -> None:
+        with self.lock:
+            self.closed = True
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ShardedOrchestrator:
+    """
+    Owns N DreamOrchestrator shards, one per worker process, and routes
+    every user to the same shard through a consistent-hash ring.
+    Exposes the MemoryService use cases, so a node can use every core;
+    flush_arm() and the observability calls gather from every shard.
+    Results come back pickled: returned EUs are snapshots, ARM updates
+    happen inside the owning shard.
+    Shards can be added or removed while serving: only the users whose
+    ring owner changes are migrated, one at a time, and each keeps being
+    served by its old shard until its own cutover.
+    """
+
+    def __init__(
+        self,
+        num_shards: Optional[int] = None,
+        factory: Callable[[], DreamOrchestrator] = default_orchestrator_factory,
+        start_method: Optional[str] = None,
+        vnodes: int = 128,
+    ):
+        count = num_shards or os.cpu_count() or 1
+        self._ctx = multiprocessing.get_context(start_method)
+        self._factory = factory
+        self._shards: Dict[int, _Shard] = {i: _Shard(self._ctx, factory) for i in range(count)}
+        self._next_shard_id = count
+        self.ring = HashRing(self._shards, vnodes=vnodes)
+
+        # users pinned to their old shard until their migration cuts over
+        self._pinned: Dict[str, int] = {}
+        # set once a user's cutover is over; callers refused meanwhile wait here
+        self._cutovers: Dict[str, threading.Event] = {}
+        self._rebalance_lock = threading.Lock()
+
+    @property
+    def num_shards(self) -> int:
+        return len(self._shards)
+
+    @property
+    def shard_ids(self) -> List[int]:
+        return sorted(self._shards)
+
+    def shard_for(self, user_id: str) -> int:
+        shard_id = self._pinned.get(user_id)
+        return self.ring.node_for(user_id) if shard_id is None else shard_id
+
+    def _call(self, route_key: str, method: str, /, **kwargs) -> Any:
+        while True:
+            shard = self._shards.get(self.shard_for(route_key))
+            try:
+                if shard is None:
+                    raise UserMovedError(route_key)
+                return shard.call(method, route_key, **kwargs)
+            except UserMovedError:
+                event = self._cutovers.get(route_key)
+                if event is not None:
+                    event.wait()
+
+    def _scatter(self, requests: Dict[int, Tuple[str, Dict[str, Any]]]) -> Dict[int, Any]:
+        """
+        Sends one request per shard, then gathers the replies, so the shards
+        work in parallel. Locks are taken in shard order to avoid deadlocks.
+        """
+        order = [i for i in sorted(requests) if i in self._shards]
+        shards = [self._shards[i] for i in order]
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            # a shard that was removed meanwhile holds no users any more
+            live = [(i, shard) for i, shard in zip(order, shards) if not shard.closed]
+            for i, shard in live:
+                method, kwargs = requests[i]
+                shard.send(method, None, kwargs)
+            replies: Dict[int, Any] = {}
+            errors: List[Exception] = []
+            for i, shard in live:
+                try:
+                    replies[i] = shard.receive()
+                except Exception as exc:
+                    errors.append(exc)
+            if errors:
+                raise errors[0]
+            return replies
+        finally:
+            for shard in shards:
+                shard.lock.release()
+
+    def _broadcast(self, method: str, **kwargs) -> List[Any]:
+        replies = self._scatter({i: (method, kwargs) for i in list(self._shards)})
+        return [replies[i] for i in sorted(replies)]
+
+    # ---------------- USE CASES ----------------
+
+    def configure_user(
+        self,
+        user_id: str,
+        opted_in: bool = True,
+        max_buffer_events: int = 8,
+        max_buffer_age_sec: int = 600,
+    ) -> None:
+        self._call(
+            user_id,
+            "configure_user",
+            user_id=user_id,
+            opted_in=opted_in,
+            max_buffer_events=max_buffer_events,
+            max_buffer_age_sec=max_buffer_age_sec,
+        )
+
+    def record_interaction(
+        self,
+        user_id: str,
+        input_text: str,
+        output_text: str,
+        metadata: Optional[dict] = None,
+        now: Optional[datetime] = None,
+    ) -> None:
+        self._call(
+            user_id,
+            "record_interaction",
+            user_id=user_id,
+            input_text=input_text,
+            output_text=output_text,
+            metadata=metadata,
+            now=now,
+        )
+
+    def should_propose_episode(self, user_id: str, now: Optional[datetime] = None) -> bool:
+        return self._call(user_id, "should_propose_episode", user_id=user_id, now=now)
+
+    def build_episode_proposal(
+        self,
+        user_id: str,
+        topic: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        return self._call(
+            user_id, "build_episode_proposal", user_id=user_id, topic=topic, now=now
+        )
+
+    def build_episode_proposals(
+        self,
+        user_ids: List[str],
+        topic: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[EpisodeProposal]:
+        # a user cut over while the batch is in flight is simply not ready
+        # on its old shard; its buffer is proposed on the next call
+        groups: Dict[int, List[str]] = {}
+        for user_id in dict.fromkeys(user_ids):
+            groups.setdefault(self.shard_for(user_id), []).append(user_id)
+        replies = self._scatter(
+            {
+                i: ("build_episode_proposals", {"user_ids": ids, "topic": topic, "now": now})
+                for i, ids in groups.items()
+            }
+        )
+        by_user = {p.user_id: p for proposals in replies.values() for p in proposals}
+        return [by_user[u] for u in dict.fromkeys(user_ids) if u in by_user]
+
+    def pop_proposal(
+        self,
+        proposal_id: str,
+        user_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodeProposal]:
+        if user_id is not None:
+            return self._call(
+                user_id, "pop_proposal", proposal_id=proposal_id, user_id=user_id, now=now
+            )
+        # owner unknown: only the shard holding the proposal returns it
+        for proposal in self._broadcast("pop_proposal", proposal_id=proposal_id, now=now):
+            if proposal is not None:
+                return proposal
+        return None
+
+    def confirm_episode(
+        self,
+        proposal: EpisodeProposal,
+        user_confirmed: bool,
+        importance_score: Optional[float] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[EpisodicUnit]:
+        return self._call(
+            proposal.user_id,
+            "confirm_episode",
+            proposal=proposal,
+            user_confirmed=user_confirmed,
+            importance_score=importance_score,
+            now=now,
+        )
+
+    def retrieve_context(
+        self,
+        user_id: str,
+        query_text: str,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[EpisodicUnit]:
+        return self._call(
+            user_id,
+            "retrieve_context",
+            user_id=user_id,
+            query_text=query_text,
+            top_k=top_k,
+            now=now,
+        )
+
+    def prune_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        # `limit` applies per shard
+        return sum(self._broadcast("prune_expired", now=now, limit=limit))
+
+    def visit_count(self, eu: EpisodicUnit) -> int:
+        """
+        Visits of `eu` on its owning shard, including revisits its ARM
+        journal has not flushed yet; eu.visits once the EU is gone.
+        """
+        visits = self._call(eu.user_id, "visit_count", user_id=eu.user_id, episode_id=eu.episode_id)
+        return eu.visits if visits is None else visits
+
+    def flush_arm(self) -> int:
+        return sum(self._broadcast("flush_arm"))
+
+    # ---------------- OBSERVABILITY ----------------
+
+    @staticmethod
+    def _sum_stats(replies: Iterable[Dict[str, int]]) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for stats in replies:
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def embedding_cache_stats(self) -> dict:
+        return self._sum_stats(self._broadcast("embedder.stats"))
+
+    def query_cache_stats(self) -> dict:
+        return self._sum_stats(self._broadcast("query_cache_stats"))
+
+    def metrics_text(self) -> str:
+        """
+        Every shard's metrics summed into one Prometheus registry; the
+        shards must use the default namespace and buckets.
+        """
+        metrics = Metrics()
+        for snapshot in self._broadcast("metrics.snapshot"):
+            metrics.merge(snapshot)
+        return metrics.render()
+
+    def quantization_report(self, samples: List[Tuple[str, str]], top_k: int = 5) -> dict:
+        """
+        Each shard scores the samples of the users it owns and reports its
+        memory; recall is recombined from the shards' hits, bytes are summed.
+        """
+        groups: Dict[int, List[Tuple[str, str]]] = {i: [] for i in self._shards}
+        for user_id, text in samples:
+            groups.setdefault(self.shard_for(user_id), []).append((user_id, text))
+        replies = self._scatter(
+            {i: ("quantization_report", {"samples": group, "top_k": top_k}) for i, group in groups.items()}
+        )
+        report = self._sum_stats(
+            {k: v for k, v in r.items() if k in _SUMMED} for r in replies.values()
+        )
+        for key in _SUMMED:
+            report.setdefault(key, 0)
+        recall = report["hits"] / report["expected"] if report["expected"] else 1.0
+        report["recall"] = recall
+        report["recall_delta"] = 1.0 - recall
+        report["bytes_per_eu"] = report["resident_bytes"] / report["eus"] if report["eus"] else 0.0
+        report["quantization"] = next((r["quantization"] for r in replies.values()), None)
+        return report
+
+    # ---------------- REBALANCING ----------------
+
+    def add_shard(self, chunk_size: int = 256) -> int:
+        """
+        Starts a new shard, puts it on the ring and migrates the users it
+        now owns. Returns the new shard id.
+        """
+        with self._rebalance_lock:
+            shard_id = self._next_shard_id
+            self._next_shard_id += 1
+            self._shards[shard_id] = _Shard(self._ctx, self._factory)
+            ring = self.ring.copy()
+            ring.add_node(shard_id)
+            self._rebalance(ring, chunk_size)
+            return shard_id
+
+    def remove_shard(self, shard_id: int, chunk_size: int = 256) -> None:
+        """
+        Migrates every user off `shard_id`, then stops its worker. If a
+        migration fails the shard stays off the ring; calling again
+        finishes the removal.
+        """
+        with self._rebalance_lock:
+            if shard_id not in self._shards:
+                raise KeyError(shard_id)
+            if shard_id in self.ring:
+                if len(self.ring) == 1:
+                    raise ValueError("cannot remove the last shard")
+                ring = self.ring.copy()
+                ring.remove_node(shard_id)
+            else:
+                # an earlier removal switched the ring but did not finish
+                ring = self.ring
+            self._rebalance(ring, chunk_size)
+            self._shards.pop(shard_id).stop()
+
+    def _user_locations(self) -> List[Tuple[str, int]]:
+        located = self._scatter({i: ("user_ids", {}) for i in list(self._shards)})
+        return [(user_id, i) for i, users in located.items() for user_id in users]
+
+    def _rebalance(self, ring: HashRing, chunk_size: int) -> None:
+        # Pin the users whose owner changes to where they live now and
+        # switch the ring, so users seen for the first time already land
+        # on their new owner. Users created on an old owner between the
+        # scan and the switch are picked up by the second scan.
+        moving = [(u, i) for u, i in self._user_locations() if ring.node_for(u) != i]
+        self._pinned.update(moving)
+        self.ring = ring
+        stray = [
+            (u, i)
+            for u, i in self._user_locations()
+            if u not in self._pinned and ring.node_for(u) != i
+        ]
+        for user_id, source in stray + moving:
+            self._migrate_user(user_id, source, ring.node_for(user_id), chunk_size)
+
+    def _migrate_user(self, user_id: str, source: int, target: int, chunk_size: int) -> None:
+        src, dst = self._shards[source], self._shards[target]
+
+        # copy: the source keeps serving reads and writes
+        total = src.call("begin_export", user_id=user_id)
+        try:
+            for start in range(0, total, chunk_size):
+                eus = src.call("export_chunk", user_id=user_id, start=start, stop=start + chunk_size)
+                dst.call("stage_eus", user_id=user_id, eus=eus)
+        except BaseException:
+            # the user stays on the source; the next rebalance retries it
+            self._pinned[user_id] = source
+            src.call("discard_staged", user_id=user_id)
+            dst.call("discard_staged", user_id=user_id)
+            raise
+
+        # cutover: requests for the user wait until routing points at target
+        event = threading.Event()
+        self._cutovers[user_id] = event
+        try:
+            state = src.call("release_user", user_id=user_id)
+            try:
+                dst.call("import_user", state=state)
+            except BaseException:
+                self._pinned[user_id] = source
+                dst.call("drop_user", user_id=user_id)
+                dst.call("discard_staged", user_id=user_id)
+                src.call("import_user", state=state)
+                raise
+            src.call("discard_staged", user_id=user_id)
+            self._pinned.pop(user_id, None)
+        finally:
+            del self._cutovers[user_id]
+            event.set()
+
+    # ---------------- LIFECYCLE ----------------
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            shard.stop()
+        self._shards = {}
+
+    def __enter__(self) -> "ShardedOrchestrator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
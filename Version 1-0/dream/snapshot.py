@@ -0,0 +1,373 @@
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import struct
+import sys
+import numpy as np
+from .models import (
+    MemoryEvent,
+    EpisodicUnit,
+    UserMemoryConfig,
+    EpisodeProposal,
+    UserState,
+    SparseVector,
+    Embedding,
+)
+
+# File layout (little-endian):
+#   header  MAGIC, version u16, kind u8, seq u64, base_seq u64, created_us i64
+#   records tag u8 [+ payload length u32 + payload], until TAG_END
+# A USER payload carries the user's whole state (config, buffer, pending
+# proposals, EUs), so restoring a chain of snapshots is "last record wins".
+MAGIC = b"DREAMSNP"
+VERSION = 1
+FULL, INCREMENTAL = 0, 1
+TAG_END, TAG_USER, TAG_DROP = 0, 1, 2
+
+_HEADER = struct.Struct("<8sHBQQq")
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_DENSE, _SPARSE = 0, 1
+
+
+@dataclass
+class SnapshotInfo:
+    kind: int
+    seq: int
+    base_seq: int
+    created_at: datetime
+    users: int = 0
+    dropped: int = 0
+
+
+# ---------------- ENCODING ----------------
+
+class _Encoder:
+    __slots__ = ("buf",)
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def u8(self, v: int) -> None:
+        self.buf += struct.pack("<B", v)
+
+    def u32(self, v: int) -> None:
+        self.buf += struct.pack("<I", v)
+
+    def f64(self, v: float) -> None:
+        self.buf += struct.pack("<d", v)
+
+    def time(self, v: datetime) -> None:
+        self.buf += struct.pack("<q", (v - _EPOCH) // _US)
+
+    def text(self, v: str) -> None:
+        data = v.encode("utf-8")
+        self.u32(len(data))
+        self.buf += data
+
+    def opt_text(self, v: Optional[str]) -> None:
+        self.u8(v is not None)
+        if v is not None:
+            self.text(v)
+
+    def opt_f64(self, v: Optional[float]) -> None:
+        self.u8(v is not None)
+        if v is not None:
+            self.f64(v)
+
+    def raw(self, data: bytes) -> None:
+        self.buf += data
+
+    def blob(self, data: bytes) -> None:
+        self.u32(len(data))
+        self.buf += data
+
+    def embedding(self, emb: Embedding) -> None:
+        if isinstance(emb, SparseVector):
+            self.u8(_SPARSE)
+            self.u32(emb.dim)
+            self.u32(emb.nnz)
+            self.raw(_le(array("I", emb.indices)))
+            self.raw(_le(array("f", emb.values)))
+        else:
+            vec = np.asarray(emb, dtype="<f4").ravel()
+            self.u8(_DENSE)
+            self.u32(vec.shape[0])
+            self.raw(vec.tobytes())
+
+    def eu(self, eu: EpisodicUnit) -> None:
+        self.text(eu.episode_id)
+        self.text(eu.summary)
+        self.time(eu.timestamp)
+        self.time(eu.ttl)
+        self.u32(eu.visits)
+        self.opt_text(eu.topic)
+        self.opt_f64(eu.importance_score)
+        self.embedding(eu.embedding)
+
+    def events(self, events: List[MemoryEvent]) -> None:
+        self.u32(len(events))
+        for ev in events:
+            self.time(ev.timestamp)
+            self.text(ev.input_text)
+            self.text(ev.output_text)
+            self.text(json.dumps(ev.metadata, default=str))
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class _Decoder:
+    __slots__ = ("view", "pos")
+
+    def __init__(self, data: bytes):
+        self.view = memoryview(data)
+        self.pos = 0
+
+    def _unpack(self, fmt: str, size: int):
+        value = struct.unpack_from(fmt, self.view, self.pos)[0]
+        self.pos += size
+        return value
+
+    def u8(self) -> int:
+        return self._unpack("<B", 1)
+
+    def u32(self) -> int:
+        return self._unpack("<I", 4)
+
+    def f64(self) -> float:
+        return self._unpack("<d", 8)
+
+    def time(self) -> datetime:
+        return _EPOCH + self._unpack("<q", 8) * _US
+
+    def text(self) -> str:
+        n = self.u32()
+        value = str(self.view[self.pos: self.pos + n], "utf-8")
+        self.pos += n
+        return value
+
+    def opt_text(self) -> Optional[str]:
+        return self.text() if self.u8() else None
+
+    def opt_f64(self) -> Optional[float]:
+        return self.f64() if self.u8() else None
+
+    def blob(self) -> bytes:
+        n = self.u32()
+        value = bytes(self.view[self.pos: self.pos + n])
+        self.pos += n
+        return value
+
+    def array(self, typecode: str, count: int) -> array:
+        arr = array(typecode)
+        nbytes = count * arr.itemsize
+        arr.frombytes(self.view[self.pos: self.pos + nbytes])
+        self.pos += nbytes
+        if sys.byteorder == "big":
+            arr.byteswap()
+        return arr
+
+    def embedding(self) -> Embedding:
+        kind = self.u8()
+        dim = self.u32()
+        if kind == _SPARSE:
+            nnz = self.u32()
+            indices = self.array("I", nnz)
+            return SparseVector(indices=indices, values=self.array("f", nnz), dim=dim)
+        return self.array("f", dim)
+
+    def eu(self, user_id: str) -> EpisodicUnit:
+        return EpisodicUnit(
+            user_id=user_id,
+            episode_id=self.text(),
+            summary=self.text(),
+            timestamp=self.time(),
+            ttl=self.time(),
+            visits=self.u32(),
+            topic=self.opt_text(),
+            importance_score=self.opt_f64(),
+            embedding=self.embedding(),
+        )
+
+    def events(self, user_id: str) -> List[MemoryEvent]:
+        events = []
+        for _ in range(self.u32()):
+            events.append(
+                MemoryEvent(
+                    user_id=user_id,
+                    timestamp=self.time(),
+                    input_text=self.text(),
+                    output_text=self.text(),
+                    metadata=json.loads(self.text()),
+                )
+            )
+        return events
+
+
+def encode_user(state: UserState) -> bytes:
+    enc = _Encoder()
+    enc.text(state.user_id)
+
+    cfg = state.config
+    enc.u8(cfg is not None)
+    if cfg is not None:
+        enc.u8(cfg.opted_in)
+        enc.u32(cfg.max_buffer_events)
+        enc.u32(cfg.max_buffer_age_sec)
+
+    enc.events(state.buffer)
+
+    enc.u32(len(state.proposals))
+    for p in state.proposals:
+        enc.text(p.proposal_id)
+        enc.time(p.created_at)
+        enc.text(p.summary)
+        enc.opt_text(p.topic)
+        enc.embedding(p.embedding)
+        enc.events(p.events)
+
+    enc.u32(len(state.eus))
+    for eu in state.eus:
+        enc.eu(eu)
+    return bytes(enc.buf)
+
+
+def decode_user(data: bytes) -> UserState:
+    dec = _Decoder(data)
+    user_id = dec.text()
+
+    config = None
+    if dec.u8():
+        config = UserMemoryConfig(
+            user_id=user_id,
+            opted_in=bool(dec.u8()),
+            max_buffer_events=dec.u32(),
+            max_buffer_age_sec=dec.u32(),
+        )
+
+    buffer = dec.events(user_id)
+
+    proposals = []
+    for _ in range(dec.u32()):
+        proposal_id = dec.text()
+        created_at = dec.time()
+        summary = dec.text()
+        topic = dec.opt_text()
+        embedding = dec.embedding()
+        proposals.append(
+            EpisodeProposal(
+                user_id=user_id,
+                events=dec.events(user_id),
+                summary=summary,
+                embedding=embedding,
+                topic=topic,
+                created_at=created_at,
+                proposal_id=proposal_id,
+            )
+        )
+
+    eus = [dec.eu(user_id) for _ in range(dec.u32())]
+    return UserState(user_id=user_id, config=config, buffer=buffer, proposals=proposals, eus=eus)
+
+
+def encode_eus(eus: Sequence[Optional[EpisodicUnit]]) -> bytes:
+    """
+    One user's EU slots in the snapshot's EU layout; None marks a
+    tombstoned slot so positions survive (HNSWVectorStore.save()).
+    """
+    enc = _Encoder()
+    enc.u32(len(eus))
+    for eu in eus:
+        enc.u8(eu is not None)
+        if eu is not None:
+            enc.eu(eu)
+    return bytes(enc.buf)
+
+
+def decode_eus(data: bytes, user_id: str) -> List[Optional[EpisodicUnit]]:
+    dec = _Decoder(data)
+    return [dec.eu(user_id) if dec.u8() else None for _ in range(dec.u32())]
+
+
+def encode_embeddings(entries: Iterable[Tuple[bytes, Embedding]]) -> bytes:
+    """
+    (key, embedding) pairs in the snapshot's dense / sparse encoding; used
+    by CachedEmbedder.save() so its file holds data only.
+    """
+    entries = list(entries)
+    enc = _Encoder()
+    enc.u32(len(entries))
+    for key, emb in entries:
+        enc.blob(key)
+        enc.embedding(emb)
+    return bytes(enc.buf)
+
+
+def decode_embeddings(data: bytes) -> List[Tuple[bytes, Embedding]]:
+    dec = _Decoder(data)
+    return [(dec.blob(), dec.embedding()) for _ in range(dec.u32())]
+
+
+# ---------------- FILES ----------------
+
+def write_header(fh: BinaryIO, kind: int, seq: int, base_seq: int, created_at: datetime) -> None:
+    fh.write(_HEADER.pack(MAGIC, VERSION, kind, seq, base_seq, (created_at - _EPOCH) // _US))
+
+
+def write_user(fh: BinaryIO, state: UserState) -> None:
+    payload = encode_user(state)
+    fh.write(struct.pack("<BI", TAG_USER, len(payload)))
+    fh.write(payload)
+
+
+def write_drop(fh: BinaryIO, user_id: str) -> None:
+    data = user_id.encode("utf-8")
+    fh.write(struct.pack("<BI", TAG_DROP, len(data)))
+    fh.write(data)
+
+
+def write_end(fh: BinaryIO) -> None:
+    fh.write(struct.pack("<B", TAG_END))
+
+
+def read_header(fh: BinaryIO) -> SnapshotInfo:
+    raw = fh.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError("truncated snapshot header")
+    magic, version, kind, seq, base_seq, created_us = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError("not a DREAM snapshot")
+    if version > VERSION:
+        raise ValueError(f"snapshot version {version} is newer than supported ({VERSION})")
+    return SnapshotInfo(kind=kind, seq=seq, base_seq=base_seq, created_at=_EPOCH + created_us * _US)
+
+
+def iter_records(fh: BinaryIO) -> Iterator[Tuple[int, object]]:
+    """
+    Streams (TAG_USER, UserState) / (TAG_DROP, user_id) records after the
+    header; only one user's payload is in memory at a time.
+    """
+    while True:
+        tag = fh.read(1)
+        if not tag:
+            raise ValueError("truncated snapshot: missing end record")
+        if tag[0] == TAG_END:
+            return
+        (length,) = struct.unpack("<I", fh.read(4))
+        payload = fh.read(length)
+        if len(payload) < length:
+            raise ValueError("truncated snapshot record")
+        if tag[0] == TAG_USER:
+            yield TAG_USER, decode_user(payload)
+        elif tag[0] == TAG_DROP:
+            yield TAG_DROP, payload.decode("utf-8")
+        # unknown tags from newer minor versions are skipped
+
@@ -1,20 +1,40 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from datetime import datetime
-from .models import EpisodicUnit
+import numpy as np
+from .models import EpisodicUnit, SparseVector
 from .interfaces import VectorStore
 from .embedding import cosine_similarity
+from .expiry import ExpiryIndex
+from .locking import StripedLock
 
 class InMemoryVectorStore(VectorStore):
     """
     In-memory vector index, separated by user_id.
     Good for demos and tests.
+    TTL deadlines are tracked in an ExpiryIndex, so pruning only touches
+    EUs that actually expired; queries compare the same deadlines.
+    Each user's bucket is guarded by a striped lock: writers for one user
+    are serialized, different users proceed in parallel.
     """
-    def __init__(self):
-        self._by_user: Dict[str, List[EpisodicUnit]] = {}
+    def __init__(self, lock_stripes: int = 64):
+        # user_id -> {id(eu): [eu, TTL deadline in POSIX seconds]}, in insertion order
+        self._by_user: Dict[str, Dict[int, list]] = {}
+        self._expiry = ExpiryIndex()
+        self._locks = StripedLock(lock_stripes)
 
     def add_eu(self, eu: EpisodicUnit) -> None:
-        self._by_user.setdefault(eu.user_id, []).append(eu)
+        ttl_ts = eu.ttl.timestamp()
+        with self._locks.for_key(eu.user_id):
+            self._by_user.setdefault(eu.user_id, {})[id(eu)] = [eu, ttl_ts]
+            self._expiry.schedule((eu.user_id, id(eu)), ttl_ts)
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        with self._locks.for_key(eu.user_id):
+            entry = self._by_user.get(eu.user_id, {}).get(id(eu))
+            if entry is not None:
+                entry[1] = eu.ttl.timestamp()
+                self._expiry.schedule((eu.user_id, id(eu)), entry[1])
 
     def query(
         self,
@@ -23,12 +43,14 @@ class InMemoryVectorStore(VectorStore):
         top_k: int = 5,
         now: Optional[datetime] = None,
     ) -> List[Tuple[EpisodicUnit, float]]:
-        now = now or datetime.utcnow()
-        bucket = self._by_user.get(user_id, [])
+        now_ts = (now or datetime.utcnow()).timestamp()
+        # score a snapshot so writers are not held up by the scan
+        with self._locks.for_key(user_id):
+            entries = [tuple(entry) for entry in self._by_user.get(user_id, {}).values()]
         results: List[Tuple[EpisodicUnit, float]] = []
 
-        for eu in bucket:
-            if eu.is_expired(now):
+        for eu, ttl_ts in entries:
+            if ttl_ts <= now_ts:
                 continue
             sim = cosine_similarity(eu.embedding, query_embedding)
             results.append((eu, sim))
@@ -36,9 +58,362 @@ class InMemoryVectorStore(VectorStore):
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:top_k]
 
-    def delete_expired(self, now: Optional[datetime] = None) -> None:
+    def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        now = now or datetime.utcnow()
+
+        def ttl_of(key) -> Optional[float]:
+            user_id, eu_key = key
+            entry = self._by_user.get(user_id, {}).get(eu_key)
+            return entry[1] if entry is not None else None
+
+        def remove(key) -> None:
+            user_id, eu_key = key
+            bucket = self._by_user[user_id]
+            del bucket[eu_key]
+            if not bucket:
+                del self._by_user[user_id]
+
+        return self._expiry.drain(
+            now.timestamp(), ttl_of, remove, limit=limit,
+            lock_of=lambda key: self._locks.for_key(key[0]),
+        )
+
+    def user_ids(self) -> List[str]:
+        return list(self._by_user)
+
+    def user_eus(self, user_id: str) -> List[EpisodicUnit]:
+        with self._locks.for_key(user_id):
+            return [entry[0] for entry in self._by_user.get(user_id, {}).values()]
+
+    def drop_user(self, user_id: str) -> int:
+        with self._locks.for_key(user_id):
+            bucket = self._by_user.pop(user_id, {})
+            for eu_key in bucket:
+                self._expiry.discard((user_id, eu_key))
+            return len(bucket)
+
+
+def as_float32(embedding) -> np.ndarray:
+    """
+    Dense float32 copy/view of a list, array or SparseVector embedding.
+    """
+    if isinstance(embedding, SparseVector):
+        vec = np.zeros(embedding.dim, dtype=np.float32)
+        vec[np.asarray(embedding.indices, dtype=np.intp)] = embedding.values
+        return vec
+    return np.asarray(embedding, dtype=np.float32).ravel()
+
+
+def _unit(vec: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0.0 else vec
+
+
+def _sparse_unit(embedding) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (columns, unit-normalized values) of an embedding's non-zeros.
+    """
+    if isinstance(embedding, SparseVector):
+        cols = np.asarray(embedding.indices, dtype=np.int32)
+        vals = np.asarray(embedding.values, dtype=np.float32)
+    else:
+        vec = as_float32(embedding)
+        cols = np.flatnonzero(vec).astype(np.int32)
+        vals = vec[cols]
+    return cols, _unit(vals)
+
+
+class _UserMatrix:
+    """
+    Per-user bucket of NumpyVectorStore: one contiguous float32 matrix of
+    pre-normalized embeddings plus parallel TTL (POSIX seconds) and EU arrays.
+    Rows [0, size) are live; the rest is spare capacity.
+    """
+    __slots__ = ("vectors", "ttls", "eus", "rows", "size")
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.ttls = np.zeros(capacity, dtype=np.float64)
+        self.eus: List[EpisodicUnit] = []
+        self.rows: Dict[int, int] = {}  # id(eu) -> row
+        self.size = 0
+
+    def append(self, eu: EpisodicUnit) -> int:
+        vec = _unit(as_float32(eu.embedding))
+        self.reserve(self.size + 1, vec.shape[0])
+        row = self.size
+        self.vectors[row, : vec.shape[0]] = vec
+        self.ttls[row] = eu.ttl.timestamp()
+        self.eus.append(eu)
+        self.rows[id(eu)] = row
+        self.size += 1
+        return row
+
+    def reserve(self, rows: int, dim: int) -> None:
+        capacity, cur_dim = self.vectors.shape
+        if rows <= capacity and dim <= cur_dim:
+            return
+        new_capacity = max(rows, capacity * 2) if rows > capacity else capacity
+        new_dim = max(dim, cur_dim)
+        vectors = np.zeros((new_capacity, new_dim), dtype=np.float32)
+        vectors[: self.size, :cur_dim] = self.vectors[: self.size]
+        ttls = np.zeros(new_capacity, dtype=np.float64)
+        ttls[: self.size] = self.ttls[: self.size]
+        self.vectors = vectors
+        self.ttls = ttls
+
+    def remove(self, row: int) -> EpisodicUnit:
+        """
+        Swap-remove: the last row moves into `row`, so removal is O(dim).
+        """
+        last = self.size - 1
+        eu = self.eus[row]
+        del self.rows[id(eu)]
+        if row != last:
+            moved = self.eus[last]
+            self.vectors[row] = self.vectors[last]
+            self.ttls[row] = self.ttls[last]
+            self.eus[row] = moved
+            self.rows[id(moved)] = row
+        self.eus.pop()
+        self.vectors[last] = 0.0
+        self.size = last
+        return eu
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        dim = min(q.shape[0], self.vectors.shape[1])
+        return self.vectors[: self.size, :dim] @ q[:dim]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.ttls.nbytes
+
+
+class _SparseUserRows:
+    """
+    Per-user bucket of NumpyVectorStore for sparse embeddings: the
+    non-zeros of all rows as flat (column, unit value, row) arrays, 12
+    bytes per non-zero instead of 4 bytes per dim of a dense row. A query
+    gathers its weight for every non-zero and sums them per row with
+    bincount. Same row bookkeeping as _UserMatrix; a swap-remove only
+    marks the flat arrays stale, and they are rebuilt from the EUs on the
+    next read, so a prune pays for one rebuild rather than one per EU.
+    """
+    __slots__ = ("cols", "vals", "owners", "nnz", "dim", "stale", "ttls", "eus", "rows", "size")
+
+    def __init__(self, capacity: int):
+        self.cols = np.zeros(0, dtype=np.int32)
+        self.vals = np.zeros(0, dtype=np.float32)
+        self.owners = np.zeros(0, dtype=np.int32)
+        self.nnz = 0
+        self.dim = 0
+        self.stale = False
+        self.ttls = np.zeros(capacity, dtype=np.float64)
+        self.eus: List[EpisodicUnit] = []
+        self.rows: Dict[int, int] = {}  # id(eu) -> row
+        self.size = 0
+
+    def append(self, eu: EpisodicUnit) -> int:
+        row = self.size
+        if row >= self.ttls.shape[0]:
+            ttls = np.zeros(max(row + 1, 2 * self.ttls.shape[0]), dtype=np.float64)
+            ttls[:row] = self.ttls[:row]
+            self.ttls = ttls
+        if not self.stale:
+            cols, vals = _sparse_unit(eu.embedding)
+            end = self.nnz + cols.shape[0]
+            if end > self.cols.shape[0]:
+                self._resize(max(end, 2 * self.cols.shape[0], 256))
+            self.cols[self.nnz: end] = cols
+            self.vals[self.nnz: end] = vals
+            self.owners[self.nnz: end] = row
+            self.nnz = end
+        self.dim = max(self.dim, len(eu.embedding))
+        self.ttls[row] = eu.ttl.timestamp()
+        self.eus.append(eu)
+        self.rows[id(eu)] = row
+        self.size += 1
+        return row
+
+    def _resize(self, capacity: int) -> None:
+        for name in ("cols", "vals", "owners"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self.nnz] = old[: self.nnz]
+            setattr(self, name, new)
+
+    def _rebuild(self) -> None:
+        parts = [_sparse_unit(eu.embedding) for eu in self.eus]
+        counts = [cols.shape[0] for cols, _vals in parts]
+        self.cols = np.concatenate([cols for cols, _vals in parts] or [np.zeros(0, dtype=np.int32)])
+        self.vals = np.concatenate([vals for _cols, vals in parts] or [np.zeros(0, dtype=np.float32)])
+        self.owners = np.repeat(np.arange(self.size, dtype=np.int32), counts)
+        self.nnz = self.cols.shape[0]
+        self.stale = False
+
+    def remove(self, row: int) -> EpisodicUnit:
+        last = self.size - 1
+        eu = self.eus[row]
+        del self.rows[id(eu)]
+        if row != last:
+            moved = self.eus[last]
+            self.ttls[row] = self.ttls[last]
+            self.eus[row] = moved
+            self.rows[id(moved)] = row
+        self.eus.pop()
+        self.size = last
+        self.stale = True
+        return eu
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        if self.stale:
+            self._rebuild()
+        if q.shape[0] < self.dim:
+            q = np.concatenate([q, np.zeros(self.dim - q.shape[0], dtype=np.float32)])
+        n = self.nnz
+        weights = self.vals[:n] * q[self.cols[:n]]
+        return np.bincount(self.owners[:n], weights=weights, minlength=self.size)
+
+    @property
+    def nbytes(self) -> int:
+        return self.cols.nbytes + self.vals.nbytes + self.owners.nbytes + self.ttls.nbytes
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vectorized in-memory index, separated by user_id.
+    Each user's embeddings live pre-normalized in one float32 matrix, so a
+    query is a single matrix-vector product plus an expiry mask, and top_k
+    is picked with argpartition instead of a full sort. A user whose first
+    EU has a SparseVector embedding gets a sparse bucket instead, which
+    keeps only the non-zeros (see _SparseUserRows).
+    Vectors of different lengths are compared as if zero-padded.
+    The TTL array is kept in sync through update_ttl(); pruning pops due
+    deadlines from an ExpiryIndex instead of scanning every bucket.
+    A user's matrix is only read or resized under that user's striped
+    lock; NumPy releases the GIL in the product, so users score in parallel.
+    No quantization here: the EUs keep their full-precision embeddings in
+    RAM, so compact rows would add memory rather than save it. Use
+    MmapVectorStore(quantization=...), which rescores from its segments.
+    """
+    def __init__(self, initial_capacity: int = 64, lock_stripes: int = 64):
+        self.initial_capacity = initial_capacity
+        self._by_user: Dict[str, Union[_UserMatrix, _SparseUserRows]] = {}
+        self._expiry = ExpiryIndex()
+        self._locks = StripedLock(lock_stripes)
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        with self._locks.for_key(eu.user_id):
+            bucket = self._by_user.get(eu.user_id)
+            if bucket is None:
+                if isinstance(eu.embedding, SparseVector):
+                    bucket = _SparseUserRows(self.initial_capacity)
+                else:
+                    bucket = _UserMatrix(len(eu.embedding), self.initial_capacity)
+                self._by_user[eu.user_id] = bucket
+            row = bucket.append(eu)
+            self._expiry.schedule((eu.user_id, id(eu)), float(bucket.ttls[row]))
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        with self._locks.for_key(eu.user_id):
+            bucket = self._by_user.get(eu.user_id)
+            row = bucket.rows.get(id(eu)) if bucket else None
+            if row is None:
+                return
+            ttl_ts = eu.ttl.timestamp()
+            bucket.ttls[row] = ttl_ts
+            self._expiry.schedule((eu.user_id, id(eu)), ttl_ts)
+
+    def query(
+        self,
+        user_id: str,
+        query_embedding,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
         now = now or datetime.utcnow()
-        for user_id, bucket in list(self._by_user.items()):
-            self._by_user[user_id] = [
-                eu for eu in bucket if not eu.is_expired(now)
+        if top_k <= 0:
+            return []
+        q = as_float32(query_embedding)
+        q = q / (float(np.linalg.norm(q)) or 1.0)
+
+        with self._locks.for_key(user_id):
+            bucket = self._by_user.get(user_id)
+            if bucket is None or bucket.size == 0:
+                return []
+
+            scores = bucket.scores(q)
+
+            candidates = np.flatnonzero(bucket.ttls[: bucket.size] > now.timestamp())
+            if candidates.shape[0] == 0:
+                return []
+            cand_scores = scores[candidates]
+            if top_k < candidates.shape[0]:
+                part = np.argpartition(-cand_scores, top_k - 1)[:top_k]
+                candidates = candidates[part]
+                cand_scores = cand_scores[part]
+            order = np.argsort(-cand_scores, kind="stable")
+
+            return [
+                (bucket.eus[candidates[i]], float(cand_scores[i]))
+                for i in order
             ]
+
+    def delete_expired(
+        self,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        now = now or datetime.utcnow()
+
+        def ttl_of(key) -> Optional[float]:
+            user_id, eu_key = key
+            bucket = self._by_user.get(user_id)
+            row = bucket.rows.get(eu_key) if bucket else None
+            return float(bucket.ttls[row]) if row is not None else None
+
+        def remove(key) -> None:
+            user_id, eu_key = key
+            bucket = self._by_user[user_id]
+            bucket.remove(bucket.rows[eu_key])
+            if bucket.size == 0:
+                del self._by_user[user_id]
+
+        return self._expiry.drain(
+            now.timestamp(), ttl_of, remove, limit=limit,
+            lock_of=lambda key: self._locks.for_key(key[0]),
+        )
+
+    def user_ids(self) -> List[str]:
+        return list(self._by_user)
+
+    def user_eus(self, user_id: str) -> List[EpisodicUnit]:
+        with self._locks.for_key(user_id):
+            bucket = self._by_user.get(user_id)
+            return list(bucket.eus) if bucket else []
+
+    def drop_user(self, user_id: str) -> int:
+        with self._locks.for_key(user_id):
+            bucket = self._by_user.pop(user_id, None)
+            if bucket is None:
+                return 0
+            for eu_key in bucket.rows:
+                self._expiry.discard((user_id, eu_key))
+            return bucket.size
+
+    def index_nbytes(self) -> int:
+        """
+        Bytes held by the per-user matrices or sparse rows plus TTLs,
+        excluding the EUs themselves; see dream.quantization.memory_report().
+        """
+        total = 0
+        for user_id in list(self._by_user):
+            with self._locks.for_key(user_id):
+                bucket = self._by_user.get(user_id)
+                if bucket is not None:
+                    total += bucket.nbytes
+        return total
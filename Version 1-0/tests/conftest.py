@@ -0,0 +1,9 @@
+import os
+import sys
+
+# dream/ and app/ live next to this directory; dream_extensions/ lives at
+# the repository root.
+HERE = os.path.dirname(os.path.abspath(__file__))
+for path in (os.path.dirname(HERE), os.path.dirname(os.path.dirname(HERE))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
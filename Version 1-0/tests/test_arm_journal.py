@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from dream import ARMJournal, DreamOrchestrator, HashingEmbedder, NumpyVectorStore, SimpleSummarizer
+from dream.arm import AdaptiveRetentionMechanism
+from dream.async_adapters import ThreadedEmbedder, ThreadedSummarizer, ThreadedVectorStore
+from dream.async_orchestrator import AsyncDreamOrchestrator
+
+T0 = datetime(2030, 1, 1)
+
+
+def build():
+    orchestrator = DreamOrchestrator(
+        summarizer=SimpleSummarizer(),
+        embedder=HashingEmbedder(),
+        vector_store=NumpyVectorStore(),
+    )
+    for i in range(3):
+        orchestrator.record_interaction("u", f"topic {i}", "ok", now=T0)
+        orchestrator.confirm_episode(orchestrator.build_episode_proposal("u", now=T0), True, now=T0)
+    return orchestrator
+
+
+def journaled(orchestrator, wal_path):
+    # never flushes on its own: only flush() / replay apply visits
+    return ARMJournal(
+        orchestrator.arm,
+        orchestrator.vector_store.update_ttl,
+        max_pending=10**6,
+        flush_interval_sec=3600,
+        wal_path=wal_path,
+    )
+
+
+def retrieve_hours(orchestrator, hours):
+    hits = []
+    for step in range(hours):
+        hits = orchestrator.retrieve_context("u", "topic", top_k=2, now=T0 + timedelta(hours=step))
+    return hits
+
+
+def test_pending_visits_match_direct_arm(tmp_path):
+    reference = build()
+    orchestrator = build()
+    orchestrator.arm_journal = journaled(orchestrator, str(tmp_path / "arm.wal"))
+    expected = retrieve_hours(reference, 12)
+    got = retrieve_hours(orchestrator, 12)
+
+    assert got[0].visits == 0
+    assert orchestrator.visit_count(got[0]) == expected[0].visits
+    assert orchestrator.arm_journal.ttl(got[0]) == expected[0].ttl
+
+    assert orchestrator.flush_arm() > 0
+    assert (got[0].visits, got[0].ttl) == (expected[0].visits, expected[0].ttl)
+
+
+def test_replay_after_crash(tmp_path):
+    wal = str(tmp_path / "arm.wal")
+    reference = build()
+    orchestrator = build()
+    orchestrator.arm_journal = journaled(orchestrator, wal)
+    # episode ids are random per orchestrator, summaries are not
+    expected = {eu.summary: eu for eu in retrieve_hours(reference, 12)}
+    retrieve_hours(orchestrator, 12)
+
+    # crash: the pending visits only survive in the log; a new journal
+    # over the same log and store replays them
+    orchestrator.arm_journal = journaled(orchestrator, wal)
+    assert orchestrator.replay_arm_journal() == 24
+
+    by_summary = {eu.summary: eu for eu in orchestrator.vector_store.user_eus("u")}
+    for summary, eu in expected.items():
+        assert (by_summary[summary].visits, by_summary[summary].ttl) == (eu.visits, eu.ttl)
+    assert (tmp_path / "arm.wal").stat().st_size == 0
+    assert orchestrator.replay_arm_journal() == 0
+
+
+def test_replay_skips_unknown_eus(tmp_path):
+    wal = str(tmp_path / "arm.wal")
+    orchestrator = build()
+    orchestrator.arm_journal = journaled(orchestrator, wal)
+    retrieve_hours(orchestrator, 2)
+    orchestrator.drop_user("u")
+    orchestrator.arm_journal = journaled(orchestrator, wal)
+    assert orchestrator.replay_arm_journal() == 0
+
+
+def build_async(journal_kwargs):
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arm-test")
+    store = NumpyVectorStore()
+    sink_threads = []
+
+    def sink(eu):
+        sink_threads.append(threading.current_thread().name)
+        store.update_ttl(eu)
+
+    arm = AdaptiveRetentionMechanism()
+    orchestrator = AsyncDreamOrchestrator(
+        summarizer=ThreadedSummarizer(SimpleSummarizer(), executor),
+        embedder=ThreadedEmbedder(HashingEmbedder(), executor),
+        vector_store=ThreadedVectorStore(store, executor),
+        arm=arm,
+        arm_journal=ARMJournal(arm, sink, **journal_kwargs),
+        arm_executor=executor,
+    )
+    return orchestrator, sink_threads, executor
+
+
+async def confirm_one(orchestrator):
+    orchestrator.record_interaction("u", "topic", "ok", now=T0)
+    proposal = await orchestrator.build_episode_proposal("u", now=T0)
+    return await orchestrator.confirm_episode(proposal, True, now=T0)
+
+
+def test_async_threshold_flush_runs_off_the_loop():
+    orchestrator, sink_threads, executor = build_async({"max_pending": 1, "flush_interval_sec": 3600})
+
+    async def scenario():
+        eu = await confirm_one(orchestrator)
+        await orchestrator.retrieve_context("u", "topic", now=T0)
+        return eu
+
+    with executor:
+        eu = asyncio.run(scenario())
+    assert eu.visits == 1
+    assert sink_threads and all(name.startswith("arm-test") for name in sink_threads)
+
+
+def test_async_prune_applies_pending_revisits_first():
+    orchestrator, _threads, executor = build_async({"max_pending": 10**6, "flush_interval_sec": 3600})
+
+    async def scenario():
+        eu = await confirm_one(orchestrator)
+        deadline = eu.ttl
+        await orchestrator.retrieve_context("u", "topic", now=deadline - timedelta(minutes=1))
+        assert eu.visits == 0 and eu.ttl == deadline
+        removed = await orchestrator.prune_expired(now=deadline + timedelta(minutes=1))
+        return eu, deadline, removed
+
+    with executor:
+        eu, deadline, removed = asyncio.run(scenario())
+    assert removed == 0
+    assert eu.visits == 1 and eu.ttl > deadline + timedelta(minutes=1)
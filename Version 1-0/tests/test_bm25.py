@@ -0,0 +1,135 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.memory_service import MemoryService
+from dream import DreamOrchestrator, EpisodicUnit, HashingEmbedder, NumpyVectorStore, SimpleSummarizer
+from dream_extensions.bm25 import BM25Index, LexicalIndexedStore, tokenize
+from dream_extensions.retrieval_strategies import HybridRetrieval
+
+T0 = datetime(2030, 1, 1)
+WORDS = [f"w{i}" for i in range(60)] + ["invoice", "refund", "alpha", "beta"]
+
+
+def exhaustive(eus, query, top_k, k1=1.2, b=0.75):
+    """
+    Textbook BM25 over every live EU, the reference for MaxScore.
+    """
+    docs = [(eu, tokenize(eu.summary)) for eu in eus]
+    n = len(docs)
+    avg = sum(len(tokens) for _, tokens in docs) / n
+    df = {}
+    for _, tokens in docs:
+        for term in set(tokens):
+            df[term] = df.get(term, 0) + 1
+    scored = []
+    for eu, tokens in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg))
+        if score > 0:
+            scored.append(score)
+    return sorted(scored, reverse=True)[:top_k]
+
+
+@pytest.fixture
+def corpus():
+    rnd = random.Random(7)
+    eus = []
+    for i in range(600):
+        # a power law, like real text: a few frequent terms, a long tail
+        words = [WORDS[min(int(rnd.paretovariate(1.0)) - 1, len(WORDS) - 1)] for _ in range(rnd.randint(3, 25))]
+        eus.append(
+            EpisodicUnit(
+                user_id="u",
+                episode_id=f"e{i}",
+                summary=" ".join(words) + f" INV-{i:04d}",
+                embedding=[1.0],
+                timestamp=T0,
+                ttl=T0 + timedelta(hours=1 + i % 5),
+            )
+        )
+    return rnd, eus
+
+
+def queries(rnd):
+    return [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))) for _ in range(25)] + [
+        "inv-0042",
+        "refund INV-0100 w0",
+    ]
+
+
+def check(index, rnd, live, now):
+    for query in queries(rnd):
+        got = [score for _eu, score in index.search_scored("u", query, top_k=10, now=now)]
+        assert got == pytest.approx(exhaustive(live, query, 10), rel=1e-5), query
+
+
+def test_matches_exhaustive_scorer(corpus):
+    rnd, eus = corpus
+    index = BM25Index()
+    for eu in eus:
+        index.add_eu(eu)
+    check(index, rnd, eus, T0)
+
+
+def test_matches_after_expiry_and_compaction(corpus):
+    rnd, eus = corpus
+    index = BM25Index(compact_ratio=0.3)
+    for eu in eus:
+        index.add_eu(eu)
+    now = T0 + timedelta(hours=3, minutes=30)
+    assert index.delete_expired(now=now) == sum(eu.ttl <= now for eu in eus)
+    check(index, rnd, [eu for eu in eus if eu.ttl > now], now)
+
+
+def test_exact_identifier_ranks_first(corpus):
+    _rnd, eus = corpus
+    index = BM25Index()
+    for eu in eus:
+        index.add_eu(eu)
+    assert index.search("u", "INV-0123", top_k=1)[0].episode_id == "e123"
+
+
+def test_store_writes_reach_the_index_through_the_orchestrator():
+    bm25 = BM25Index()
+    store = LexicalIndexedStore(NumpyVectorStore(), bm25)
+    embedder = HashingEmbedder()
+    orchestrator = DreamOrchestrator(
+        SimpleSummarizer(), embedder, store,
+        retrieval=HybridRetrieval(store, bm25, embedder=embedder),
+    )
+    orchestrator.record_interaction("u", "refund for invoice INV-7731", "ok", now=T0)
+    orchestrator.record_interaction("u", "weather is nice", "ok", now=T0)
+    eu = orchestrator.confirm_episode(orchestrator.build_episode_proposal("u", now=T0), True, now=T0)
+    first_ttl = eu.ttl
+
+    assert [e for e, _ in bm25.search_scored("u", "INV-7731", now=T0)] == [eu]
+    assert orchestrator.retrieve_context("u", "INV-7731", now=T0) == [eu]
+    # the ARM extension reached the index too, so the first deadline is not a cutoff
+    assert eu.ttl > first_ttl
+    assert orchestrator.prune_expired(now=first_ttl + timedelta(minutes=1)) == 0
+    assert bm25.search("u", "INV-7731") == [eu]
+
+    after = eu.ttl + timedelta(minutes=1)
+    assert orchestrator.prune_expired(now=after) == 1
+    assert bm25.search_scored("u", "INV-7731", now=after) == []
+    assert orchestrator.retrieve_context("u", "INV-7731", now=after) == []
+
+
+def test_memory_service_hybrid_retrieval():
+    service = MemoryService(hybrid_retrieval=True)
+    service.configure_user("u", max_buffer_events=1)
+    service.record_interaction("u", "order ORD-4410 shipped late", "sorry")
+    eu = service.confirm_episode(service.build_episode_proposal("u"), True)
+
+    assert service.bm25.search("u", "ORD-4410") == [eu]
+    assert service.retrieve_context("u", "ORD-4410", top_k=1) == [eu]
+    service._orchestrator.prune_expired(now=eu.ttl + timedelta(days=1))
+    assert service.bm25.search("u", "ORD-4410") == []
+    service.close()
@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+
+from dream.cache import CachedEmbedder
+from dream.embedding import HashingEmbedder
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self, **kwargs):
+        super().__init__(dim=32, **kwargs)
+        self.calls = 0
+
+    def embed(self, text):
+        self.calls += 1
+        return super().embed(text)
+
+
+def test_hits_normalized_text_and_evicts_least_recent():
+    inner = CountingEmbedder()
+    cache = CachedEmbedder(inner, max_entries=2)
+    first = cache.embed("hello  world")
+    assert cache.embed(" hello world ") is first
+    cache.embed("b")
+    cache.embed("hello world")  # now the most recent
+    cache.embed("c")            # evicts "b"
+
+    assert inner.calls == 3
+    cache.embed("hello world")
+    assert inner.calls == 3
+    cache.embed("b")
+    assert inner.calls == 4
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 4, 2)
+    assert stats["evictions"] == 2
+
+
+def test_byte_bound():
+    cache = CachedEmbedder(HashingEmbedder(dim=32), max_bytes=3 * 32 * 4 + 200)
+    for text in "abcdef":
+        cache.embed(text)
+    stats = cache.stats()
+    assert stats["entries"] < 6 and stats["bytes"] <= cache.max_bytes
+
+
+def test_embed_batch_dedups_and_fills_the_cache():
+    inner = CountingEmbedder()
+    cache = CachedEmbedder(inner)
+    vectors = cache.embed_batch(["a", "b", "a"])
+    assert vectors[0] is vectors[2]
+    assert cache.embed("b") is vectors[1]
+    assert cache.stats()["entries"] == 2
+
+
+def test_save_and_load_keep_vectors_and_lru_order(tmp_path):
+    path = str(tmp_path / "emb.cache")
+    cache = CachedEmbedder(HashingEmbedder(dim=32), max_entries=3, persist_path=path)
+    for text in ("a", "b", "c"):
+        cache.embed(text)
+    cache.embed("a")  # order is now b, c, a
+    cache.save()
+
+    inner = CountingEmbedder()
+    restored = CachedEmbedder(inner, max_entries=3, persist_path=path)
+    restored.embed("d")  # evicts b, the oldest saved entry
+    assert [list(restored.embed(t)) for t in "ac"] == [list(cache.embed(t)) for t in "ac"]
+    assert inner.calls == 1
+    restored.embed("b")
+    assert inner.calls == 2
+
+
+def test_other_version_is_ignored(tmp_path):
+    path = str(tmp_path / "emb.cache")
+    cache = CachedEmbedder(HashingEmbedder(dim=32), persist_path=path)
+    cache.embed("a")
+    cache.save()
+    other = CachedEmbedder(HashingEmbedder(dim=64), persist_path=path)
+    assert other.stats()["entries"] == 0
+
+
+def test_unknown_file_is_rejected(tmp_path):
+    path = tmp_path / "emb.cache"
+    path.write_bytes(pickle.dumps({"version": HashingEmbedder(dim=32).version, "entries": []}))
+    with pytest.raises(ValueError):
+        CachedEmbedder(HashingEmbedder(dim=32), persist_path=str(path))
@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime, timedelta
+
+from dream.expiry import ExpiryIndex
+from dream.models import EpisodicUnit
+from dream.store import InMemoryVectorStore, NumpyVectorStore
+
+
+def drain_dict(index, deadlines, now_ts, **kwargs):
+    removed = []
+
+    def remove(key):
+        removed.append(key)
+        del deadlines[key]
+
+    count = index.drain(now_ts, deadlines.get, remove, **kwargs)
+    assert count == len(removed)
+    return removed
+
+
+def test_drain_removes_only_due_keys_earliest_first():
+    index, deadlines = ExpiryIndex(), {"a": 30.0, "b": 10.0, "c": 20.0, "d": 50.0}
+    for key, deadline in deadlines.items():
+        index.schedule(key, deadline)
+
+    assert drain_dict(index, deadlines, 30.0) == ["b", "c", "a"]
+    assert sorted(deadlines) == ["d"] and len(index) == 1
+    assert index.next_deadline() == 50.0
+
+
+def test_drain_honours_limit():
+    index, deadlines = ExpiryIndex(), {k: float(k) for k in range(10)}
+    for key, deadline in deadlines.items():
+        index.schedule(key, deadline)
+    assert drain_dict(index, deadlines, 100.0, limit=4) == [0, 1, 2, 3]
+    assert drain_dict(index, deadlines, 100.0) == [4, 5, 6, 7, 8, 9]
+
+
+def test_rescheduled_key_waits_for_its_new_deadline():
+    index, deadlines = ExpiryIndex(), {"a": 10.0}
+    index.schedule("a", 10.0)
+    deadlines["a"] = 40.0
+    index.schedule("a", 40.0)
+    assert drain_dict(index, deadlines, 20.0) == []
+    assert drain_dict(index, deadlines, 40.0) == ["a"]
+
+
+def test_owner_deadline_wins_over_a_stale_heap_entry():
+    # the owner extended the deadline but the index was not told yet, as
+    # when update_ttl races with the pop; drain re-reads ttl_of and reschedules
+    index, deadlines = ExpiryIndex(), {"a": 10.0}
+    index.schedule("a", 10.0)
+    deadlines["a"] = 40.0
+    assert drain_dict(index, deadlines, 20.0) == []
+    assert "a" in index and index.next_deadline() == 40.0
+
+
+def test_gone_keys_are_skipped_and_lock_of_is_held():
+    index, deadlines = ExpiryIndex(), {"a": 1.0, "b": 2.0}
+    index.schedule("a", 1.0)
+    index.schedule("b", 2.0)
+    del deadlines["a"]
+    lock = threading.Lock()
+    held = []
+
+    def remove(key):
+        held.append(lock.locked())
+        del deadlines[key]
+
+    assert index.drain(5.0, deadlines.get, remove, lock_of=lambda key: lock) == 1
+    assert held == [True]
+
+
+def test_stores_prune_on_the_deadline_from_update_ttl_not_eu_ttl():
+    t0 = datetime(2030, 1, 1)
+    for store in (InMemoryVectorStore(), NumpyVectorStore()):
+        eu = EpisodicUnit(
+            user_id="u", episode_id="e", summary="s", embedding=[1.0],
+            timestamp=t0, ttl=t0 + timedelta(hours=1),
+        )
+        store.add_eu(eu)
+        # mutated but never reported: the store keeps the old deadline
+        eu.ttl = t0 + timedelta(hours=10)
+        assert store.delete_expired(now=t0 + timedelta(hours=2)) == 1
+
+        eu.ttl = t0 + timedelta(hours=1)
+        store.add_eu(eu)
+        eu.ttl = t0 + timedelta(hours=10)
+        store.update_ttl(eu)
+        assert store.delete_expired(now=t0 + timedelta(hours=2)) == 0
+        assert store.query("u", [1.0], now=t0 + timedelta(hours=2))
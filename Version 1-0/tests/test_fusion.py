@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from dream import EpisodicUnit, HashingEmbedder, NumpyVectorStore
+from dream_extensions.bm25 import LexicalIndexedStore
+from dream_extensions.fusion import check_fusion, reciprocal_rank_fusion, weighted_score_fusion
+from dream_extensions.retrieval_strategies import HybridRetrieval
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(episode_id, summary="s"):
+    return EpisodicUnit(
+        user_id="u", episode_id=episode_id, summary=summary, embedding=[1.0],
+        timestamp=T0, ttl=T0 + timedelta(days=1),
+    )
+
+
+X, Y, Z, W = (make(i) for i in "xyzw")
+
+
+def ids(fused):
+    return [(eu.episode_id, round(score, 6)) for eu, score in fused]
+
+
+def test_rrf_sums_reciprocal_ranks():
+    lexical = [(X, 3.0), (Y, 2.0)]
+    semantic = [(Y, 0.9), (Z, 0.1)]
+    assert ids(reciprocal_rank_fusion((lexical, semantic), 3, k=60)) == [
+        ("y", round(1 / 62 + 1 / 61, 6)),
+        ("x", round(1 / 61, 6)),
+        ("z", round(1 / 62, 6)),
+    ]
+    weighted = reciprocal_rank_fusion((lexical, semantic), 3, weights=(1.0, 2.0), k=60)
+    assert ids(weighted) == [
+        ("y", round(1 / 62 + 2 / 61, 6)),
+        ("z", round(2 / 62, 6)),
+        ("x", round(1 / 61, 6)),
+    ]
+
+
+def test_weighted_normalizes_each_branch():
+    lexical = [(X, 12.0), (Y, 4.0), (Z, 2.0)]
+    semantic = [(Z, 0.8), (W, 0.2)]
+    # x: 1 + 0, y: 0.2, z: 0 + 1, w: 0
+    assert ids(weighted_score_fusion((lexical, semantic), 4)) == [
+        ("x", 1.0), ("z", 1.0), ("y", 0.2), ("w", 0.0),
+    ]
+
+
+def test_weighted_falls_back_to_ranks_and_equal_scores():
+    unscored = [(X, None), (Y, None)]
+    flat = [(Z, 0.5), (W, 0.5)]
+    assert ids(weighted_score_fusion((unscored, flat), 4)) == [
+        ("x", 1.0), ("z", 1.0), ("w", 1.0), ("y", 0.5),
+    ]
+
+
+def test_ties_break_on_best_rank_then_episode_id():
+    a = [(Y, None), (X, None)]
+    b = [(X, None), (Y, None)]
+    assert [eu.episode_id for eu, _ in reciprocal_rank_fusion((a, b), 2)] == ["x", "y"]
+    assert [eu.episode_id for eu, _ in reciprocal_rank_fusion((b, a), 2)] == ["x", "y"]
+
+
+def test_edge_cases():
+    assert reciprocal_rank_fusion(([(X, 1.0)],), 0) == []
+    assert ids(reciprocal_rank_fusion(([(X, 1.0)], [(Y, 1.0)]), 5, weights=(0.0, 1.0))) == [
+        ("y", round(1 / 61, 6))
+    ]
+    assert weighted_score_fusion(([], []), 3) == []
+    assert check_fusion("rrf") == "rrf"
+    with pytest.raises(ValueError):
+        check_fusion("max")
+
+
+def test_hybrid_runs_the_lexical_branch_on_the_executor():
+    embedder = HashingEmbedder(dim=128)
+    store = LexicalIndexedStore(NumpyVectorStore())
+    for i in range(40):
+        text = f"note {i} about travel plans" + (" ticket INV-7731" if i == 7 else "")
+        eu = make(f"e{i}", text)
+        eu.embedding = embedder.embed(text)
+        store.add_eu(eu)
+
+    threads = []
+    search_scored = store.bm25.search_scored
+
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return search_scored(*args, **kwargs)
+
+    store.bm25.search_scored = spy
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="lexical") as executor:
+        for fusion in ("rrf", "weighted"):
+            hybrid = HybridRetrieval(store, store.bm25, embedder=embedder, fusion=fusion, executor=executor)
+            first = hybrid.retrieve("u", "where is INV-7731", 5)
+            assert first[0].episode_id == "e7"
+            assert hybrid.retrieve("u", "where is INV-7731", 5) == first
+    assert threads and all(name.startswith("lexical") for name in threads)
+    with pytest.raises(ValueError):
+        HybridRetrieval(store, store.bm25, fusion="max")
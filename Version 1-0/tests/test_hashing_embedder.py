@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from dream.embedding import HashingEmbedder, cosine_similarity
+
+TEXTS = ["I like hiking in the Alps", "hiking boots", "an entirely new vocabulary word"]
+
+SCRIPT = """
+import json, sys
+from dream.embedding import HashingEmbedder
+print(json.dumps([HashingEmbedder(dim=64).embed(t) for t in json.loads(sys.argv[1])]))
+"""
+
+
+def test_fixed_dimension_for_any_text():
+    embedder = HashingEmbedder(dim=64)
+    assert {len(embedder.embed(text)) for text in TEXTS + [""]} == {64}
+
+
+def test_identical_across_instances_and_batches():
+    a, b = HashingEmbedder(dim=64), HashingEmbedder(dim=64)
+    # the vocabulary seen earlier must not change later vectors
+    b.embed("something else first")
+    assert [a.embed(t) for t in TEXTS] == [b.embed(t) for t in TEXTS]
+    assert a.embed_batch(TEXTS) == [a.embed(t) for t in TEXTS]
+
+
+def test_identical_across_processes():
+    # str hashing is salted per process; the buckets must not depend on it
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    vectors = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+        out = subprocess.run(
+            [sys.executable, "-c", SCRIPT, json.dumps(TEXTS)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        vectors.append(json.loads(out))
+    assert vectors[0] == vectors[1]
+    assert vectors[0] == [HashingEmbedder(dim=64).embed(t) for t in TEXTS]
+
+
+def test_sparse_matches_dense():
+    dense, sparse = HashingEmbedder(dim=64), HashingEmbedder(dim=64, sparse=True)
+    for text in TEXTS:
+        assert sparse.embed(text).to_dense() == dense.embed(text)
+    a, b = dense.embed(TEXTS[0]), dense.embed(TEXTS[1])
+    assert cosine_similarity(a, b) > 0.0
+    assert cosine_similarity(a, a) == pytest.approx(1.0)
+
+
+def test_version_identifies_the_vector_space():
+    versions = {
+        HashingEmbedder(dim=64).version,
+        HashingEmbedder(dim=128).version,
+        HashingEmbedder(dim=64, signed=False).version,
+        HashingEmbedder(dim=64, sparse=True).version,
+    }
+    assert len(versions) == 4
+    assert HashingEmbedder(dim=64).version == HashingEmbedder(dim=64).version
+    with pytest.raises(ValueError):
+        HashingEmbedder(dim=0)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from dream.hnsw import HNSWVectorStore
+from dream.models import EpisodicUnit
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(user_id, embedding, ttl=T0 + timedelta(days=1), summary="s"):
+    return EpisodicUnit(
+        user_id=user_id, episode_id=summary, summary=summary,
+        embedding=embedding, timestamp=T0, ttl=ttl,
+    )
+
+
+def fill(store, vectors, ttl_of=lambda i: T0 + timedelta(days=1)):
+    for i, vec in enumerate(vectors):
+        store.add_eu(make("u", vec.tolist(), ttl=ttl_of(i), summary=str(i)))
+
+
+def exact_top(vectors, q, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return set(np.argsort(-(unit @ q))[:k].tolist())
+
+
+def test_recall_against_exact_search():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(600, 24))
+    store = HNSWVectorStore(exact_threshold=0)
+    fill(store, vectors)
+
+    hits = total = 0
+    for q in rng.normal(size=(30, 24)):
+        got = {int(eu.summary) for eu, _ in store.query("u", q.tolist(), top_k=10, now=T0)}
+        hits += len(got & exact_top(vectors, q, 10))
+        total += 10
+    assert hits / total >= 0.9
+
+
+def test_expired_nodes_never_show_up_and_compaction_keeps_the_rest():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(200, 16))
+    store = HNSWVectorStore(exact_threshold=0, compact_ratio=0.3)
+    # even rows expire after one hour
+    fill(store, vectors, lambda i: T0 + timedelta(hours=1 if i % 2 == 0 else 48))
+
+    later = T0 + timedelta(hours=2)
+    for q in rng.normal(size=(5, 16)):
+        got = store.query("u", q.tolist(), top_k=10, now=later)
+        assert got and all(int(eu.summary) % 2 == 1 for eu, _ in got)
+
+    assert store.delete_expired(now=later) == 100
+    assert len(store.user_eus("u")) == 100
+    target = vectors[7]
+    assert store.query("u", target.tolist(), top_k=1, now=later)[0][0].summary == "7"
+
+
+def test_save_and_load_return_the_same_results(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(150, 16))
+    store = HNSWVectorStore(exact_threshold=0)
+    fill(store, vectors, lambda i: T0 + timedelta(hours=1 if i < 10 else 48))
+    store.add_eu(make("other", [1.0] * 16, summary="other"))
+    later = T0 + timedelta(hours=2)
+    store.delete_expired(now=later)
+    store.save(str(tmp_path))
+
+    loaded = HNSWVectorStore.load(str(tmp_path), exact_threshold=0)
+    assert sorted(loaded.user_ids()) == ["other", "u"]
+    for q in rng.normal(size=(10, 16)):
+        want = [(eu.summary, round(s, 5)) for eu, s in store.query("u", q.tolist(), top_k=5, now=later)]
+        got = [(eu.summary, round(s, 5)) for eu, s in loaded.query("u", q.tolist(), top_k=5, now=later)]
+        assert got == want
+    # TTL deadlines are rebuilt from the EUs
+    assert loaded.delete_expired(now=T0 + timedelta(days=3)) == 141
@@ -0,0 +1,86 @@
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+from dream import DreamOrchestrator, HashingEmbedder, NumpyVectorStore, SimpleSummarizer
+from dream.locking import StripedLock
+
+T0 = datetime(2030, 1, 1)
+
+
+@pytest.fixture
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run(threads, target):
+    workers = [threading.Thread(target=target, args=(k,)) for k in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_key_maps_to_one_reentrant_stripe():
+    locks = StripedLock(8)
+    assert len(locks) == 8
+    assert locks.for_key("alice") is locks.for_key("alice")
+    with locks.for_key("alice"):
+        with locks.for_key("alice"):
+            pass
+    assert len({id(locks.for_key(f"user-{i}")) for i in range(200)}) == 8
+
+
+def test_other_stripes_stay_free_while_one_is_held():
+    locks = StripedLock(8)
+    a = locks.for_key("alice")
+    b = next(locks.for_key(f"u{i}") for i in range(100) if locks.for_key(f"u{i}") is not a)
+    acquired = []
+    with a:
+        def other(_):
+            acquired.append(b.acquire(blocking=False))
+            acquired.append(a.acquire(blocking=False))
+            if acquired[0]:
+                b.release()
+        run(1, other)
+    assert acquired == [True, False]
+
+
+def test_same_stripe_is_mutually_exclusive(fast_switching):
+    locks = StripedLock(4)
+    counts = {"n": 0}
+
+    def bump(_):
+        for _ in range(2000):
+            with locks.for_key("alice"):
+                n = counts["n"]
+                counts["n"] = n + 1
+    run(8, bump)
+    assert counts["n"] == 16000
+
+
+def test_orchestrator_loses_no_events_or_visits(fast_switching):
+    o = DreamOrchestrator(SimpleSummarizer(), HashingEmbedder(), NumpyVectorStore())
+    proposed = []
+
+    def writer(k):
+        for i in range(300):
+            o.record_interaction("u", f"x{k} {i}", "y", now=T0)
+            if i % 50 == 0:
+                proposed.extend(o.build_episode_proposals(["u"], now=T0))
+    run(8, writer)
+    pending = o.build_episode_proposals(["u"], now=T0)
+    assert sum(len(p.events) for p in proposed + pending) == 8 * 300
+
+    eu = o.confirm_episode(proposed[0], True, now=T0)
+
+    def reader(_):
+        for _ in range(200):
+            o.retrieve_context("u", "x", top_k=1, now=T0)
+    run(8, reader)
+    assert eu.visits == 8 * 200
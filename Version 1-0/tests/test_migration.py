@@ -0,0 +1,115 @@
+from datetime import datetime
+
+import pytest
+
+from dream import DreamOrchestrator, HashingEmbedder, NumpyVectorStore, SimpleSummarizer
+from dream.sharding import ShardedOrchestrator
+
+T0 = datetime(2030, 1, 1)
+USERS = [f"user-{i}" for i in range(24)]
+
+# read by shards forked after it is set, see test_failed_import_rolls_back
+FAIL_IMPORT = False
+
+
+class _FailingImport(DreamOrchestrator):
+    def import_user(self, state):
+        raise RuntimeError("import failed")
+
+
+def factory():
+    cls = _FailingImport if FAIL_IMPORT else DreamOrchestrator
+    return cls(summarizer=SimpleSummarizer(), embedder=HashingEmbedder(), vector_store=NumpyVectorStore())
+
+
+@pytest.fixture
+def sharded():
+    with ShardedOrchestrator(num_shards=2, factory=factory, start_method="fork") as orchestrator:
+        for user_id in USERS:
+            orchestrator.configure_user(user_id, max_buffer_events=2)
+            for i in range(2):
+                orchestrator.record_interaction(user_id, f"{user_id} likes topic {i}", "ok", now=T0)
+        for proposal in orchestrator.build_episode_proposals(USERS, now=T0):
+            orchestrator.confirm_episode(proposal, True, now=T0)
+        # a pending buffer must move too
+        for user_id in USERS:
+            orchestrator.record_interaction(user_id, f"{user_id} pending", "ok", now=T0)
+        yield orchestrator
+
+
+def located(orchestrator):
+    return dict(orchestrator._user_locations())
+
+
+def memories(orchestrator):
+    return {
+        user_id: [eu.episode_id for eu in orchestrator.retrieve_context(user_id, f"{user_id} topic", now=T0)]
+        for user_id in USERS
+    }
+
+
+def test_add_shard_cuts_users_over(sharded):
+    before = memories(sharded)
+    shard_id = sharded.add_shard(chunk_size=1)
+
+    where = located(sharded)
+    assert all(where[user_id] == sharded.ring.node_for(user_id) for user_id in USERS)
+    assert shard_id in where.values()
+    assert not sharded._pinned
+    assert memories(sharded) == before
+    assert all(sharded.should_propose_episode(user_id, now=T0) is False for user_id in USERS)
+    sharded.record_interaction(USERS[0], "second pending", "ok", now=T0)
+    assert sharded.should_propose_episode(USERS[0], now=T0)
+
+
+def test_remove_shard_cuts_users_over(sharded):
+    before = memories(sharded)
+    sharded.remove_shard(0)
+
+    assert sharded.shard_ids == [1]
+    assert set(located(sharded).values()) == {1}
+    assert memories(sharded) == before
+
+
+def test_failed_import_rolls_back(sharded):
+    global FAIL_IMPORT
+    before = memories(sharded)
+    where = located(sharded)
+    FAIL_IMPORT = True
+    try:
+        with pytest.raises(RuntimeError):
+            sharded.add_shard()
+    finally:
+        FAIL_IMPORT = False
+
+    # the user that failed stays on, and is served by, its old shard
+    moved = {u for u in USERS if located(sharded)[u] != where[u]}
+    pinned = dict(sharded._pinned)
+    assert pinned and all(where[u] == shard for u, shard in pinned.items())
+    assert all(sharded.shard_for(u) == where[u] for u in pinned)
+    assert not moved
+    assert memories(sharded) == before
+
+
+def test_remove_shard_retry_finishes(sharded, monkeypatch):
+    before = memories(sharded)
+    migrate = sharded._migrate_user
+    calls = []
+
+    def fail_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("migration failed")
+        return migrate(*args)
+
+    monkeypatch.setattr(sharded, "_migrate_user", fail_once)
+    with pytest.raises(RuntimeError):
+        sharded.remove_shard(0)
+    assert 0 not in sharded.ring and 0 in sharded.shard_ids
+
+    sharded.remove_shard(0)
+    assert sharded.shard_ids == [1]
+    assert set(located(sharded).values()) == {1}
+    assert memories(sharded) == before
+    with pytest.raises(KeyError):
+        sharded.remove_shard(0)
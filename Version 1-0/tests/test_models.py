@@ -0,0 +1,55 @@
+import pickle
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from dream.models import EpisodicUnit, MemoryEvent, SparseVector, UserState, embedding_nbytes
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(embedding):
+    return EpisodicUnit(
+        user_id="u", episode_id="e", summary="s", embedding=embedding,
+        timestamp=T0, ttl=T0 + timedelta(days=1), visits=2, topic="t",
+    )
+
+
+def test_models_have_no_instance_dict():
+    eu = make([0.5] * 8)
+    assert not hasattr(eu, "__dict__")
+    with pytest.raises(AttributeError):
+        eu.unknown = 1
+    assert not hasattr(MemoryEvent("u", T0, "in", "out"), "__dict__")
+
+
+def test_dense_lists_are_stored_as_float32_arrays():
+    eu = make([0.25, -1.5, 3.0])
+    assert isinstance(eu.embedding, array) and eu.embedding.typecode == "f"
+    assert list(eu.embedding) == [0.25, -1.5, 3.0]
+    assert embedding_nbytes(eu.embedding) == 12
+    assert make(tuple(range(3))).embedding.typecode == "f"
+
+    # ndarrays (e.g. mapped segment rows) and sparse vectors are kept as given
+    view = np.ones(4, dtype=np.float32)
+    assert make(view).embedding is view
+    sparse = SparseVector.from_dict({3: 1.0}, 16)
+    assert make(sparse).embedding is sparse
+    assert embedding_nbytes(sparse) == 8
+
+
+def test_compact_eu_is_smaller_than_a_list_backed_one():
+    eu = make([0.1] * 1024)
+    assert eu.nbytes() < embedding_nbytes([0.1] * 1024) / 4
+
+
+def test_pickle_round_trip_as_used_between_shards():
+    eu = make([1.0, 2.0])
+    state = UserState(user_id="u", eus=[eu], eu_meta=[(3, T0)])
+    restored = pickle.loads(pickle.dumps(state))
+    (copy,) = restored.eus
+    assert (copy.episode_id, copy.visits, copy.ttl, copy.topic) == ("e", 2, eu.ttl, "t")
+    assert copy.embedding == eu.embedding and copy.embedding.typecode == "f"
+    assert restored.eu_meta == [(3, T0)]
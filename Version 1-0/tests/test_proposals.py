@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from dream.models import EpisodeProposal
+from dream.proposals import ProposalStore
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(user_id="u", created_at=T0, proposal_id=None):
+    kwargs = {"proposal_id": proposal_id} if proposal_id else {}
+    return EpisodeProposal(
+        user_id=user_id, events=[], summary="s", embedding=[1.0], created_at=created_at, **kwargs
+    )
+
+
+def test_get_and_pop_before_ttl():
+    store = ProposalStore(ttl_sec=60)
+    p = make()
+    store.put(p, now=T0)
+    assert store.get(p.proposal_id, now=T0 + timedelta(seconds=59)) is p
+    assert store.pop(p.proposal_id, now=T0 + timedelta(seconds=59)) is p
+    assert store.get(p.proposal_id, now=T0) is None
+
+
+def test_expired_at_ttl():
+    store = ProposalStore(ttl_sec=60)
+    p = make()
+    store.put(p, now=T0)
+    assert store.get(p.proposal_id, now=T0 + timedelta(seconds=60)) is None
+    assert store.pop(p.proposal_id, now=T0 + timedelta(seconds=60)) is None
+    assert len(store) == 0
+
+
+def test_out_of_order_entry_expires_behind_live_one():
+    # import_user / restore_snapshot can insert an older proposal after a
+    # newer one, so eviction from the front never reaches it
+    store = ProposalStore(ttl_sec=60)
+    fresh = make(created_at=T0 + timedelta(seconds=50))
+    stale = make(created_at=T0)
+    store.put(fresh, now=T0 + timedelta(seconds=50))
+    store.put(stale, now=T0 + timedelta(seconds=50))
+    at = T0 + timedelta(seconds=70)
+    assert store.get(stale.proposal_id, now=at) is None
+    assert store.pop(stale.proposal_id, now=at) is None
+    assert store.get(fresh.proposal_id, now=at) is fresh
+
+
+def test_pop_checks_owner():
+    store = ProposalStore(ttl_sec=60)
+    p = make(user_id="alice")
+    store.put(p, now=T0)
+    assert store.pop(p.proposal_id, user_id="bob", now=T0) is None
+    assert store.pop(p.proposal_id, user_id="alice", now=T0) is p
+
+
+def test_max_entries_evicts_oldest():
+    store = ProposalStore(max_entries=2, ttl_sec=60)
+    proposals = [make(created_at=T0 + timedelta(seconds=i)) for i in range(3)]
+    for p in proposals:
+        store.put(p, now=T0 + timedelta(seconds=2))
+    at = T0 + timedelta(seconds=2)
+    assert store.get(proposals[0].proposal_id, now=at) is None
+    assert [store.get(p.proposal_id, now=at) for p in proposals[1:]] == proposals[1:]
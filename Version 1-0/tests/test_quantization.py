@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from dream.models import EpisodicUnit
+from dream.quantization import memory_report, recall_delta
+from dream.segments import MmapVectorStore
+from dream.store import NumpyVectorStore
+
+T0 = datetime(2030, 1, 1)
+N, DIM = 400, 64
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(10, DIM))
+    vectors = centers[rng.integers(0, 10, N)] + 0.5 * rng.normal(size=(N, DIM))
+    queries = centers[rng.integers(0, 10, 40)] + 0.5 * rng.normal(size=(40, DIM))
+    return vectors, queries
+
+
+def fill(store, vectors):
+    eus = [
+        EpisodicUnit(
+            user_id="u", episode_id=str(i), summary=str(i), embedding=vec.tolist(),
+            timestamp=T0, ttl=T0 + timedelta(days=1),
+        )
+        for i, vec in enumerate(vectors)
+    ]
+    for eu in eus:
+        store.add_eu(eu)
+    return eus
+
+
+@pytest.mark.parametrize("mode", ["int8", "float16"])
+def test_rescored_results_are_exact(tmp_path, data, mode):
+    vectors, queries = data
+    exact, quantized = NumpyVectorStore(), MmapVectorStore(str(tmp_path), quantization=mode)
+    fill(exact, vectors)
+    fill(quantized, vectors)
+
+    for q in queries:
+        got = quantized.query("u", q.tolist(), top_k=10, now=T0)
+        want = {eu.summary: sim for eu, sim in exact.query("u", q.tolist(), top_k=10, now=T0)}
+        # similarities come from the full-precision segments, not the codes
+        for eu, sim in got:
+            if eu.summary in want:
+                assert sim == pytest.approx(want[eu.summary], abs=1e-5)
+    report = recall_delta(quantized, [("u", q.tolist()) for q in queries], top_k=10, now=T0)
+    assert report["recall"] >= 0.95
+
+
+def test_caller_eus_keep_their_embeddings(tmp_path, data):
+    vectors, _queries = data
+    store = MmapVectorStore(str(tmp_path), quantization="int8")
+    eus = fill(store, vectors[:20])
+    assert all(list(eu.embedding) == pytest.approx(vec.tolist(), abs=1e-6) for eu, vec in zip(eus, vectors))
+    assert not any(isinstance(eu.embedding, np.ndarray) for eu in eus)
+    assert memory_report(store)["mapped_bytes"] == 0
+
+
+def test_resident_int8_copy_and_mapped_replayed_eus(tmp_path, data):
+    vectors, queries = data
+    plain = MmapVectorStore(str(tmp_path / "plain"))
+    int8 = MmapVectorStore(str(tmp_path / "int8"), quantization="int8")
+    fill(plain, vectors)
+    fill(int8, vectors)
+    # the resident copy costs about one byte per dim on top of the TTLs
+    extra = int8.index_nbytes() - plain.index_nbytes()
+    assert N * DIM <= extra <= 2 * N * DIM
+    int8.close()
+
+    reopened = MmapVectorStore(str(tmp_path / "int8"), quantization="int8")
+    report = memory_report(reopened)
+    assert report["eus"] == N and report["mapped_bytes"] == N * DIM * 4
+    assert [eu.summary for eu, _ in reopened.query("u", queries[0].tolist(), top_k=3, now=T0)] == [
+        eu.summary for eu, _ in plain.query("u", queries[0].tolist(), top_k=3, now=T0)
+    ]
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+from dream.models import EpisodicUnit
+from dream.query_cache import QueryCachedStore
+from dream.segments import MmapVectorStore
+from dream.store import NumpyVectorStore
+
+T0 = datetime(2030, 1, 1)
+Q = [1.0, 0.0, 0.0]
+
+
+def make(episode_id, embedding, hours=24):
+    return EpisodicUnit(
+        user_id="u", episode_id=episode_id, summary=episode_id, embedding=embedding,
+        timestamp=T0, ttl=T0 + timedelta(hours=hours),
+    )
+
+
+def top(store, now=T0, top_k=2):
+    return [eu.episode_id for eu, _sim in store.query("u", Q, top_k=top_k, now=now)]
+
+
+def filled(inner=None):
+    store = QueryCachedStore(inner or NumpyVectorStore())
+    eus = {
+        "a": make("a", [1.0, 0.1, 0.0]),
+        "b": make("b", [1.0, 0.5, 0.0]),
+        "c": make("c", [0.0, 1.0, 0.0]),
+    }
+    for eu in eus.values():
+        store.add_eu(eu)
+    return store, eus
+
+
+def test_writes_invalidate_and_cached_ttl_extensions_do_not():
+    store, eus = filled()
+    assert top(store) == top(store) == ["a", "b"]
+    assert store.stats()["hits"] == 1
+
+    store.add_eu(make("best", [1.0, 0.0, 0.0]))
+    assert top(store) == ["best", "a"]
+
+    # extending an EU of the cached result keeps the entry
+    eus["a"].ttl += timedelta(days=30)
+    store.update_ttl(eus["a"])
+    hits = store.stats()["hits"]
+    assert top(store) == ["best", "a"]
+    assert store.stats()["hits"] == hits + 1
+
+    # reviving an EU outside it does not
+    later = T0 + timedelta(days=2)
+    assert top(store, now=later) == ["a"]
+    eus["b"].ttl += timedelta(days=30)
+    store.update_ttl(eus["b"])
+    assert top(store, now=later) == ["a", "b"]
+
+
+def test_hits_are_masked_on_stored_deadlines_not_eu_ttl():
+    store, eus = filled()
+    assert top(store, top_k=1) == ["a"]
+    # a TTL changed in place but not yet given to update_ttl (ARM journal)
+    # counts for neither the inner store nor the cache
+    eus["a"].ttl += timedelta(days=30)
+    later = T0 + timedelta(days=2)
+    assert top(store, now=later, top_k=1) == []
+    assert top(store, top_k=1) == ["a"]
+    eus["a"].ttl = T0
+    hits = store.stats()["hits"]
+    assert top(store, top_k=1) == ["a"]
+    assert store.stats()["hits"] == hits + 1
+
+    eus["a"].ttl = later + timedelta(days=1)
+    store.update_ttl(eus["a"])
+    assert top(store, now=later, top_k=1) == ["a"]
+
+
+def test_prune_and_drop_user_forget_entries():
+    store, eus = filled()
+    eus["a"].ttl = T0 + timedelta(hours=1)
+    store.update_ttl(eus["a"])
+    top(store)
+    top(store, top_k=3)
+    assert store.stats()["entries"] == 2
+    assert store.delete_expired(now=T0 + timedelta(hours=2)) == 1
+    assert store.stats()["entries"] == 0
+    assert top(store, now=T0 + timedelta(hours=2)) == ["b", "c"]
+
+    assert store.drop_user("u") == 2
+    assert store.stats()["entries"] == 0
+    assert top(store) == []
+
+
+def test_refresh_and_close_go_through_the_cache(tmp_path):
+    root = str(tmp_path)
+    store, _eus = filled(MmapVectorStore(root))
+    assert top(store) == ["a", "b"]
+    store.flush()
+
+    writer = MmapVectorStore(root)
+    writer.add_eu(make("best", [1.0, 0.0, 0.0]))
+    writer.flush()
+    assert top(store) == ["a", "b"]
+    store.refresh("u")
+    assert top(store) == ["best", "a"]
+
+    store.close()
+    assert store.stats()["entries"] == 0
+    assert top(QueryCachedStore(MmapVectorStore(root))) == ["best", "a"]
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dream.models import EpisodicUnit
+from dream_extensions import rerank
+from dream_extensions.rerank import RerankCache, progressive_rerank, query_hash
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(i):
+    return EpisodicUnit(
+        user_id="u", episode_id=f"e{i}", summary=str(i), embedding=[1.0],
+        timestamp=T0, ttl=T0 + timedelta(days=1),
+    )
+
+
+CANDIDATES = [make(i) for i in range(40)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(rerank, "time", fake)
+    return fake
+
+
+def scorer(clock=None, seconds_per_item=0.0, score=lambda eu: int(eu.summary) % 7):
+    calls = []
+
+    def score_fn(query_text, eus):
+        calls.append(len(eus))
+        if clock is not None:
+            clock.now += seconds_per_item * len(eus)
+        return [score(eu) for eu in eus]
+
+    return score_fn, calls
+
+
+def test_deadline_stops_before_a_batch_that_would_overrun(clock):
+    score_fn, calls = scorer(clock, seconds_per_item=0.01)
+    # each batch of 8 takes 0.08s, so only two fit in 0.2s
+    ranked, scored = progressive_rerank(
+        score_fn, "q", CANDIDATES, top_k=3, deadline=clock.now + 0.2, batch_size=8, patience=99,
+    )
+    assert (scored, calls) == (16, [8, 8])
+    head = [eu.summary for eu in ranked[:16]]
+    assert head == sorted(head, key=lambda s: (-(int(s) % 7), int(s)))
+    # the unscored tail keeps its first-stage order
+    assert ranked[16:] == CANDIDATES[16:]
+
+    ranked, scored = progressive_rerank(score_fn, "q", CANDIDATES, top_k=3, deadline=clock.now - 1)
+    assert (ranked, scored) == (CANDIDATES, 0)
+
+
+def test_patience_stops_once_the_top_k_settles():
+    score_fn, calls = scorer(score=lambda eu: -int(eu.summary))
+    _ranked, scored = progressive_rerank(score_fn, "q", CANDIDATES, top_k=3, batch_size=4, patience=2)
+    # the first batch sets the top 3, the next two leave it unchanged
+    assert (scored, calls) == (12, [4, 4, 4])
+
+    # a top that keeps moving is reranked to the end
+    score_fn, calls = scorer(score=lambda eu: int(eu.summary))
+    ranked, scored = progressive_rerank(score_fn, "q", CANDIDATES, top_k=3, batch_size=4, patience=2)
+    assert scored == 40
+    assert [eu.summary for eu in ranked[:3]] == ["39", "38", "37"]
+
+
+def test_cached_scores_are_not_recomputed():
+    cache = RerankCache()
+    score_fn, calls = scorer()
+    first, scored = progressive_rerank(score_fn, "a  b", CANDIDATES, top_k=5, patience=99, cache=cache)
+    assert scored == 40
+    again, scored = progressive_rerank(score_fn, " a b ", CANDIDATES, top_k=5, patience=99, cache=cache)
+    assert (again, scored) == (first, 0)
+    assert cache.stats() == {"hits": 40, "misses": 40, "entries": 40}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RerankCache(max_entries=2)
+    q = query_hash("q")
+    cache.put_many(q, {"a": 1.0, "b": 2.0})
+    assert cache.get_many(q, ["a"]) == {"a": 1.0}
+    cache.put_many(q, {"c": 3.0})
+    assert cache.get_many(q, ["a", "b", "c"]) == {"a": 1.0, "c": 3.0}
+    assert cache.get_many(query_hash("other"), ["a"]) == {}
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,112 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from dream.embedding import cosine_similarity
+from dream.models import EpisodicUnit
+from dream.segments import MmapVectorStore
+from dream.store import InMemoryVectorStore
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(embedding, hours, summary):
+    return EpisodicUnit(
+        user_id="u", episode_id=summary, summary=summary,
+        embedding=embedding, timestamp=T0, ttl=T0 + timedelta(hours=hours),
+    )
+
+
+def fill(store, n=12, dim=8):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim))
+    eus = [make(vec.tolist(), hours=1 + i, summary=str(i)) for i, vec in enumerate(vectors)]
+    for eu in eus:
+        store.add_eu(eu)
+    return vectors, eus
+
+
+def generations(root):
+    (user_dir,) = os.listdir(root)
+    return sorted(n for n in os.listdir(os.path.join(root, user_dir)) if n.startswith("g"))
+
+
+def ranked(store, q, now):
+    return [(eu.summary, round(sim, 5)) for eu, sim in store.query("u", q, top_k=5, now=now)]
+
+
+def test_reopen_replays_adds_ttl_updates_and_deletes(tmp_path):
+    root = str(tmp_path)
+    store = MmapVectorStore(root, segment_rows=4, compact_ratio=1.0)
+    vectors, eus = fill(store)
+    eus[0].ttl = T0 + timedelta(days=30)
+    eus[0].visits = 3
+    store.update_ttl(eus[0])
+    later = T0 + timedelta(hours=3, minutes=30)
+    assert store.delete_expired(now=later) == 2  # rows 1 and 2
+    q = vectors[0].tolist()
+    before = ranked(store, q, later)
+    store.close()
+
+    reopened = MmapVectorStore(root)
+    assert ranked(reopened, q, later) == before
+    replayed = {eu.summary: eu for eu in reopened.user_eus("u")}
+    assert sorted(replayed, key=int) == ["0"] + [str(i) for i in range(3, 12)]
+    assert (replayed["0"].ttl, replayed["0"].visits) == (T0 + timedelta(days=30), 3)
+    # replayed embeddings are views of the mapped segments, not copies
+    assert isinstance(replayed["3"].embedding.base, np.memmap)
+
+
+def test_replayed_embeddings_work_with_cosine_similarity(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    vectors, _eus = fill(store)
+    store.close()
+
+    eus = MmapVectorStore(str(tmp_path)).user_eus("u")
+    assert cosine_similarity(eus[0].embedding, vectors[0].tolist()) == pytest.approx(1.0, abs=1e-6)
+    assert cosine_similarity(eus[0].embedding, np.zeros(0)) == 0.0
+    reference = InMemoryVectorStore()
+    for eu in eus:
+        reference.add_eu(eu)
+    assert reference.query("u", vectors[5], top_k=1, now=T0)[0][0].summary == "5"
+
+
+def test_compaction_moves_to_a_new_generation(tmp_path):
+    root = str(tmp_path)
+    store = MmapVectorStore(root, segment_rows=4, compact_ratio=0.5)
+    vectors, _eus = fill(store)
+    later = T0 + timedelta(hours=8, minutes=30)
+    assert store.delete_expired(now=later) == 8
+
+    assert generations(root) == ["g1"]
+    q = vectors[10].tolist()
+    before = ranked(store, q, later)
+    assert before[0][0] == "10"
+    store.close()
+    assert ranked(MmapVectorStore(root), q, later) == before
+
+
+def test_stale_generation_is_removed_on_next_open(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    store = MmapVectorStore(root, segment_rows=4, compact_ratio=0.5)
+    vectors, _eus = fill(store)
+
+    def locked(path, *args, **kwargs):
+        # what Windows does while a view of the mapping is alive
+        raise PermissionError(path)
+
+    monkeypatch.setattr(shutil, "rmtree", locked)
+    store.delete_expired(now=T0 + timedelta(hours=8, minutes=30))
+    assert generations(root) == ["g0", "g1"]
+    monkeypatch.undo()
+    store.close()
+
+    reopened = MmapVectorStore(root)
+    assert len(reopened.user_eus("u")) == 4
+    assert generations(root) == ["g1"]
+    read_only = MmapVectorStore(root, read_only=True)
+    assert read_only.query("u", vectors[11].tolist(), top_k=1, now=T0)[0][0].summary == "11"
+
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+import pytest
+
+from dream import DreamOrchestrator, HashingEmbedder, InMemoryVectorStore, SimpleSummarizer
+from dream.models import EpisodeProposal
+from dream.proposals import ProposalStore
+
+T0 = datetime(2030, 1, 1)
+
+
+def build():
+    return DreamOrchestrator(
+        summarizer=SimpleSummarizer(),
+        embedder=HashingEmbedder(),
+        vector_store=InMemoryVectorStore(),
+    )
+
+
+def populate(orchestrator):
+    for n in range(4):
+        user_id = f"u{n}"
+        orchestrator.configure_user(user_id, max_buffer_events=3)
+        for i in range(5):
+            orchestrator.record_interaction(user_id, f"hello {i} cats {n}", f"answer {i}", now=T0)
+    proposals = orchestrator.build_episode_proposals(["u0", "u1", "u2"], now=T0)
+    orchestrator.confirm_episode(proposals[0], True, importance_score=0.5, now=T0)
+    orchestrator.confirm_episode(proposals[1], True, now=T0)
+    orchestrator.retrieve_context("u0", "hello cats", now=T0)
+    return proposals
+
+
+def state_of(orchestrator, user_id):
+    state = orchestrator._user_state(user_id)
+    if state is None:
+        return None
+    return (
+        state.config.max_buffer_events if state.config else None,
+        [(e.input_text, e.output_text) for e in state.buffer],
+        sorted(p.proposal_id for p in state.proposals),
+        sorted((eu.episode_id, eu.visits, eu.ttl, eu.importance_score) for eu in state.eus),
+    )
+
+
+def assert_same(a, b):
+    users = set(a.user_ids()) | set(b.user_ids())
+    for user_id in users:
+        assert state_of(a, user_id) == state_of(b, user_id), user_id
+
+
+def test_full_restore(tmp_path):
+    source = build()
+    populate(source)
+    info = source.save_snapshot(str(tmp_path / "full.snp"))
+    assert info.seq == 1
+
+    restored = build()
+    restored.restore_snapshot(str(tmp_path / "full.snp"))
+    assert_same(source, restored)
+    assert [eu.episode_id for eu in restored.retrieve_context("u0", "hello cats", now=T0)]
+
+
+def test_incremental_restore(tmp_path):
+    source = build()
+    proposals = populate(source)
+    source.save_snapshot(str(tmp_path / "full.snp"))
+
+    source.record_interaction("u1", "more dogs", "ok", now=T0)
+    source.confirm_episode(proposals[2], True, now=T0)
+    source.drop_user("u3")
+    info = source.save_snapshot(str(tmp_path / "inc.snp"), incremental=True)
+    assert (info.seq, info.base_seq) == (2, 1)
+
+    restored = build()
+    restored.restore_snapshot(str(tmp_path / "full.snp"))
+    restored.restore_snapshot(str(tmp_path / "inc.snp"))
+    assert_same(source, restored)
+    assert "u3" not in restored.user_ids()
+
+
+def test_incremental_needs_its_base(tmp_path):
+    source = build()
+    populate(source)
+    with pytest.raises(ValueError):
+        source.save_snapshot(str(tmp_path / "inc.snp"), incremental=True)
+    source.save_snapshot(str(tmp_path / "full.snp"))
+    source.record_interaction("u0", "late", "ok", now=T0)
+    source.save_snapshot(str(tmp_path / "inc.snp"), incremental=True)
+
+    with pytest.raises(ValueError):
+        build().restore_snapshot(str(tmp_path / "inc.snp"))
+
+
+def test_restore_refuses_a_user_being_migrated_in(tmp_path):
+    source = build()
+    populate(source)
+    source.save_snapshot(str(tmp_path / "full.snp"))
+
+    target = build()
+    staged = source.vector_store.user_eus("u0")
+    target.stage_eus("u0", staged)
+    with pytest.raises(ValueError):
+        target.restore_snapshot(str(tmp_path / "full.snp"))
+    assert target._staged["u0"] == staged
+
+    target.discard_staged("u0")
+    target.restore_snapshot(str(tmp_path / "full.snp"))
+    assert_same(source, target)
+
+
+def test_proposals_are_indexed_by_user():
+    store = ProposalStore(max_entries=3)
+    a1, b1, a2, b2 = (
+        EpisodeProposal(user_id=u, events=[], summary="s", embedding=[1.0], created_at=T0)
+        for u in ("a", "b", "a", "b")
+    )
+    for proposal in (a1, b1, a2):
+        store.put(proposal, now=T0)
+    assert store.for_user("a") == [a1, a2] and store.for_user("nobody") == []
+
+    store.put(b2, now=T0)  # evicts a1
+    assert store.for_user("a") == [a2]
+    assert store.pop(b1.proposal_id, now=T0) is b1
+    assert store.pop_user("b") == [b2]
+    assert store.for_user("b") == [] and len(store) == 1
+    assert store.pop_user("a") == [a2] and not store._by_user
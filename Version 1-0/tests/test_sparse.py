@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from dream.embedding import cosine_similarity, sparse_dot
+from dream.models import EpisodicUnit, SparseVector
+from dream.store import NumpyVectorStore, _SparseUserRows
+
+T0 = datetime(2030, 1, 1)
+DIM = 4096
+
+
+def make(user_id, embedding, ttl=T0 + timedelta(days=1), summary="s"):
+    return EpisodicUnit(
+        user_id=user_id, episode_id=summary, summary=summary,
+        embedding=embedding, timestamp=T0, ttl=ttl,
+    )
+
+
+def random_sparse(rng, nnz=12, dim=DIM):
+    cols = rng.choice(dim, size=nnz, replace=False)
+    return SparseVector.from_dict(dict(zip(cols.tolist(), rng.normal(size=nnz).tolist())), dim)
+
+
+def test_kernels_match_dense_math():
+    # overlapping on columns 3 and 40 only
+    a = SparseVector.from_dict({1: 0.5, 3: -2.0, 40: 1.5}, 64)
+    b = SparseVector.from_dict({3: 1.0, 7: 4.0, 40: 0.25, 63: -1.0}, 64)
+    da, db = np.array(a.to_dense()), np.array(b.to_dense())
+
+    assert sparse_dot(a, b) == pytest.approx(float(da @ db), abs=1e-6)
+    assert sparse_dot(a, b.to_dense()) == pytest.approx(float(da @ db), abs=1e-6)
+    want = float(da @ db / (np.linalg.norm(da) * np.linalg.norm(db)))
+    assert cosine_similarity(a, b) == pytest.approx(want, abs=1e-6)
+    assert cosine_similarity(a, b.to_dense()) == pytest.approx(want, abs=1e-6)
+    assert cosine_similarity(b.to_dense(), a) == pytest.approx(want, abs=1e-6)
+    assert SparseVector.from_dense(a.to_dense()) == a
+
+
+def test_sparse_bucket_ranks_like_dense_bucket():
+    rng = np.random.default_rng(1)
+    vectors = [random_sparse(rng) for _ in range(30)]
+    sparse, dense = NumpyVectorStore(), NumpyVectorStore()
+    for i, vec in enumerate(vectors):
+        sparse.add_eu(make("u", vec, summary=str(i)))
+        dense.add_eu(make("u", vec.to_dense(), summary=str(i)))
+
+    assert isinstance(sparse._by_user["u"], _SparseUserRows)
+    for q in (vectors[3], random_sparse(rng)):
+        got = sparse.query("u", q, top_k=5, now=T0)
+        want = dense.query("u", q.to_dense(), top_k=5, now=T0)
+        assert [eu.summary for eu, _ in got] == [eu.summary for eu, _ in want]
+        assert [s for _, s in got] == pytest.approx([s for _, s in want], abs=1e-5)
+    assert sparse.query("u", vectors[3], top_k=1, now=T0)[0][0].summary == "3"
+    # 12 non-zeros per row instead of 4096 floats
+    assert sparse.index_nbytes() * 20 < dense.index_nbytes()
+
+
+def test_sparse_bucket_rebuilds_after_prune():
+    rng = np.random.default_rng(2)
+    store = NumpyVectorStore(initial_capacity=2)
+    vectors = [random_sparse(rng) for _ in range(8)]
+    for i, vec in enumerate(vectors):
+        store.add_eu(make("u", vec, ttl=T0 + timedelta(hours=i), summary=str(i)))
+
+    later = T0 + timedelta(hours=4)
+    assert store.delete_expired(now=later) == 5
+    # appended after the prune, before the stale rows are rebuilt
+    store.add_eu(make("u", vectors[0], ttl=later + timedelta(days=1), summary="again"))
+    for i in (5, 6, 7):
+        assert store.query("u", vectors[i], top_k=1, now=later)[0][0].summary == str(i)
+    assert store.query("u", vectors[0], top_k=1, now=later)[0][0].summary == "again"
+    assert len(store.query("u", vectors[0], top_k=10, now=later)) == 4
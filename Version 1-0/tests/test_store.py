@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from dream.models import EpisodicUnit
+from dream.store import InMemoryVectorStore, NumpyVectorStore
+
+T0 = datetime(2030, 1, 1)
+
+
+def make(user_id, embedding, ttl=T0 + timedelta(days=1), summary="s"):
+    return EpisodicUnit(
+        user_id=user_id, episode_id=summary, summary=summary,
+        embedding=embedding, timestamp=T0, ttl=ttl,
+    )
+
+
+def brute_force(vectors, q, top_k):
+    m = np.asarray(vectors, dtype=np.float64)
+    scores = m @ q / (np.linalg.norm(m, axis=1) * np.linalg.norm(q))
+    return list(np.argsort(-scores, kind="stable")[:top_k])
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 40, 100])
+def test_top_k_matches_brute_force(top_k):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 16))
+    # a small initial capacity makes the matrix grow while filling
+    store = NumpyVectorStore(initial_capacity=4)
+    for i, vec in enumerate(vectors):
+        store.add_eu(make("u", vec.tolist(), summary=str(i)))
+
+    q = rng.normal(size=16)
+    got = store.query("u", q.tolist(), top_k=top_k, now=T0)
+    assert [int(eu.summary) for eu, _ in got] == brute_force(vectors, q, top_k)
+    sims = [sim for _, sim in got]
+    assert sims == sorted(sims, reverse=True)
+
+
+def test_scores_agree_with_in_memory_store():
+    rng = np.random.default_rng(1)
+    dense, reference = NumpyVectorStore(), InMemoryVectorStore()
+    for i, vec in enumerate(rng.normal(size=(10, 8))):
+        eu = make("u", vec.tolist(), summary=str(i))
+        dense.add_eu(eu)
+        reference.add_eu(eu)
+    q = rng.normal(size=8).tolist()
+    got = [(eu.summary, round(sim, 5)) for eu, sim in dense.query("u", q, top_k=10, now=T0)]
+    want = [(eu.summary, round(sim, 5)) for eu, sim in reference.query("u", q, top_k=10, now=T0)]
+    assert got == want
+
+
+def test_expired_rows_and_other_users_are_excluded():
+    store = NumpyVectorStore()
+    live = make("u", [1.0, 0.0], summary="live")
+    store.add_eu(live)
+    store.add_eu(make("u", [1.0, 0.1], ttl=T0, summary="expired"))
+    store.add_eu(make("other", [1.0, 0.0], summary="other"))
+
+    assert [eu for eu, _ in store.query("u", [1.0, 0.0], top_k=5, now=T0)] == [live]
+    assert store.query("u", [1.0, 0.0], top_k=0, now=T0) == []
+    assert store.query("missing", [1.0, 0.0], now=T0) == []
+
+
+def test_shorter_vectors_compare_zero_padded():
+    store = NumpyVectorStore()
+    store.add_eu(make("u", [1.0, 0.0, 0.0], summary="long"))
+    store.add_eu(make("u", [0.0, 1.0], summary="short"))
+    got = store.query("u", [0.0, 1.0, 0.0], top_k=2, now=T0)
+    assert [eu.summary for eu, _ in got] == ["short", "long"]
+    assert got[0][1] == pytest.approx(1.0)
+
+
+def test_prune_keeps_remaining_rows_queryable():
+    store = NumpyVectorStore(initial_capacity=2)
+    eus = [
+        make("u", [1.0, float(i)], ttl=T0 + timedelta(hours=i), summary=str(i))
+        for i in range(6)
+    ]
+    for eu in eus:
+        store.add_eu(eu)
+
+    assert store.delete_expired(now=T0 + timedelta(hours=3)) == 4
+    got = store.query("u", [1.0, 5.0], top_k=5, now=T0 + timedelta(hours=3))
+    assert [eu.summary for eu, _ in got] == ["5", "4"]
+    assert {eu.summary for eu in store.user_eus("u")} == {"4", "5"}
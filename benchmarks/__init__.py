@@ -0,0 +1,8 @@
+"""
+End-to-end benchmarks for the DREAM write and read paths.
+
+    python -m benchmarks --paths dream,core --users 10,100 --backend numpy,hnsw
+
+Everything runs offline on the stub summarizer/embedder; results are
+printed (or written with --out) as JSON.
+"""
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from datetime import datetime
+from itertools import product
+from typing import List
+import argparse
+import json
+import platform
+import sys
+from . import core_path, dream_path
+from .harness import run_isolated
+
+_PATHS = {"dream": dream_path, "core": core_path}
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def _strs(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _optional(values: List[str]) -> List:
+    return [None if v == "none" else v for v in values]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="End-to-end DREAM benchmarks. Comma-separated values run as a grid.",
+    )
+    parser.add_argument("--paths", type=_strs, default=["dream"], help="dream,core")
+    parser.add_argument("--users", type=_ints, default=[10])
+    parser.add_argument("--eus-per-user", type=_ints, default=[20])
+    parser.add_argument("--events-per-eu", type=_ints, default=[4])
+    parser.add_argument("--queries-per-user", type=_ints, default=[20])
+    parser.add_argument("--dim", type=_ints, default=[384], help="embedding dimension (dream path)")
+    parser.add_argument("--backend", type=_strs, default=["numpy"], help="numpy,hnsw,memory,mmap")
+    parser.add_argument("--quantization", type=_strs, default=["none"], help="none,int8,float16")
+    parser.add_argument("--sparse", action="store_true", help="sparse stub embeddings (dream path)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-isolate", action="store_true", help="run scenarios in this process")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def scenarios(args: argparse.Namespace):
+    for path in args.paths:
+        if path not in _PATHS:
+            raise SystemExit(f"unknown path {path!r}, expected one of {sorted(_PATHS)}")
+        if path == "core":
+            for users, eus, queries in product(args.users, args.eus_per_user, args.queries_per_user):
+                yield path, {
+                    "users": users,
+                    "eus_per_user": eus,
+                    "queries_per_user": queries,
+                    "seed": args.seed,
+                }
+            continue
+        grid = product(
+            args.users,
+            args.eus_per_user,
+            args.events_per_eu,
+            args.queries_per_user,
+            args.dim,
+            args.backend,
+            _optional(args.quantization),
+        )
+        for users, eus, events, queries, dim, backend, quantization in grid:
+            if quantization is not None and backend != "mmap":
+                continue
+            yield path, {
+                "users": users,
+                "eus_per_user": eus,
+                "events_per_eu": events,
+                "queries_per_user": queries,
+                "dim": dim,
+                "sparse": args.sparse,
+                "backend": backend,
+                "quantization": quantization,
+                "top_k": args.top_k,
+                "seed": args.seed,
+            }
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    results = []
+    for path, params in scenarios(args):
+        fn = _PATHS[path].run
+        result = fn(params) if args.no_isolate else run_isolated(fn, params)
+        results.append(result)
+        print(f"[bench] {path} {params} done", file=sys.stderr)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "isolated": not args.no_isolate,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
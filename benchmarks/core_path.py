@@ -0,0 +1,65 @@
+from __future__ import annotations
+from typing import Dict
+import contextlib
+import io
+import time
+from .harness import LatencyRecorder, peak_rss_mb
+from .workload import TextGenerator
+
+DEFAULTS: Dict[str, object] = {
+    "users": 10,
+    "eus_per_user": 20,
+    "queries_per_user": 20,
+    "arm_flush_interval_sec": None,
+    "seed": 0,
+}
+
+
+def run(params: dict) -> dict:
+    """
+    Drives the core/ DreamOrchestrator: save_interaction for every EU, then
+    retrieve_context queries. Embeddings are the core's 384-dim mock vectors;
+    the vector index is an in-memory ChromaDB collection.
+    """
+    p = dict(DEFAULTS, **params)
+    try:
+        from core.orchestrator import DreamOrchestrator
+    except ImportError as exc:
+        # chromadb is the one dependency of this path
+        return {"path": "core", "params": p, "skipped": f"{type(exc).__name__}: {exc}"}
+
+    rss_start = peak_rss_mb()
+    gen = TextGenerator(seed=p["seed"])
+    timings = LatencyRecorder()
+    user_ids = [f"user-{i}" for i in range(p["users"])]
+
+    # the core orchestrator logs every call to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator = DreamOrchestrator(arm_flush_interval_sec=p["arm_flush_interval_sec"])
+
+        write_start = time.perf_counter()
+        for _ in range(p["eus_per_user"]):
+            for user_id in user_ids:
+                with timings.measure("save_interaction"):
+                    orchestrator.save_interaction(user_id, gen.sentence(), gen.sentence())
+        write_s = time.perf_counter() - write_start
+
+        read_start = time.perf_counter()
+        for _ in range(p["queries_per_user"]):
+            for user_id in user_ids:
+                with timings.measure("retrieve_context"):
+                    orchestrator.retrieve_context(user_id, gen.query())
+        read_s = time.perf_counter() - read_start
+
+        if orchestrator.arm_journal is not None:
+            orchestrator.arm_journal.close()
+
+    return {
+        "path": "core",
+        "params": p,
+        "ops": timings.summary(),
+        "write_s": round(write_s, 6),
+        "read_s": round(read_s, 6),
+        "rss_start_mb": rss_start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from typing import Dict
+import os
+import shutil
+import sys
+import tempfile
+import time
+from .harness import LatencyRecorder, peak_rss_mb
+from .workload import TextGenerator
+
+# the DREAM package and its app layer live under "Version 1-0/"
+_V1 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Version 1-0")
+if _V1 not in sys.path:
+    sys.path.insert(0, _V1)
+
+DEFAULTS: Dict[str, object] = {
+    "users": 10,
+    "eus_per_user": 20,
+    "events_per_eu": 4,
+    "queries_per_user": 20,
+    "dim": 384,
+    "sparse": False,
+    "backend": "numpy",
+    "quantization": None,
+    "top_k": 5,
+    "seed": 0,
+}
+
+
+def run(params: dict) -> dict:
+    """
+    Drives DreamOrchestrator through the full episode lifecycle:
+    record_interaction -> should_propose_episode -> build_episode_proposal
+    -> confirm_episode for every EU (users interleaved round-robin), then
+    retrieve_context queries. Offline: stub summarizer and hashing embedder.
+    """
+    from dream.orchestrator import DreamOrchestrator
+    from app.llm_clients import StubSummarizerLLM, StubEmbedderLLM
+    from app.vector_clients import get_default_vector_store
+
+    p = dict(DEFAULTS, **params)
+    rss_start = peak_rss_mb()
+    gen = TextGenerator(seed=p["seed"])
+    timings = LatencyRecorder()
+
+    store_dir = tempfile.mkdtemp(prefix="dream-bench-") if p["backend"] == "mmap" else None
+    try:
+        orchestrator = DreamOrchestrator(
+            summarizer=StubSummarizerLLM(),
+            embedder=StubEmbedderLLM(dim=p["dim"], sparse=p["sparse"]),
+            vector_store=get_default_vector_store(
+                p["backend"], path=store_dir or "dream_segments", quantization=p["quantization"]
+            ),
+        )
+        user_ids = [f"user-{i}" for i in range(p["users"])]
+        for user_id in user_ids:
+            orchestrator.configure_user(user_id, max_buffer_events=p["events_per_eu"])
+
+        write_start = time.perf_counter()
+        for _ in range(p["eus_per_user"]):
+            for user_id in user_ids:
+                for _ in range(p["events_per_eu"]):
+                    with timings.measure("record_interaction"):
+                        orchestrator.record_interaction(user_id, gen.sentence(), gen.sentence())
+                with timings.measure("should_propose_episode"):
+                    ready = orchestrator.should_propose_episode(user_id)
+                if not ready:
+                    continue
+                with timings.measure("build_episode_proposal"):
+                    proposal = orchestrator.build_episode_proposal(user_id)
+                with timings.measure("confirm_episode"):
+                    orchestrator.confirm_episode(proposal, user_confirmed=True)
+        write_s = time.perf_counter() - write_start
+
+        read_start = time.perf_counter()
+        hits = 0
+        for _ in range(p["queries_per_user"]):
+            for user_id in user_ids:
+                with timings.measure("retrieve_context"):
+                    hits += len(orchestrator.retrieve_context(user_id, gen.query(), top_k=p["top_k"]))
+        read_s = time.perf_counter() - read_start
+        close = getattr(orchestrator.vector_store, "close", None)
+        if close is not None:
+            close()
+    finally:
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    return {
+        "path": "dream",
+        "params": p,
+        "ops": timings.summary(),
+        "write_s": round(write_s, 6),
+        "read_s": round(read_s, 6),
+        "retrieved": hits,
+        "rss_start_mb": rss_start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,80 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import math
+import multiprocessing
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far, in MiB.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+class LatencyRecorder:
+    """
+    Per-operation wall-clock samples (perf_counter), summarized as
+    throughput and p50/p95/p99 latency.
+    """
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, op: str, seconds: float) -> None:
+        self.samples.setdefault(op, []).append(seconds)
+
+    @contextmanager
+    def measure(self, op: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(op, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, dict]:
+        out = {}
+        for op, values in self.samples.items():
+            values = sorted(values)
+            total = sum(values)
+            out[op] = {
+                "count": len(values),
+                "total_s": round(total, 6),
+                "throughput_ops_s": round(len(values) / total, 2) if total > 0 else None,
+                "p50_ms": round(percentile(values, 50) * 1000.0, 4),
+                "p95_ms": round(percentile(values, 95) * 1000.0, 4),
+                "p99_ms": round(percentile(values, 99) * 1000.0, 4),
+                "max_ms": round(values[-1] * 1000.0, 4),
+            }
+        return out
+
+
+def run_isolated(fn: Callable[[dict], dict], params: dict) -> dict:
+    """
+    Runs one scenario in a fresh spawned process, so its peak RSS is not
+    inflated by the scenarios that ran before it.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, params).result()
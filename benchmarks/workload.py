@@ -0,0 +1,29 @@
+from __future__ import annotations
+from itertools import accumulate
+from typing import List
+import random
+
+class TextGenerator:
+    """
+    Deterministic chat-like text: words drawn from a synthetic vocabulary
+    with Zipf-distributed frequencies, so lexical embeddings overlap the
+    way real conversations do.
+    """
+    def __init__(self, seed: int = 0, vocab_size: int = 5000, zipf_s: float = 1.1):
+        self.rng = random.Random(seed)
+        syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "vi", "zo", "pe", "su", "da", "gi"]
+        self.vocab: List[str] = []
+        seen = set()
+        while len(self.vocab) < vocab_size:
+            word = "".join(self.rng.choice(syllables) for _ in range(self.rng.randint(2, 4)))
+            if word not in seen:
+                seen.add(word)
+                self.vocab.append(word)
+        self.cum_weights = list(accumulate(1.0 / (rank ** zipf_s) for rank in range(1, vocab_size + 1)))
+
+    def sentence(self, min_words: int = 8, max_words: int = 16) -> str:
+        n = self.rng.randint(min_words, max_words)
+        return " ".join(self.rng.choices(self.vocab, cum_weights=self.cum_weights, k=n))
+
+    def query(self) -> str:
+        return self.sentence(3, 6)
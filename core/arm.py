@@ -41,6 +41,18 @@ class AdaptiveRetention:
     else:
       print(f"   [ARM] 🔄 TTL renewed: +{days_to_add} days.")
 
+  def apply_revisits(self, memory: EpisodicUnit, count: int, now: float = None):
+    """
+    Applies `count` merged revisits in one step (used by the ARM journal).
+    Ends in the same state as `count` calls to process_revisit() made at
+    `now`: the TTL only depends on the final visit count.
+    """
+    memory.visits += count
+    days_to_add = min(self.base_ttl_days * (2 ** memory.visits), self.max_ttl_days)
+    memory.ttl_expiration = (now if now is not None else time.time()) + (days_to_add * 86400)
+    if memory.status == "DORMANT":
+      memory.status = "ACTIVE"
+
   def check_lifecycle(self, memory: EpisodicUnit):
     """
     Runs periodically or upon access. Decides if memory should move to Cold Storage.
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+
+class ARMJournal:
+  """
+  Write-behind journal for ARM revisits (Memory Retrieval Service hot path).
+  Visits are merged per memory id and written back in one batch per flush,
+  instead of one episodic_db.update_memory() per retrieved memory.
+
+  Flushes when `max_pending` memories are waiting or `flush_interval_sec`
+  has passed (checked on every record and by the background thread).
+  With `wal_path` every visit is appended to a log before it counts
+  (`fsync=True` also survives power loss) and recover() re-applies what a
+  crash left behind; a batch flushed right before the crash may be
+  applied twice.
+
+  Same algorithm as dream.arm_journal.ARMJournal in Version 1-0; the two
+  trees ship separately and import nothing from each other, so a fix to
+  one belongs in both.
+  """
+
+  def __init__(self, arm, episodic_db, max_pending=256, flush_interval_sec=1.0, wal_path=None, fsync=False):
+    self.arm = arm
+    self.episodic_db = episodic_db
+    self.max_pending = max_pending
+    self.flush_interval_sec = flush_interval_sec
+    self.wal_path = wal_path
+    self.fsync = fsync
+
+    self.pending = {}  # memory_id -> [memory, visits, last_seen]
+    self.lock = threading.Lock()
+    self.last_flush = time.monotonic()
+    self.wal = open(wal_path, "a", encoding="utf-8") if wal_path else None
+    self.stop_event = threading.Event()
+    self.thread = None
+
+  def _queue(self, memory, now):
+    entry = self.pending.get(memory.id)
+    if entry is None:
+      entry = [memory, 0, now]
+      self.pending[memory.id] = entry
+    entry[1] += 1
+    entry[2] = max(entry[2], now)
+
+  def record(self, memory, now=None):
+    """Counts one revisit. Nothing is written to the Episodic DB here."""
+    now = now if now is not None else time.time()
+    with self.lock:
+      if self.wal is not None:
+        self.wal.write(json.dumps({"id": memory.id, "ts": now}) + "\n")
+        self.wal.flush()
+        if self.fsync:
+          os.fsync(self.wal.fileno())
+      self._queue(memory, now)
+      due = (
+        len(self.pending) >= self.max_pending
+        or time.monotonic() - self.last_flush >= self.flush_interval_sec
+      )
+    if due:
+      self.flush()
+
+  def flush(self) -> int:
+    """Applies the merged visits and persists them in one batch."""
+    with self.lock:
+      self.last_flush = time.monotonic()
+      if not self.pending:
+        return 0
+      memories = []
+      for memory, visits, last_seen in self.pending.values():
+        self.arm.apply_revisits(memory, visits, now=last_seen)
+        memories.append(memory)
+
+      update_many = getattr(self.episodic_db, "update_many", None)
+      if update_many is not None:
+        update_many(memories)
+      else:
+        for memory in memories:
+          self.episodic_db.update_memory(memory)
+
+      self.pending.clear()
+      if self.wal is not None:
+        self.wal.truncate(0)
+        self.wal.flush()
+        if self.fsync:
+          os.fsync(self.wal.fileno())
+      return len(memories)
+
+  def pending_visits(self, memory_id: str) -> int:
+    entry = self.pending.get(memory_id)
+    return entry[1] if entry is not None else 0
+
+  def visits(self, memory) -> int:
+    """Read-your-writes visit count: stored visits plus journaled ones."""
+    with self.lock:
+      return memory.visits + self.pending_visits(memory.id)
+
+  def recover(self) -> int:
+    """Re-applies visits logged before a crash. Returns how many."""
+    if not self.wal_path or not os.path.exists(self.wal_path):
+      return 0
+    recovered = 0
+    with self.lock, open(self.wal_path, encoding="utf-8") as fh:
+      for line in fh:
+        try:
+          rec = json.loads(line)
+        except ValueError:
+          continue  # torn last line
+        memory = self.episodic_db.get_memory(rec["id"])
+        if memory is None:
+          continue
+        self._queue(memory, rec["ts"])
+        recovered += 1
+    self.flush()
+    return recovered
+
+  def _run(self):
+    while not self.stop_event.wait(self.flush_interval_sec):
+      self.flush()
+
+  def start(self):
+    if self.thread is None or not self.thread.is_alive():
+      self.stop_event.clear()
+      self.thread = threading.Thread(target=self._run, name="arm-journal", daemon=True)
+      self.thread.start()
+
+  def close(self):
+    self.stop_event.set()
+    if self.thread is not None:
+      self.thread.join()
+      self.thread = None
+    self.flush()
+    if self.wal is not None:
+      self.wal.close()
+      self.wal = None
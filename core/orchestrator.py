@@ -1,8 +1,9 @@
 import uuid
-from memory.episodic_db import EpisodicDB
+from memory.episodic_db import EpisodicDB, SQLiteEpisodicDB
 from memory.vector_db import VectorDB
 from memory.retrieval import RetrievalService
 from core.arm import AdaptiveRetention
+from core.arm_journal import ARMJournal
 from core.summarizer import TextSummarizer
 from models.episodic_unit import EpisodicUnit
 
@@ -11,18 +12,32 @@ class DreamOrchestrator:
   The main coordinator (Shard). Connects all components.
   """
 
-  def __init__(self):
+  def __init__(self, arm_flush_interval_sec: float = None, arm_wal_path: str = None, episodic_db_path: str = None):
     # Initialize Components
-    self.episodic_db = EpisodicDB()
+    # In-memory metadata by default; a path selects the persistent SQLite store
+    self.episodic_db = SQLiteEpisodicDB(episodic_db_path) if episodic_db_path else EpisodicDB()
     self.vector_db = VectorDB()
     self.arm = AdaptiveRetention()
     self.summarizer = TextSummarizer()
 
+    # Optional write-behind journal for ARM revisits
+    self.arm_journal = None
+    if arm_flush_interval_sec is not None:
+      self.arm_journal = ARMJournal(
+        arm=self.arm,
+        episodic_db=self.episodic_db,
+        flush_interval_sec=arm_flush_interval_sec,
+        wal_path=arm_wal_path
+      )
+      self.arm_journal.recover()
+      self.arm_journal.start()
+
     # Inject dependencies into Retrieval Service
     self.retrieval_service = RetrievalService(
       vector_db=self.vector_db,
       episodic_db=self.episodic_db,
-      arm=self.arm
+      arm=self.arm,
+      journal=self.arm_journal
     )
 
   def save_interaction(self, user_id: str, user_text: str, ai_response: str = ""):
@@ -63,4 +78,26 @@ class DreamOrchestrator:
     # 2. Delegate to Service
     contexts = self.retrieval_service.search_memories(user_id, query_vec)
 
-    return contexts
\ No newline at end of file
+    return contexts
+
+  def prune_expired(self, now: float = None, limit: int = None) -> int:
+    """
+    Soft delete sweep: moves ACTIVE memories whose TTL passed to Cold
+    Storage. One bulk UPDATE without a limit; with one, the earliest
+    `limit` expired memories are demoted in a single batch.
+    """
+    # Pending revisits extend TTLs; apply them before anything is demoted
+    if self.arm_journal is not None:
+      self.arm_journal.flush()
+
+    if limit is None:
+      moved = self.episodic_db.demote_expired(now)
+    else:
+      expired = self.episodic_db.list_expired(now, limit=limit)
+      for memory in expired:
+        memory.status = "DORMANT"
+      self.episodic_db.update_many(expired)
+      moved = len(expired)
+
+    print(f"[ORCH] ❄️ {moved} expired memories moved to Cold Storage.")
+    return moved
\ No newline at end of file
@@ -0,0 +1,313 @@
+from __future__ import annotations
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import math
+import re
+import threading
+import numpy as np
+from dream.models import EpisodicUnit
+from dream.interfaces import VectorStore
+from dream.expiry import ExpiryIndex
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# slack for float error when pruning on score bounds, so ties survive
+_EPS = 1e-9
+
+
+def tokenize(text: str) -> List[str]:
+    # "INV-2024-0012" -> ["inv", "2024", "0012"]: IDs stay matchable piecewise
+    return _TOKEN.findall(text.lower())
+
+
+class _Postings:
+    """
+    Compact postings list: ascending doc ids (array 'I') with parallel
+    term frequencies (array 'H'). Docs are only ever appended with a new,
+    larger id, so the lists stay sorted without inserts.
+    """
+    __slots__ = ("docs", "tfs", "df", "max_tf")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.tfs = array("H")
+        self.df = 0  # live docs only
+        self.max_tf = 0  # never lowered on delete: still a valid upper bound
+
+
+class _UserIndex:
+    __slots__ = ("postings", "eus", "lengths", "ttls", "rows", "live", "total_len")
+
+    def __init__(self):
+        self.postings: Dict[str, _Postings] = {}
+        self.eus: List[Optional[EpisodicUnit]] = []  # doc id -> EU, None when removed
+        self.lengths = array("I")
+        self.ttls = np.full(16, -np.inf)  # POSIX seconds, -inf when removed
+        self.rows: Dict[int, int] = {}  # id(eu) -> doc id
+        self.live = 0
+        self.total_len = 0
+
+    def add(self, eu: EpisodicUnit, tokens: List[str]) -> None:
+        doc = len(self.eus)
+        counts: Dict[str, int] = {}
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, tf in counts.items():
+            plist = self.postings.get(tok)
+            if plist is None:
+                plist = self.postings[tok] = _Postings()
+            tf = min(tf, 0xFFFF)
+            plist.docs.append(doc)
+            plist.tfs.append(tf)
+            plist.df += 1
+            if tf > plist.max_tf:
+                plist.max_tf = tf
+        if doc >= self.ttls.shape[0]:
+            ttls = np.full(2 * self.ttls.shape[0], -np.inf)
+            ttls[:doc] = self.ttls[:doc]
+            self.ttls = ttls
+        self.ttls[doc] = eu.ttl.timestamp()
+        self.eus.append(eu)
+        self.lengths.append(len(tokens))
+        self.rows[id(eu)] = doc
+        self.live += 1
+        self.total_len += len(tokens)
+
+    def remove(self, doc: int, tokens: List[str]) -> EpisodicUnit:
+        eu = self.eus[doc]
+        self.eus[doc] = None
+        self.ttls[doc] = -np.inf
+        del self.rows[id(eu)]
+        for tok in set(tokens):
+            plist = self.postings.get(tok)
+            if plist is not None:
+                plist.df -= 1
+        self.live -= 1
+        self.total_len -= self.lengths[doc]
+        return eu
+
+
+class BM25Index:
+    """
+    Per-user BM25 inverted index over EU summaries (and topics), for the
+    names and IDs that embeddings miss.
+    Kept in sync incrementally: add_eu() appends postings, expiry and
+    removals tombstone the doc and adjust df / average length, and a
+    user's postings are rebuilt once tombstones exceed `compact_ratio`.
+    search() is MaxScore, vectorized with NumPy: every term carries an
+    upper bound of its score; terms are scored exhaustively from the
+    highest bound down only until the bounds left cannot lift a new doc
+    into the top_k, and the remaining (frequent, low-idf) terms are just
+    probed with a binary search for the candidates still in the running.
+    Implements the write side of VectorStore (add_eu, update_ttl,
+    delete_expired, drop_user); LexicalIndexedStore mirrors a store's
+    writes into it.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._by_user: Dict[str, _UserIndex] = {}
+        self._expiry = ExpiryIndex()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _tokens(eu: EpisodicUnit) -> List[str]:
+        text = eu.summary if not eu.topic else f"{eu.summary} {eu.topic}"
+        return tokenize(text)
+
+    # ---------------- WRITES ----------------
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        tokens = self._tokens(eu)
+        with self._lock:
+            index = self._by_user.get(eu.user_id)
+            if index is None:
+                index = self._by_user[eu.user_id] = _UserIndex()
+            index.add(eu, tokens)
+            self._expiry.schedule((eu.user_id, id(eu)), eu.ttl.timestamp())
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        with self._lock:
+            index = self._by_user.get(eu.user_id)
+            doc = index.rows.get(id(eu)) if index else None
+            if doc is not None:
+                index.ttls[doc] = eu.ttl.timestamp()
+                self._expiry.schedule((eu.user_id, id(eu)), index.ttls[doc])
+
+    def remove_eu(self, eu: EpisodicUnit) -> bool:
+        with self._lock:
+            index = self._by_user.get(eu.user_id)
+            doc = index.rows.get(id(eu)) if index else None
+            if doc is None:
+                return False
+            self._expiry.discard((eu.user_id, id(eu)))
+            self._remove(eu.user_id, index, doc)
+            return True
+
+    def _remove(self, user_id: str, index: _UserIndex, doc: int) -> None:
+        index.remove(doc, self._tokens(index.eus[doc]))
+        if index.live == 0:
+            del self._by_user[user_id]
+        elif len(index.eus) - index.live > self.compact_ratio * len(index.eus):
+            self._compact(user_id, index)
+
+    def _compact(self, user_id: str, index: _UserIndex) -> None:
+        fresh = _UserIndex()
+        for eu in index.eus:
+            if eu is not None:
+                fresh.add(eu, self._tokens(eu))
+        self._by_user[user_id] = fresh
+
+    def delete_expired(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> int:
+        now = now or datetime.utcnow()
+
+        def ttl_of(key) -> Optional[float]:
+            user_id, eu_key = key
+            index = self._by_user.get(user_id)
+            doc = index.rows.get(eu_key) if index else None
+            return float(index.ttls[doc]) if doc is not None else None
+
+        def remove(key) -> None:
+            user_id, eu_key = key
+            index = self._by_user[user_id]
+            self._remove(user_id, index, index.rows[eu_key])
+
+        with self._lock:
+            return self._expiry.drain(now.timestamp(), ttl_of, remove, limit=limit)
+
+    def drop_user(self, user_id: str) -> int:
+        with self._lock:
+            index = self._by_user.pop(user_id, None)
+            if index is None:
+                return 0
+            for eu_key in index.rows:
+                self._expiry.discard((user_id, eu_key))
+            return index.live
+
+    # ---------------- SEARCH ----------------
+
+    def search_scored(
+        self,
+        user_id: str,
+        query_text: str,
+        top_k: int = 5,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[EpisodicUnit, float]]:
+        now = now or datetime.utcnow()
+        terms_in = set(tokenize(query_text))
+        if top_k <= 0 or not terms_in:
+            return []
+        with self._lock:
+            index = self._by_user.get(user_id)
+            if index is None or index.live == 0:
+                return []
+            n = index.live
+            avgdl = index.total_len / n or 1.0
+            k1, b = self.k1, self.b
+            terms = []
+            for term in terms_in:
+                plist = index.postings.get(term)
+                if plist is None or plist.df <= 0:
+                    continue
+                idf = math.log(1.0 + (n - plist.df + 0.5) / (plist.df + 0.5))
+                # the length norm is smallest for an empty doc: k1 * (1 - b)
+                upper = idf * plist.max_tf * (k1 + 1.0) / (plist.max_tf + k1 * (1.0 - b))
+                terms.append((upper, idf, plist))
+            if not terms:
+                return []
+            terms.sort(key=lambda t: -t[0])
+
+            now_ts = now.timestamp()
+            lengths = np.frombuffer(index.lengths, dtype=np.uint32)
+            acc = np.zeros(len(index.eus), dtype=np.float64)
+
+            def contribution(idf, tfs, docs):
+                norms = k1 * (1.0 - b + b * lengths[docs] / avgdl)
+                return idf * tfs * (k1 + 1.0) / (tfs + norms)
+
+            # essential terms: scored over their whole postings list. Work
+            # is proportional to the postings read, never to the corpus.
+            remaining = sum(t[0] for t in terms)
+            threshold = 0.0
+            seen = np.zeros(len(index.eus), dtype=bool)
+            done = 0
+            for upper, idf, plist in terms:
+                docs = np.frombuffer(plist.docs, dtype=np.uint32)
+                tfs = np.frombuffer(plist.tfs, dtype=np.uint16).astype(np.float64)
+                acc[docs] += contribution(idf, tfs, docs)
+                remaining = max(0.0, remaining - upper)
+                done += 1
+                seen[docs] = True
+                touched = np.flatnonzero(seen)
+                touched = touched[index.ttls[touched] > now_ts]
+                if touched.shape[0] > top_k:
+                    threshold = float(np.partition(acc[touched], -top_k)[-top_k])
+                if remaining <= threshold:
+                    break
+
+            # non-essential terms: only docs that can still reach the top_k
+            candidates = touched[acc[touched] + remaining >= threshold - _EPS]
+            for upper, idf, plist in terms[done:]:
+                if candidates.shape[0] == 0:
+                    break
+                docs = np.frombuffer(plist.docs, dtype=np.uint32)
+                pos = np.searchsorted(docs, candidates)
+                inside = pos < docs.shape[0]
+                hit = np.zeros(candidates.shape[0], dtype=bool)
+                hit[inside] = docs[pos[inside]] == candidates[inside]
+                if hit.any():
+                    found = candidates[hit]
+                    tfs = np.frombuffer(plist.tfs, dtype=np.uint16)[pos[hit]].astype(np.float64)
+                    acc[found] += contribution(idf, tfs, found)
+                remaining = max(0.0, remaining - upper)
+                candidates = candidates[acc[candidates] + remaining >= threshold - _EPS]
+
+            if candidates.shape[0] == 0:
+                return []
+            scores = acc[candidates]
+            if top_k < candidates.shape[0]:
+                part = np.argpartition(-scores, top_k - 1)[:top_k]
+                candidates, scores = candidates[part], scores[part]
+            order = np.lexsort((candidates, -scores))
+            return [(index.eus[candidates[i]], float(scores[i])) for i in order]
+
+    def search(self, user_id: str, query_text: str, top_k: int = 5) -> List[EpisodicUnit]:
+        return [eu for eu, _score in self.search_scored(user_id, query_text, top_k)]
+
+
+class LexicalIndexedStore(VectorStore):
+    """
+    VectorStore wrapper that mirrors every write of `inner` into a
+    BM25Index, so the lexical index follows confirmations, ARM TTL
+    updates, expiry and user moves without extra calls.
+    """
+    def __init__(self, inner: VectorStore, bm25: Optional[BM25Index] = None):
+        self.inner = inner
+        self.bm25 = bm25 or BM25Index()
+
+    def add_eu(self, eu: EpisodicUnit) -> None:
+        self.inner.add_eu(eu)
+        self.bm25.add_eu(eu)
+
+    def update_ttl(self, eu: EpisodicUnit) -> None:
+        self.inner.update_ttl(eu)
+        self.bm25.update_ttl(eu)
+
+    def query(self, user_id, query_embedding, top_k=5, now=None):
+        return self.inner.query(user_id, query_embedding, top_k=top_k, now=now)
+
+    def delete_expired(self, now=None, limit=None):
+        removed = self.inner.delete_expired(now=now, limit=limit)
+        self.bm25.delete_expired(now=now, limit=limit)
+        return removed
+
+    def user_ids(self):
+        return self.inner.user_ids()
+
+    def user_eus(self, user_id):
+        return self.inner.user_eus(user_id)
+
+    def drop_user(self, user_id):
+        self.bm25.drop_user(user_id)
+        return self.inner.drop_user(user_id)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+import heapq
+from dream.models import EpisodicUnit
+
+FUSIONS = ("rrf", "weighted")
+
+# one ranked branch: (eu, score) best first; score may be None when the
+# branch only knows the order (e.g. a text-only search())
+Ranked = Sequence[Tuple[EpisodicUnit, Optional[float]]]
+
+
+def check_fusion(fusion: str) -> str:
+    if fusion not in FUSIONS:
+        raise ValueError(f"fusion must be one of {FUSIONS}, got {fusion!r}")
+    return fusion
+
+
+def _merge(
+    branches: Sequence[Ranked],
+    weights: Sequence[float],
+    top_k: int,
+    score_fn,
+) -> List[Tuple[EpisodicUnit, float]]:
+    """
+    Sums score_fn(branch, rank, score) per episode_id across branches and
+    keeps the top_k with a bounded heap. Ties go to the best rank reached
+    in any branch, then episode_id, so the output never depends on
+    dict or thread ordering.
+    """
+    if top_k <= 0:
+        return []
+    fused: Dict[str, List] = {}  # episode_id -> [score, best_rank, eu]
+    for b, (branch, weight) in enumerate(zip(branches, weights)):
+        if not branch or weight == 0:
+            continue
+        for rank, (eu, score) in enumerate(branch):
+            part = weight * score_fn(b, rank, score)
+            entry = fused.get(eu.episode_id)
+            if entry is None:
+                fused[eu.episode_id] = [part, rank, eu]
+            else:
+                entry[0] += part
+                if rank < entry[1]:
+                    entry[1] = rank
+    best = heapq.nsmallest(
+        top_k, fused.items(), key=lambda item: (-item[1][0], item[1][1], item[0])
+    )
+    return [(entry[2], entry[0]) for _episode_id, entry in best]
+
+
+def reciprocal_rank_fusion(
+    branches: Sequence[Ranked],
+    top_k: int,
+    weights: Optional[Sequence[float]] = None,
+    k: int = 60,
+) -> List[Tuple[EpisodicUnit, float]]:
+    """
+    RRF: each branch adds weight / (k + rank) (rank from 1). Uses ranks
+    only, so BM25 and cosine scores never need a common scale.
+    """
+    weights = weights or (1.0,) * len(branches)
+    return _merge(branches, weights, top_k, lambda _b, rank, _score: 1.0 / (k + rank + 1))
+
+
+def weighted_score_fusion(
+    branches: Sequence[Ranked],
+    top_k: int,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[EpisodicUnit, float]]:
+    """
+    Weighted sum of scores min-max normalized per branch to [0, 1]. A
+    branch without scores falls back to a linear rank score, and one
+    where every score is equal counts each hit as 1.
+    """
+    weights = weights or (1.0,) * len(branches)
+    bounds = []
+    for branch in branches:
+        scores = [score for _eu, score in branch if score is not None]
+        if len(scores) < len(branch) or not scores:
+            bounds.append(None)
+        else:
+            bounds.append((min(scores), max(scores)))
+
+    def normalized(b, rank, score):
+        if bounds[b] is None:
+            return 1.0 - rank / len(branches[b])
+        lo, hi = bounds[b]
+        return (score - lo) / (hi - lo) if hi > lo else 1.0
+
+    return _merge(branches, weights, top_k, normalized)
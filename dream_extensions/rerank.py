@@ -0,0 +1,112 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import threading
+import time
+from dream.models import EpisodicUnit
+
+
+def query_hash(query_text: str) -> bytes:
+    # whitespace-insensitive, so "a  b" and "a b " share cached scores
+    return hashlib.blake2b(" ".join(query_text.split()).encode("utf-8"), digest_size=16).digest()
+
+
+class RerankCache:
+    """
+    LRU of reranker scores keyed by (query hash, episode_id). A summary
+    never changes after confirmation, so an entry stays valid for as long
+    as the EU lives; evicting by count is all the invalidation needed.
+    """
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[bytes, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, qhash: bytes, episode_ids: Sequence[str]) -> Dict[str, float]:
+        found: Dict[str, float] = {}
+        with self._lock:
+            for episode_id in episode_ids:
+                key = (qhash, episode_id)
+                score = self._entries.get(key)
+                if score is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[episode_id] = score
+        return found
+
+    def put_many(self, qhash: bytes, scores: Dict[str, float]) -> None:
+        with self._lock:
+            for episode_id, score in scores.items():
+                self._entries[(qhash, episode_id)] = score
+                self._entries.move_to_end((qhash, episode_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def progressive_rerank(
+    score_fn,
+    query_text: str,
+    candidates: List[EpisodicUnit],
+    top_k: int,
+    deadline: Optional[float] = None,
+    batch_size: int = 8,
+    patience: int = 2,
+    cache: Optional[RerankCache] = None,
+) -> Tuple[List[EpisodicUnit], int]:
+    """
+    Reranks `candidates` (in first-stage order) batch by batch with
+    score_fn(query_text, eus) -> scores, highest first-stage score first.
+    Stops when the next batch is not expected to finish before `deadline`
+    (time.perf_counter() seconds), or when the top_k has not changed for
+    `patience` batches in a row. Scored candidates come out by rerank
+    score, the unscored tail after them in first-stage order.
+    Returns (ranked candidates, number scored by score_fn).
+    """
+    qhash = query_hash(query_text)
+    rank = {eu.episode_id: i for i, eu in enumerate(candidates)}
+    scores = cache.get_many(qhash, list(rank)) if cache is not None else {}
+
+    def leaders() -> List[str]:
+        ranked = sorted(scores, key=lambda episode_id: (-scores[episode_id], rank[episode_id]))
+        return ranked[:top_k]
+
+    pending = [eu for eu in candidates if eu.episode_id not in scores]
+    top = leaders()
+    stable = 0
+    per_item = 0.0  # running estimate of score_fn seconds per candidate
+    scored = 0
+    while pending and stable < patience:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        start = time.perf_counter()
+        if deadline is not None and start + per_item * len(batch) > deadline:
+            break
+        fresh = dict(zip((eu.episode_id for eu in batch), map(float, score_fn(query_text, batch))))
+        elapsed = time.perf_counter() - start
+        per_item = max(per_item, elapsed / len(batch))
+        scored += len(batch)
+        scores.update(fresh)
+        if cache is not None:
+            cache.put_many(qhash, fresh)
+        new_top = leaders()
+        stable = stable + 1 if len(new_top) == top_k and new_top == top else 0
+        top = new_top
+
+    ranked = sorted(
+        (eu for eu in candidates if eu.episode_id in scores),
+        key=lambda eu: (-scores[eu.episode_id], rank[eu.episode_id]),
+    )
+    ranked.extend(eu for eu in candidates if eu.episode_id not in scores)
+    return ranked, scored
@@ -1,5 +1,24 @@
-from typing import List
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import threading
+import time
 from dream.models import EpisodicUnit
+from dream_extensions.fusion import check_fusion, reciprocal_rank_fusion, weighted_score_fusion
+from dream_extensions.rerank import RerankCache, progressive_rerank
+
+_shared_executor: Optional[Executor] = None
+_shared_lock = threading.Lock()
+
+def shared_executor() -> Executor:
+    """
+    One small pool per process for the lexical branch of every
+    HybridRetrieval that is not handed its own executor.
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dream-hybrid")
+        return _shared_executor
 
 class RetrievalStrategy:
     def retrieve(self, user_id: str, query_text: str, top_k: int) -> List[EpisodicUnit]:
@@ -13,22 +32,117 @@ class SemanticRetrieval(RetrievalStrategy):
         return self.vs.search(user_id, query_text, top_k)
 
 class HybridRetrieval(RetrievalStrategy):
-    def __init__(self, vector_store, bm25):
+    """
+    Lexical (bm25, e.g. dream_extensions.bm25.BM25Index) and semantic
+    lookups run concurrently, each `depth` deep (default 2 * top_k), and
+    are merged by dream_extensions.fusion: "rrf" (reciprocal rank fusion)
+    or "weighted" (min-max normalized scores, `weights` = (lexical,
+    semantic)). Results are score ordered and deterministic; latency is
+    close to the slower branch rather than the sum of both. The lexical
+    branch runs on `executor` (owned by the caller), or on the process-wide
+    shared_executor() when none is given.
+    With an `embedder`, the semantic side is a VectorStore.query();
+    otherwise `vector_store` must offer search(user_id, query_text, top_k).
+    `now` (retrieve_scored) is the expiry cutoff of both branches, which is
+    how DreamOrchestrator(retrieval=...) calls it.
+    """
+    def __init__(
+        self,
+        vector_store,
+        bm25,
+        embedder=None,
+        fusion: str = "rrf",
+        weights: Tuple[float, float] = (1.0, 1.0),
+        rrf_k: int = 60,
+        depth: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
         self.vs = vector_store
         self.bm25 = bm25
+        self.embedder = embedder
+        self.fusion = check_fusion(fusion)
+        self.weights = tuple(weights)
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self._executor = executor or shared_executor()
+
+    def _lexical(self, user_id, query_text, n, now):
+        search_scored = getattr(self.bm25, "search_scored", None)
+        if search_scored is not None:
+            return search_scored(user_id, query_text, n, now=now)
+        return [(eu, None) for eu in self.bm25.search(user_id, query_text, n)]
+
+    def _semantic(self, user_id, query_text, n, now):
+        if self.embedder is None:
+            return [(eu, None) for eu in self.vs.search(user_id, query_text, n)]
+        return self.vs.query(user_id, self.embedder.embed(query_text), top_k=n, now=now)
+
+    def retrieve_scored(self, user_id, query_text, top_k, now=None) -> List[Tuple[EpisodicUnit, float]]:
+        if top_k <= 0:
+            return []
+        n = self.depth or 2 * top_k
+        # lexical goes to the pool, semantic (embedding + scan) stays here
+        lexical = self._executor.submit(self._lexical, user_id, query_text, n, now)
+        semantic = self._semantic(user_id, query_text, n, now)
+        branches = (lexical.result(), semantic)
+        if self.fusion == "rrf":
+            return reciprocal_rank_fusion(branches, top_k, self.weights, k=self.rrf_k)
+        return weighted_score_fusion(branches, top_k, self.weights)
 
     def retrieve(self, user_id, query_text, top_k):
-        lexical = set(self.bm25.search(user_id, query_text, top_k))
-        semantic = set(self.vs.search(user_id, query_text, top_k))
-        combined = list(lexical.union(semantic))
-        return combined[:top_k]
+        return [eu for eu, _score in self.retrieve_scored(user_id, query_text, top_k)]
 
 class RerankingRetrieval(RetrievalStrategy):
-    def __init__(self, vector_store, reranker):
+    """
+    First stage: `factor * top_k` candidates by embedding (VectorStore.query()
+    with an `embedder`, else vector_store.search()). Second stage: with a
+    `reranker.score(query_text, eus) -> scores`, candidates are reranked in
+    batches of `batch_size`, best first-stage score first, until
+    `budget_ms` (for the whole request) would be exceeded or the top_k is
+    unchanged for `patience` batches; scores are cached per (query,
+    episode_id) so a repeated query only pays for new candidates.
+    A reranker with only rerank(query_text, eus) gets the whole list at once.
+    """
+    def __init__(
+        self,
+        vector_store,
+        reranker,
+        embedder=None,
+        factor: int = 3,
+        budget_ms: Optional[float] = None,
+        batch_size: int = 8,
+        patience: int = 2,
+        cache: Optional[RerankCache] = None,
+    ):
         self.vs = vector_store
         self.reranker = reranker
+        self.embedder = embedder
+        self.factor = factor
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.patience = patience
+        self.cache = cache if cache is not None else RerankCache()
+
+    def _candidates(self, user_id, query_text, n):
+        if self.embedder is None:
+            return self.vs.search(user_id, query_text, n)
+        return [eu for eu, _sim in self.vs.query(user_id, self.embedder.embed(query_text), top_k=n)]
 
     def retrieve(self, user_id, query_text, top_k):
-        cand = self.vs.search(user_id, query_text, top_k*3)
-        reranked = self.reranker.rerank(query_text, cand)
+        start = time.perf_counter()
+        cand = self._candidates(user_id, query_text, top_k * self.factor)
+        score = getattr(self.reranker, "score", None)
+        if score is None:
+            return self.reranker.rerank(query_text, cand)[:top_k]
+        deadline = None if self.budget_ms is None else start + self.budget_ms / 1000.0
+        reranked, _scored = progressive_rerank(
+            score,
+            query_text,
+            cand,
+            top_k,
+            deadline=deadline,
+            batch_size=self.batch_size,
+            patience=self.patience,
+            cache=self.cache,
+        )
         return reranked[:top_k]
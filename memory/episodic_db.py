@@ -1,3 +1,10 @@
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Iterable, Iterator, List
+from models.episodic_unit import EpisodicUnit
+
 class EpisodicDB:
   """
   Simulates the metadata storage (Key-Value Store).
@@ -17,4 +24,213 @@ class EpisodicDB:
     self.storage[memory.id] = memory
 
   def list_all(self):
-    return list(self.storage.values())
\ No newline at end of file
+    return list(self.storage.values())
+
+  # Bulk variants, same contract as SQLiteEpisodicDB
+  def add_many(self, memories):
+    for memory in memories:
+      self.storage[memory.id] = memory
+
+  def get_many(self, memory_ids):
+    return [self.storage[i] for i in memory_ids if i in self.storage]
+
+  def update_many(self, memories):
+    self.add_many(memories)
+
+  def list_expired(self, now: float = None, status: str = "ACTIVE", limit: int = -1) -> List[EpisodicUnit]:
+    now = now if now is not None else time.time()
+    expired = sorted(
+      (m for m in self.storage.values() if m.status == status and m.ttl_expiration < now),
+      key=lambda m: m.ttl_expiration,
+    )
+    return expired if limit < 0 else expired[:limit]
+
+  def demote_expired(self, now: float = None) -> int:
+    expired = self.list_expired(now)
+    for memory in expired:
+      memory.status = "DORMANT"
+    return len(expired)
+
+
+class SQLiteEpisodicDB:
+  """
+  Persistent Episodic DB on SQLite (WAL mode), same methods as EpisodicDB.
+  Lookups by user, tier and expiry are index range scans:
+  - idx_memories_user        (user_id)
+  - idx_memories_status_ttl  (status, ttl_expiration) -> tier + expiry scans
+  - idx_memories_ttl         (ttl_expiration)
+  Embeddings are stored as float32 blobs. Rows come back as fresh
+  EpisodicUnit objects, so changes must be saved with update_memory().
+  Statements are fixed SQL strings, compiled once by the connection's
+  statement cache; bulk calls use executemany in a single transaction.
+  """
+
+  SCHEMA = """
+    CREATE TABLE IF NOT EXISTS memories (
+      id TEXT PRIMARY KEY,
+      user_id TEXT NOT NULL,
+      content TEXT NOT NULL,
+      embedding BLOB NOT NULL,
+      created_at REAL NOT NULL,
+      visits INTEGER NOT NULL DEFAULT 0,
+      ttl_expiration REAL NOT NULL DEFAULT 0,
+      status TEXT NOT NULL DEFAULT 'ACTIVE'
+    );
+    CREATE INDEX IF NOT EXISTS idx_memories_user ON memories(user_id);
+    CREATE INDEX IF NOT EXISTS idx_memories_status_ttl ON memories(status, ttl_expiration);
+    CREATE INDEX IF NOT EXISTS idx_memories_ttl ON memories(ttl_expiration);
+  """
+
+  COLUMNS = "id, user_id, content, embedding, created_at, visits, ttl_expiration, status"
+  INSERT = f"INSERT OR REPLACE INTO memories ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+  UPDATE = (
+    "UPDATE memories SET user_id = ?, content = ?, embedding = ?, created_at = ?, "
+    "visits = ?, ttl_expiration = ?, status = ? WHERE id = ?"
+  )
+  # ARM only touches lifecycle columns; used by update_many()
+  UPDATE_LIFECYCLE = "UPDATE memories SET visits = ?, ttl_expiration = ?, status = ? WHERE id = ?"
+  SELECT_ONE = f"SELECT {COLUMNS} FROM memories WHERE id = ?"
+  SELECT_ALL = f"SELECT {COLUMNS} FROM memories ORDER BY created_at"
+  SELECT_USER = f"SELECT {COLUMNS} FROM memories WHERE user_id = ? ORDER BY created_at"
+  SELECT_STATUS = f"SELECT {COLUMNS} FROM memories WHERE status = ?"
+  SELECT_EXPIRED = (
+    f"SELECT {COLUMNS} FROM memories WHERE status = ? AND ttl_expiration < ? "
+    "ORDER BY ttl_expiration LIMIT ?"
+  )
+  DEMOTE_EXPIRED = (
+    "UPDATE memories SET status = 'DORMANT' WHERE status = 'ACTIVE' AND ttl_expiration < ?"
+  )
+  # SQLite's default limit on bound parameters is 999
+  MAX_VARS = 900
+
+  def __init__(self, path: str = "episodic.db", synchronous: str = "NORMAL"):
+    self.path = path
+    self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+    self.lock = threading.Lock()
+    with self.lock:
+      if path != ":memory:":
+        self.conn.execute("PRAGMA journal_mode=WAL")
+      # NORMAL is durable in WAL mode except on power loss; FULL syncs every commit
+      self.conn.execute(f"PRAGMA synchronous={synchronous}")
+      self.conn.executescript(self.SCHEMA)
+      self.conn.commit()
+
+  # ---------- Row mapping ----------
+
+  @staticmethod
+  def _to_row(memory: EpisodicUnit):
+    return (
+      memory.id,
+      memory.user_id,
+      memory.content,
+      memory.embedding.tobytes(),
+      memory.created_at,
+      memory.visits,
+      memory.ttl_expiration,
+      memory.status,
+    )
+
+  @staticmethod
+  def _from_row(row) -> EpisodicUnit:
+    embedding = array("f")
+    embedding.frombytes(row[3])
+    return EpisodicUnit(
+      id=row[0],
+      user_id=row[1],
+      content=row[2],
+      embedding=embedding,
+      created_at=row[4],
+      visits=row[5],
+      ttl_expiration=row[6],
+      status=row[7],
+    )
+
+  def _select(self, sql, params=()) -> List[EpisodicUnit]:
+    with self.lock:
+      rows = self.conn.execute(sql, params).fetchall()
+    return [self._from_row(r) for r in rows]
+
+  # ---------- EpisodicDB interface ----------
+
+  def add_memory(self, memory):
+    self.add_many([memory])
+
+  def get_memory(self, memory_id):
+    with self.lock:
+      row = self.conn.execute(self.SELECT_ONE, (memory_id,)).fetchone()
+    return self._from_row(row) if row else None
+
+  def update_memory(self, memory):
+    row = self._to_row(memory)
+    with self.lock, self.conn:
+      self.conn.execute(self.UPDATE, row[1:] + row[:1])
+
+  def list_all(self):
+    return self._select(self.SELECT_ALL)
+
+  # ---------- Bulk operations ----------
+
+  def add_many(self, memories: Iterable[EpisodicUnit]):
+    rows = [self._to_row(m) for m in memories]
+    with self.lock, self.conn:
+      self.conn.executemany(self.INSERT, rows)
+
+  def get_many(self, memory_ids: Iterable[str]) -> List[EpisodicUnit]:
+    """Returns the memories found, in the order of `memory_ids`."""
+    ids = list(dict.fromkeys(memory_ids))
+    found = {}
+    for start in range(0, len(ids), self.MAX_VARS):
+      chunk = ids[start:start + self.MAX_VARS]
+      marks = ", ".join("?" * len(chunk))
+      for memory in self._select(f"SELECT {self.COLUMNS} FROM memories WHERE id IN ({marks})", chunk):
+        found[memory.id] = memory
+    return [found[i] for i in ids if i in found]
+
+  def update_many(self, memories: Iterable[EpisodicUnit]):
+    """Persists lifecycle changes (visits, TTL, status) of many memories at once."""
+    rows = [(m.visits, m.ttl_expiration, m.status, m.id) for m in memories]
+    with self.lock, self.conn:
+      self.conn.executemany(self.UPDATE_LIFECYCLE, rows)
+
+  # ---------- Indexed scans ----------
+
+  def list_by_user(self, user_id: str) -> List[EpisodicUnit]:
+    return self._select(self.SELECT_USER, (user_id,))
+
+  def list_by_status(self, status: str) -> List[EpisodicUnit]:
+    return self._select(self.SELECT_STATUS, (status,))
+
+  def list_expired(self, now: float = None, status: str = "ACTIVE", limit: int = -1) -> List[EpisodicUnit]:
+    """Memories of `status` whose TTL passed, earliest first (range scan)."""
+    now = now if now is not None else time.time()
+    return self._select(self.SELECT_EXPIRED, (status, now, limit))
+
+  def demote_expired(self, now: float = None) -> int:
+    """
+    Soft delete in one statement: every ACTIVE memory whose TTL passed
+    moves to DORMANT (Cold Storage). Returns how many moved.
+    """
+    now = now if now is not None else time.time()
+    with self.lock, self.conn:
+      return self.conn.execute(self.DEMOTE_EXPIRED, (now,)).rowcount
+
+  def iter_all(self, batch_size: int = 500) -> Iterator[EpisodicUnit]:
+    """Streams every memory without materializing the whole table."""
+    last_id = ""
+    while True:
+      batch = self._select(
+        f"SELECT {self.COLUMNS} FROM memories WHERE id > ? ORDER BY id LIMIT ?",
+        (last_id, batch_size),
+      )
+      if not batch:
+        return
+      yield from batch
+      last_id = batch[-1].id
+
+  def count(self) -> int:
+    with self.lock:
+      return self.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+  def close(self):
+    with self.lock:
+      self.conn.close()
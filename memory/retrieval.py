@@ -2,17 +2,21 @@ from typing import List
 from memory.vector_db import VectorDB
 from memory.episodic_db import EpisodicDB
 from core.arm import AdaptiveRetention
+from core.arm_journal import ARMJournal
 
 class RetrievalService:
   """
   Implements the 'Memory Retrieval Service' block from the architecture diagram.
   Orchestrates Vector Search -> Metadata Fetch -> ARM Lifecycle Check.
+  With a `journal`, revisits are written back in batches instead of one
+  update per retrieved memory.
   """
 
-  def __init__(self, vector_db: VectorDB, episodic_db: EpisodicDB, arm: AdaptiveRetention):
+  def __init__(self, vector_db: VectorDB, episodic_db: EpisodicDB, arm: AdaptiveRetention, journal: ARMJournal = None):
     self.vector_db = vector_db
     self.episodic_db = episodic_db
     self.arm = arm
+    self.journal = journal
 
   def search_memories(self, user_id: str, query_embedding: List[float], n_results=3) -> List[str]:
     """
@@ -34,17 +38,24 @@ class RetrievalService:
           continue
 
         # 3. Lifecycle Check (Soft Delete Logic)
-        self.arm.check_lifecycle(memory)
+        # A memory with journaled visits was revisited moments ago: its stored
+        # TTL is just not written back yet.
+        if self.journal is None or not self.journal.pending_visits(memory.id):
+          self.arm.check_lifecycle(memory)
 
         if memory.status == "DORMANT":
           print(f"   [RETRIEVAL] ⚠️ Memory '{memory.id}' is in Cold Storage. Reactivating for usage...")
 
         # 4. Update ARM (Revisit Logic)
         # Since we retrieved it, it counts as a visit!
-        self.arm.process_revisit(memory)
-
-        # Persist the updates (new TTL/visits)
-        self.episodic_db.update_memory(memory)
+        if self.journal is not None:
+          # Merged with other visits and persisted on the next flush
+          self.journal.record(memory)
+        else:
+          self.arm.process_revisit(memory)
+
+          # Persist the updates (new TTL/visits)
+          self.episodic_db.update_memory(memory)
 
         found_contents.append(memory.content)
 
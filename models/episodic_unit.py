@@ -1,16 +1,21 @@
+import sys
 import time
+from array import array
 from dataclasses import dataclass, field
-from typing import List
+from typing import Sequence
 
-@dataclass
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class EpisodicUnit:
   """
   Represents a single episodic memory unit within the DREAM system.
+  Slotted, with the embedding kept as array('f') (4 bytes per dim).
   """
   id: str
   user_id: str
   content: str  # The textual summary
-  embedding: List[float]  # Vector for semantic search
+  embedding: Sequence[float]  # Vector for semantic search, stored as array('f')
 
   # Lifecycle Metadata (ARM)
   created_at: float = field(default_factory=time.time)
@@ -18,6 +23,20 @@ class EpisodicUnit:
   ttl_expiration: float = 0.0
   status: str = "ACTIVE"  # Values: ACTIVE, DORMANT (Cold Storage), DELETED
 
+  def __post_init__(self):
+    if not isinstance(self.embedding, array):
+      self.embedding = array("f", self.embedding)
+
   def is_expired(self) -> bool:
     """Checks if the Time-To-Live (TTL) has expired."""
-    return time.time() > self.ttl_expiration
\ No newline at end of file
+    return time.time() > self.ttl_expiration
+
+  def nbytes(self) -> int:
+    """Approximate resident size: object, strings and embedding buffer."""
+    return (
+      sys.getsizeof(self)
+      + sys.getsizeof(self.id)
+      + sys.getsizeof(self.user_id)
+      + sys.getsizeof(self.content)
+      + len(self.embedding) * self.embedding.itemsize
+    )